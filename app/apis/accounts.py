@@ -1,29 +1,32 @@
 import os
 import uuid
+from contextlib import asynccontextmanager
 from typing import Optional
 
 from fastapi import APIRouter, status, Depends, Response, Request, HTTPException, Form, UploadFile, File
 from fastapi.encoders import jsonable_encoder
 from fastapi.responses import JSONResponse
-from fastapi_mail import MessageSchema, MessageType
 from pydantic import EmailStr, TypeAdapter, ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.database import get_db, PROFILE_IMAGE_UPLOAD_URL, ARTICLE_THUMBNAIL_UPLOAD_DIR, ARTICLE_EDITOR_USER_IMG_UPLOAD_DIR, ARTICLE_EDITOR_USER_VIDEO_UPLOAD_DIR
-from app.core.redis import ACCESS_COOKIE_MAX_AGE, get_redis_client, CODE_TTL_SECONDS
+from app.core.redis import ACCESS_COOKIE_MAX_AGE
 from app.core.settings import CONFIG
 from app.dependencies.auth import get_optional_current_user, get_current_user
+from app.dependencies.rate_limit import RateLimit
 from app.models.users import User
 from app.schemas.accounts import EmailRequest, VerifyRequest, UserOut, UserLostPasswordIn, UserPasswordUpdate, UserIn, UserUpdate, UserResetPasswordIn
 from app.schemas.auth import TokenResponse, LoginRequest
 from app.services.account_service import UserService, get_user_service
 from app.services.auth_service import AuthService, get_auth_service
-from app.services.token_service import AsyncTokenService, REFRESH_TOKEN_PREFIX
+from app.services.authcode_store import AuthCodeStore, AUTHCODE_MISSING, AUTHCODE_MISMATCH, AUTHCODE_SESSION_MISMATCH
+from app.services.token_service import AsyncTokenService
 from app.utils.accounts import verify_password
-from app.utils.auth import get_token_expiry
+from app.utils.auth import get_token_expiry, verify_token
 from app.utils.commons import refresh_expire, random_string, upload_single_image, remove_dir_with_files, old_image_remove
 from app.utils.cookies import compute_cookie_attrs
-from app.utils.email import AUTHCODE_EMAIL_HTML_TEMPLATE, fastapi_email
+from app.utils.email import render_authcode_email
+from app.utils.email_outbox import EmailOutbox
 from app.utils.exc_handler import CustomErrorException
 
 router = APIRouter()
@@ -34,12 +37,12 @@ router = APIRouter()
              responses={401: {
                  "description": "유효하지 않은 인증 코드 확인 시도",
                  "content": {"application/json": {"example": {"detail": "유효하지 않은 인증 코드입니다."}}}
-             }})
+             }},
+             dependencies=[Depends(RateLimit("authcode_request", limit=5, window=60))])
 async def authcode_request_email(payload: EmailRequest,
                                  current_user: Optional[User] = Depends(get_optional_current_user),
                                  _user_service: UserService = Depends(get_user_service),
                                  ):
-    redis_client = get_redis_client()
     email = str(payload.email).lower().strip()
     _type = payload.type
     existed_email_user = await _user_service.get_user_by_email(payload.email)
@@ -69,23 +72,12 @@ async def authcode_request_email(payload: EmailRequest,
         raise CustomErrorException(status_code=410, detail="잘못된 요청입니다.")
 
     # 비번 분실 그리고 통과한 신규가입과 이메일 변경
-    recent_key = f"verify_recent:{email}"
-    if await redis_client.exists(recent_key):
+    # 30초 내 재요청 확인 + 세션(이메일)/인증코드(10분) 저장을 Lua 스크립트 하나로 처리 (Redis 왕복 1번)
+    authcode = str(await random_string(7, "number"))
+    if not await AuthCodeStore.issue_code(email, authcode):
         print("CustomErrorException STATUS_CODE: ", 439, "과도한 요청")
         raise CustomErrorException(status_code=439, detail="과도한 요청: 잠시 후에 다시 진행해 주세요")
 
-    session_key = f"user:{email}"  # Redis 해시 키 (세션 역할)
-    await redis_client.hset(session_key, mapping={"email": email})  # Redis에 이메일 저장 (hset)
-    await redis_client.expire(session_key, CODE_TTL_SECONDS)
-    """ Redis의 hset() 명령 자체는 **만료시간(TTL)**을 직접 지정할 수 없어요.
-        대신에 **키 전체(session_key)**에 대해 만료시간을 따로 expire() 또는 expireat()으로 설정해야 합니다.        
-        즉, hset()으로 저장한 뒤에 expire()를 호출하는 방식으로 처리합니다. """
-
-    authcode = str(await random_string(7, "number"))
-    code_key = f"verify:{email}"
-    await redis_client.set(code_key, authcode, ex=CODE_TTL_SECONDS)  # Redis에 인증코드 저장하고 TTL 설정 (10분)
-    await redis_client.set(recent_key, "1", ex=30)  # 최근 요청 키(예: 30초 내 재요청 방지) - 선택
-
     title = None
     if _type == "register":
         title = "[서비스] 회원가입 인증번호"
@@ -94,26 +86,27 @@ async def authcode_request_email(payload: EmailRequest,
     elif _type == "email":
         title = "[서비스] 이메일 변경 인증번호"
 
-    from jinja2 import Template
-    html_body = Template(AUTHCODE_EMAIL_HTML_TEMPLATE).render(code=authcode, title=title)  # , verify_link=verify_link) # 직접 입력으로 교체
-
-    """fastapi-mail 1.5.0(1.5.8버전은 recipients=[NameEmail(email=email)]을 쓰라는데
-    작동을 하지 않는다."""
-    message = MessageSchema(
-        subject=title,
-        recipients=[payload.email],
-        body=html_body,
-        subtype=MessageType.html,
-    )
+    html_body = render_authcode_email(authcode, title)  # 미리 컴파일된 템플릿
 
+    # SMTP 발송은 백그라운드 작업(app/utils/email_outbox.py)이 한다: 여기서는 대기열에 넣기만 한다.
     try:
-        await fastapi_email.send_message(message)
+        outbox_id = await EmailOutbox.enqueue(str(payload.email), title, html_body)
     except Exception as e:
-        await redis_client.delete(code_key)  # 실패 시 Redis에 저장된 코드 제거
-        print("이메일 전송 실패: ", e)
+        await AuthCodeStore.discard_code(email)  # 실패 시 Redis에 저장된 코드 제거
+        print("이메일 발송 대기열 등록 실패: ", e)
         raise CustomErrorException(status_code=600, detail="이메일 전송이 실패했습니다.")
 
-    return JSONResponse({"message": "인증번호를 이메일로 발송했습니다. (10분간 유효)"})
+    return JSONResponse({"message": "인증번호를 이메일로 발송했습니다. (10분간 유효)",
+                         "outbox_id": outbox_id})
+
+
+@router.get("/authcode/delivery/{outbox_id}",
+            summary="인증 코드 이메일 발송 상태", description="queued | retrying | sent | failed")
+async def authcode_delivery_status(outbox_id: str):
+    delivery = await EmailOutbox.status(outbox_id)
+    if delivery is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="발송 기록이 없습니다.")
+    return JSONResponse(delivery)
 
 
 @router.post("/authcode/verify",
@@ -121,31 +114,30 @@ async def authcode_request_email(payload: EmailRequest,
              responses={401: {
                  "description": "유효하지 않은 인증 코드 확인 시도",
                  "content": {"application/json": {"example": {"detail": "유효하지 않은 인증 코드입니다."}}}
-             }})
+             }},
+             dependencies=[Depends(RateLimit("authcode_verify", limit=10, window=60))])
 async def authcode_verify(payload: VerifyRequest,
                           current_user: Optional[User] = Depends(get_optional_current_user),
                           db: AsyncSession = Depends(get_db)):
     """ 회원 가입시 인증 코드로 본인 확인(단순 인증하기)
     ### 이메일 변경 로직도 여기에 넣었다.(인증과 동시에 이메일 변경)
     javascript 코드도 authVerifyForm.addEventListener('submit' 에서 같은 흐름의 로직을 유지했다."""
-    redis_client = get_redis_client()
     email = str(payload.email).lower().strip()
     authcode = payload.authcode.strip()
     _type = payload.type
     password = payload.password
     old_email = payload.old_email
 
-    code_key = f"verify:{email}"
-    session_key = f"user:{email}"
-    stored_code = await redis_client.get(code_key)  # Redis에서 코드 확인
-    session_data = await redis_client.hgetall(session_key)  # 세션에 저장된 이메일 확인
-    if not stored_code:
+    # 코드/세션 이메일 확인 + (이메일 변경이 아니면) 코드 소비와 인증토큰 저장을 한번에 처리
+    verified_token = str(uuid.uuid4())
+    result = await AuthCodeStore.verify_code(email, authcode, "" if _type == "email" else verified_token)
+    if result == AUTHCODE_MISSING:
         print("CustomErrorException STATUS_CODE: ", 410, "유효하지 않은 인증코드")
         raise CustomErrorException(status_code=410, detail="유효하지 않은 인증코드입니다.")  # 만료되었거나 존재하지 않습니다.
-    if stored_code != authcode:
+    if result == AUTHCODE_MISMATCH:
         print("CustomErrorException STATUS_CODE: ", 410, "인증코드 불일치")
         raise CustomErrorException(status_code=410, detail="인증코드가 일치하지 않습니다.")
-    if not session_data or session_data.get("email") != email:
+    if result == AUTHCODE_SESSION_MISMATCH:
         print("CustomErrorException STATUS_CODE: ", 410, "세션 이메일 불일치")
         raise CustomErrorException(status_code=410, detail="세션 이메일이 일치하지 않습니다.")
 
@@ -159,7 +151,7 @@ async def authcode_verify(payload: VerifyRequest,
             password_ok = await verify_password(password, str(old_user.password))
             if password_ok:
                 await _user_service.update_email(old_email, payload.email)
-                await redis_client.delete(code_key)  # 검증 성공 -> 코드 삭제(한번만 사용)
+                await AuthCodeStore.discard_code(email)  # 검증 성공 -> 코드 삭제(한번만 사용)
                 return JSONResponse({"message": "이메일 변경 성공: 확인을 클릭하면, 새로운 이메일로 로그인됩니다."})
             else:
                 raise CustomErrorException(status_code=411,
@@ -170,11 +162,6 @@ async def authcode_verify(payload: VerifyRequest,
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="이메일 변경 권한이 없습니다."
             )
-    await redis_client.delete(code_key)  # 검증 성공 -> 코드 삭제(한번만 사용)
-
-    verified_token = str(uuid.uuid4())
-    verified_key = f"verified:{email}"
-    await redis_client.set(verified_key, verified_token, ex=CODE_TTL_SECONDS)  # 10분 동안 유지
 
     if _type == "register":
         message = "이메일 인증 성공: 회원가입을 진행하세요."
@@ -184,8 +171,36 @@ async def authcode_verify(payload: VerifyRequest,
                          "verified_token": verified_token})
 
 
+async def _raise_if_not_verified(email: str, token: str, claim: bool = False):
+    """인증토큰/세션 이메일 확인 (Redis 왕복 1번). claim=True면 확인과 동시에 인증토큰을 잡는다. (_claim_verified 참고)"""
+    result = await AuthCodeStore.check_verified(email, token, claim=claim)
+    if result == AUTHCODE_MISSING:  # email이 빈칸이어도 여기로 오지만, CustomError 발생시킨다.
+        print("CustomErrorException STATUS_CODE: ", 410, "유효하지 않은 인증토큰")
+        raise CustomErrorException(status_code=410, detail="유효하지 않은 인증토큰입니다.")
+    if result == AUTHCODE_MISMATCH:  # token이 빈칸이어도 여기로 오지만, CustomError 발생시킨다.
+        print("CustomErrorException STATUS_CODE: ", 410, "인증토큰 불일치")
+        raise CustomErrorException(status_code=410, detail="인증토큰이 일치하지 않습니다.")
+    if result == AUTHCODE_SESSION_MISMATCH:  # 들어온 이메일 값이 세션에 저장된 이메일과 다르면, CustomError 발생시킨다.
+        print("CustomErrorException STATUS_CODE: ", 410, "세션 이메일 불일치")
+        raise CustomErrorException(status_code=410, detail="세션 이메일이 일치하지 않습니다.")
+
+
+@asynccontextmanager
+async def _claim_verified(email: str, token: str):
+    """인증토큰을 잡고(같은 토큰으로 동시에 들어온 요청 중 하나만 통과) 블록을 실행한다.
+    블록이 성공하면 인증토큰/세션을 소비하고, 실패하면(예외) 되돌려서 같은 인증토큰으로 다시 시도할 수 있게 한다."""
+    await _raise_if_not_verified(email, token, claim=True)
+    try:
+        yield
+    except BaseException:
+        await AuthCodeStore.release_claim(email, token)
+        raise
+    await AuthCodeStore.finish_claim(email, token)
+
+
 @router.post("/register",
-             response_model=UserOut, )
+             response_model=UserOut,
+             dependencies=[Depends(RateLimit("register", limit=10, window=60))])
 async def register_user(username: str = Form(...),
                         email: str = Form(...),
                         token: str = Form(...),
@@ -197,21 +212,7 @@ async def register_user(username: str = Form(...),
         username(닉네임), 비밀번호는 js단에서 빈값 및 validation을 처리한다. 이미지는 없어도 들어온다.
         이미지등의 파일을 받는 경우는 pydantic schema로 검증이 안된다. formData로 받아서 검증해야 한다.
         하지만, 이미지등의 파일이 없는 경우는 json으로 받아서 pydantic schema로 검증할 수 있고, 그렇게 하는 것을 권장한다."""
-    verified_key = f"verified:{email}"
-    session_key = f"user:{email}"
-    redis_client = get_redis_client()
-    verified_token = await redis_client.get(verified_key)
-    session_data = await redis_client.hgetall(session_key)
-
-    if not verified_token:  # email이 빈칸이어도 여기로 오지만, CustomError 발생시킨다.
-        print("CustomErrorException STATUS_CODE: ", 410, "유효하지 않은 인증토큰")
-        raise CustomErrorException(status_code=410, detail="유효하지 않은 인증토큰입니다.")
-    if verified_token != token:  # token이 빈칸이어도 여기로 오지만, CustomError 발생시킨다.
-        print("CustomErrorException STATUS_CODE: ", 410, "인증토큰 불일치")
-        raise CustomErrorException(status_code=410, detail="인증토큰이 일치하지 않습니다.")
-    if not session_data or session_data.get("email") != email:  # 들어온 이메일 값이 세션에 저장된 이메일과 다르면, CustomError 발생시킨다.
-        print("CustomErrorException STATUS_CODE: ", 410, "세션 이메일 불일치")
-        raise CustomErrorException(status_code=410, detail="세션 이메일이 일치하지 않습니다.")
+    await _raise_if_not_verified(email, token)
 
     try:
         validated_email: EmailStr = TypeAdapter(EmailStr).validate_python(email)
@@ -236,16 +237,15 @@ async def register_user(username: str = Form(...),
     if existed_user_email:
         print("CustomErrorException STATUS_CODE: ", 499, "존재하는 이메일")
         raise CustomErrorException(status_code=499, detail="이미 사용하고 있는 이메일입니다.")
-    created_user = await user_service.create_user(user_in)
+    # 같은 토큰으로 동시에 들어온 요청 중 하나만 가입을 진행한다. 인증토큰은 가입(create_user)이 성공한 뒤에 소비한다.
+    async with _claim_verified(email, token):
+        created_user = await user_service.create_user(user_in)
 
     img_path = None
     if imagefile:
         img_path = await upload_single_image(PROFILE_IMAGE_UPLOAD_URL, created_user, imagefile)
     created_user = await user_service.user_image_update(created_user.id, img_path)
 
-    await redis_client.delete(verified_key)
-    await redis_client.delete(session_key)
-
     return JSONResponse(status_code=201, content=jsonable_encoder(created_user))
 
 
@@ -258,30 +258,21 @@ async def register_user(username: str = Form(...),
                       "description": "회원 비밀번호 수정 권한 없슴",
                       "content": {"application/json": {"example": {"detail": "접근 권한이 없습니다."}}}
                   }
-              }})
+              }},
+              dependencies=[Depends(RateLimit("lost_password", limit=10, window=60))])
 async def lost_password_resetting(lost_password_in: UserLostPasswordIn,
                                   _user_service: UserService = Depends(get_user_service)):
     email = str(lost_password_in.email).lower().strip()
     token = lost_password_in.token
     newpassword = lost_password_in.newpassword
 
-    verified_key = f"verified:{email}"
-    session_key = f"user:{email}"
-    redis_client = get_redis_client()
-    verified_token = await redis_client.get(verified_key)
-    session_data = await redis_client.hgetall(session_key)
-
-    if not verified_token:  # email이 빈칸이어도 여기로 오지만, CustomError 발생시킨다.
-        raise CustomErrorException(status_code=410, detail="유효하지 않은 인증토큰입니다.")
-    if verified_token != token:  # token이 빈칸이어도 여기로 오지만, CustomError 발생시킨다.
-        raise CustomErrorException(status_code=410, detail="인증토큰이 일치하지 않습니다.")
-    if not session_data or session_data.get("email") != email:  # 들어온 이메일 값이 세션에 저장된 이메일과 다르면, CustomError 발생시킨다.
-        raise CustomErrorException(status_code=410, detail="세션 이메일이 일치하지 않습니다.")
+    await _raise_if_not_verified(email, token)
 
     user = await _user_service.get_user_by_email(lost_password_in.email)
     if user:
         _password_update = UserPasswordUpdate(password=newpassword)
-        await _user_service.update_password(user.id, _password_update)
+        async with _claim_verified(email, token):  # 비밀번호 변경이 성공해야 인증토큰/세션 소비 (한번만 사용)
+            await _user_service.update_password(user.id, _password_update)
 
     else:
         raise HTTPException(
@@ -289,9 +280,6 @@ async def lost_password_resetting(lost_password_in: UserLostPasswordIn,
             detail="회원을 찾을 수 없습니다."
         )
 
-    await redis_client.delete(verified_key)
-    await redis_client.delete(session_key)
-
     return user
     # return JSONResponse({"message": "비밀번호 설정 성공: 재설정된 비밀번호로 로그인됩니다."})
 
@@ -305,7 +293,8 @@ async def lost_password_resetting(lost_password_in: UserLostPasswordIn,
         401: {
             "description": "인증 실패",
             "content": {"application/json": {"example": {"detail": "인증 실패"}}}
-        }})
+        }},
+    dependencies=[Depends(RateLimit("login", limit=10, window=60))])
 async def login(response: Response, request: Request,
                 login_data: LoginRequest,
                 auth_service: AuthService = Depends(get_auth_service)):
@@ -479,6 +468,10 @@ async def logout(response: Response,
     if refresh_token:
         expiry = get_token_expiry(refresh_token)
         await AsyncTokenService.blacklist_token(refresh_token, expiry)
+        await AuthService.forget_refresh_result(refresh_token)
+        refresh_payload = verify_token(refresh_token, type_="refresh")
+        if refresh_payload and refresh_payload.get("jti"):
+            await AsyncTokenService.revoke_refresh_token(refresh_payload["user_id"], refresh_payload["jti"])
     print("로그아웃")
 
     return {"message": "로그아웃되었습니다."}
@@ -553,8 +546,9 @@ async def delete_user(user_id: int,
     if refresh_token:
         refresh_exp = get_token_expiry(refresh_token)
         await AsyncTokenService.blacklist_token(refresh_token, refresh_exp)
-        # 만약 Redis에 별도 키로 저장했다면 삭제:
-        await redis_client.delete(f"{REFRESH_TOKEN_PREFIX}{user_id}")
+        await AuthService.forget_refresh_result(refresh_token)
+    # 회원의 refresh_token 전부 폐기 (다른 기기에서 로그인한 것 포함)
+    await AsyncTokenService.revoke_refresh_token(user_id)
 
     request.state.skip_set_cookie = True
 
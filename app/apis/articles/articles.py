@@ -3,9 +3,8 @@ from pydantic import ValidationError
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.database import get_db, ARTICLE_THUMBNAIL_UPLOAD_DIR, ARTICLE_EDITOR_USER_IMG_UPLOAD_DIR, ARTICLE_EDITOR_USER_VIDEO_UPLOAD_DIR
-from app.core.redis import get_redis_client
-from app.core.settings import APP_DIR, MEDIA_DIR
+from app.core.database import get_db, ARTICLE_THUMBNAIL_UPLOAD_DIR
+from app.core.settings import MEDIA_DIR
 from app.dependencies.auth import get_current_user
 from app.models.articles import ArticleComment
 from app.models.users import User
@@ -13,6 +12,8 @@ from app.schemas.articles import articles as schema_article
 from app.services.articles.article_service import ArticleService, get_article_service
 from app.utils.commons import upload_single_image, old_image_remove, remove_file_path, remove_empty_dir
 from app.utils.exc_handler import CustomErrorException
+from app.utils.images import image_paths_with_variants
+from app.utils.media_gc import MediaGarbageCollector
 from app.utils.wysiwyg import redis_delete_candidates, cleanup_unused_images, cleanup_unused_videos, extract_img_srcs, object_delete_with_image_or_video, extract_video_srcs
 
 router = APIRouter()
@@ -30,8 +31,7 @@ async def create_article(title: str = Form(...),
                          content: str = Form(...),
                          imagefile: UploadFile | None = File(None),
                          article_service: ArticleService = Depends(get_article_service),
-                         current_user: User = Depends(get_current_user),
-                         db: AsyncSession = Depends(get_db)):
+                         current_user: User = Depends(get_current_user)):
 
     try:
         article_in = schema_article.ArticleIn(title=title, content=content)
@@ -53,8 +53,6 @@ async def create_article(title: str = Form(...),
     # img 임시 후보 키(0)를 실제 article_id 키로 이동
     temp_img_key = "delete_image_candidates:0"
     real_img_key = f"delete_image_candidates:{article_id}"
-    redis_client = get_redis_client()
-    print("await redis_client.exists(temp_img_key)::", await redis_client.exists(temp_img_key))
     """quills content에 이미지를 로드했다가 지우면, 
     await redis_client.exists(temp_img_key)이 1이 되고, if 문을 지나간다. 
     이미지를 로드하지 않거나, 로드했다가 지운 이미지가 없으면 그냥 if 문을 우회한다."""
@@ -63,16 +61,14 @@ async def create_article(title: str = Form(...),
     # video
     temp_video_key = "delete_video_candidates:0"
     real_video_key = f"delete_video_candidates:{article_id}"
-    print("await redis_client.exists(temp_video_key)::", await redis_client.exists(temp_video_key))
     """quills content에 이미지를 로드했다가 지우면, 
     await redis_client.exists(temp_video_key)이 1이 되고, if 문을 지나간다. 
     이미지를 로드하지 않거나, 로드했다가 지운 이미지가 없으면 그냥 if 문을 우회한다."""
     await redis_delete_candidates(temp_video_key, real_video_key)
     # 최종 저장 시 삭제 예정 이미지 정리
-    _type = "article"
-    ''' _type은 is_media_used_elsewhere 이 함수에서 적용된다. '''
-    await cleanup_unused_images(_type, article_id, content, db)
-    await cleanup_unused_videos(_type, article_id, content, db)
+    # (실제 파일 삭제는 media gc 스케줄러가 배치로 처리)
+    await cleanup_unused_images(article_id, content)
+    await cleanup_unused_videos(article_id, content)
 
     return created_article
 
@@ -94,8 +90,7 @@ async def update_article(article_id: int,
                          content: str = Form(...),
                          imagefile: UploadFile | None = File(None),
                          article_service: ArticleService = Depends(get_article_service),
-                         current_user: User = Depends(get_current_user),
-                         db: AsyncSession = Depends(get_db)):
+                         current_user: User = Depends(get_current_user)):
 
     try:
         article_update = schema_article.ArticleUpdate(title=title, content=content)
@@ -137,8 +132,6 @@ async def update_article(article_id: int,
     # img 임시 후보 키(0)를 실제 article_id 키로 이동
     temp_img_key = "delete_image_candidates:0"
     real_img_key = f"delete_image_candidates:{article_id}"
-    redis_client = get_redis_client()
-    print("await redis_client.exists(temp_img_key)::", await redis_client.exists(temp_img_key))
     """quills content에 이미지를 로드했다가 지우면, 
     await redis_client.exists(temp_img_key)이 1이 되고, if 문을 지나간다. 
     이미지를 로드하지 않거나, 로드했다가 지운 이미지가 없으면 그냥 if 문을 우회한다."""
@@ -147,48 +140,21 @@ async def update_article(article_id: int,
     # video
     temp_video_key = "delete_video_candidates:0"
     real_video_key = f"delete_video_candidates:{article_id}"
-    print("await redis_client.exists(temp_video_key)::", await redis_client.exists(temp_video_key))
     """quills content에 이미지를 로드했다가 지우면, 
     await redis_client.exists(temp_video_key)이 1이 되고, if 문을 지나간다. 
     이미지를 로드하지 않거나, 로드했다가 지운 이미지가 없으면 그냥 if 문을 우회한다."""
     await redis_delete_candidates(temp_video_key, real_video_key)
 
     # 최종 저장 시 삭제 예정 이미지 정리
-    _type = "article"
-    ''' _type은 is_media_used_elsewhere 이 함수에서 적용된다. '''
-    await cleanup_unused_images(_type, article_id, content, db)
-    await cleanup_unused_videos(_type, article_id, content, db)
+    # (실제 파일 삭제는 media gc 스케줄러가 배치로 처리)
+    await cleanup_unused_images(article_id, content)
+    await cleanup_unused_videos(article_id, content)
 
-    # quills content의 이미지 중에서 예전것만 골라서 삭제
+    # quills content의 이미지/동영상 중에서 예전것만 골라서 GC 큐로 (다른 곳에서 쓰고 있으면 GC가 남긴다)
     new_quills_imgs = extract_img_srcs(updated_article.content)
-    print("new_quills_imgs:", new_quills_imgs)
-    # only_old_quills_imgs = old_quills_imgs - new_quills_imgs
-    only_old_quills_imgs = old_quills_imgs.difference(new_quills_imgs)
-    for url in only_old_quills_imgs:
-        print("url:", url)
-        quill_img_path = f'{APP_DIR}{url}'  # \\없어도 된다. url 맨 앞에 \\ 있다.
-        await remove_file_path(quill_img_path)
-        # 아래도 같은 작동을 한다.
-        # file_path = Path(APP_DIR) / url.lstrip("/\\")
-        # if file_path.exists():
-        #     file_path.unlink()
-
-    # 삭제후 폴더가 비어 있으면 폴더도 삭제
-    img_dir = f'{ARTICLE_EDITOR_USER_IMG_UPLOAD_DIR}'+'/'+f'{current_user.id}'
-    await remove_empty_dir(img_dir)
-
-    # quills content의 동영상 중에서 예전것만 골라서 삭제
     new_quills_videos = extract_video_srcs(updated_article.content)
-    print("new_quills_videos:", new_quills_videos)
-    only_old_quills_videos = old_quills_videos.difference(new_quills_videos)
-    for url in only_old_quills_videos:
-        print("url:", url)
-        quill_video_path = f'{APP_DIR}{url}'  # \\없어도 된다. url 맨 앞에 \\ 있다.
-        await remove_file_path(quill_video_path)
-
-    # 삭제후 폴더가 비어 있으면 폴더도 삭제
-    video_dir = f'{ARTICLE_EDITOR_USER_VIDEO_UPLOAD_DIR}' + '/' + f'{current_user.id}'
-    await remove_empty_dir(video_dir)
+    await MediaGarbageCollector.enqueue(old_quills_imgs.difference(new_quills_imgs))
+    await MediaGarbageCollector.enqueue(old_quills_videos.difference(new_quills_videos))
     # #### end
 
     return updated_article
@@ -224,32 +190,20 @@ async def delete_article(article_id: int,
         raise CustomErrorException(status_code=416, detail="댓글이 있는 게시글은 삭제할 수 없습니다.")
 
     # thumbnail 이미지 파일 삭제
-    thumbnail_img_path = _article.img_path
-    full_img_path = f'{MEDIA_DIR}'+'/'+f'{thumbnail_img_path}'
-    await remove_file_path(full_img_path)
+    for thumbnail_img_path in image_paths_with_variants(_article.img_path):  # 원본 + 파생본
+        full_img_path = f'{MEDIA_DIR}'+'/'+f'{thumbnail_img_path}'
+        await remove_file_path(full_img_path)
 
     img_dir = f'{ARTICLE_THUMBNAIL_UPLOAD_DIR}'+'/'+f'{current_user.id}'
     await remove_empty_dir(img_dir) # 삭제후 폴더가 비어 있으면 폴더도 삭제
 
     # quills content 이미지
     img_key = f"delete_image_candidates:{article_id}"
-    await object_delete_with_image_or_video(_type="article", # is_media_used_elsewhere 에서 사용
-                                            _id=article_id,
-                                            html=_article.content,
-                                            _dir=ARTICLE_EDITOR_USER_IMG_UPLOAD_DIR,
-                                            current_user_id=current_user.id,
-                                            db=db,
-                                            key=img_key)
+    await object_delete_with_image_or_video(_id=article_id, html=_article.content, key=img_key)
 
     # quills content 동영상
     video_key = f"delete_video_candidates:{article_id}"
-    await object_delete_with_image_or_video(_type="article", # is_media_used_elsewhere 에서 사용
-                                            _id=article_id,
-                                            html=_article.content,
-                                            _dir=ARTICLE_EDITOR_USER_VIDEO_UPLOAD_DIR,
-                                            current_user_id=current_user.id,
-                                            db=db,
-                                            key=video_key)
+    await object_delete_with_image_or_video(_id=article_id, html=_article.content, key=video_key)
 
     article = await article_service.delete_article(article_id, current_user)
     if article is None:
@@ -269,10 +223,10 @@ async def delete_article(article_id: int,
 async def article_vote(article_id: int,
                   article_service: ArticleService = Depends(get_article_service),
                   current_user: User = Depends(get_current_user)):
-    article = await article_service.get_article(article_id)
-    if not article:
+    # 존재 확인은 vote_article 안에서 한다. (VOTE 프로필로 한번만 조회)
+    data = await article_service.vote_article(article_id, current_user)
+    if data is None:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
                             detail="데이터를 찾을수 없습니다.")
-    data = await article_service.vote_article(article_id, current_user)
     # return Response(status_code=status.HTTP_204_NO_CONTENT)
     return data
\ No newline at end of file
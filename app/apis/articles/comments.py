@@ -1,16 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Response
-from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.database import get_db, ARTICLE_COMMENT_EDITOR_USER_IMG_UPLOAD_DIR, ARTICLE_COMMENT_EDITOR_USER_VIDEO_UPLOAD_DIR
-from app.core.redis import get_redis_client
-from app.core.settings import APP_DIR
 from app.dependencies.auth import get_current_user
 from app.models.users import User
 from app.schemas.articles import comments as schema_comment
 from app.services.articles.article_service import ArticleService, get_article_service
 from app.services.articles.comment_service import ArticleCommentService, get_articlecomment_service
-from app.utils.commons import remove_file_path, remove_empty_dir
 from app.utils.exc_handler import CustomErrorException
+from app.utils.media_gc import MediaGarbageCollector
 from app.utils.wysiwyg import redis_delete_candidates, cleanup_unused_images, cleanup_unused_videos, extract_img_srcs, extract_video_srcs, object_delete_with_image_or_video
 
 router = APIRouter()
@@ -21,8 +17,7 @@ async def comment_create(article_id: int,
                          comment_in: schema_comment.CommentIn,
                          article_service: ArticleService = Depends(get_article_service),
                          articlecomment_service: ArticleCommentService = Depends(get_articlecomment_service),
-                         current_user: User = Depends(get_current_user),
-                         db: AsyncSession = Depends(get_db)) -> schema_comment.CommentOut:
+                         current_user: User = Depends(get_current_user)) -> schema_comment.CommentOut:
     article = await article_service.get_article(article_id)
     if article is None:
         raise HTTPException(
@@ -38,8 +33,6 @@ async def comment_create(article_id: int,
     # img 임시 후보 키(0)를 실제 article_id 키로 이동
     temp_img_key = "delete_image_candidates:0"
     real_img_key = f"delete_image_candidates:{comment_id}"
-    redis_client = get_redis_client()
-    print("await redis_client.exists(temp_img_key)::", await redis_client.exists(temp_img_key))
     """quills content에 이미지를 로드했다가 지우면, 
     await redis_client.exists(temp_img_key)이 1이 되고, if 문을 지나간다. 
     이미지를 로드하지 않거나, 로드했다가 지운 이미지가 없으면 그냥 if 문을 우회한다."""
@@ -48,16 +41,14 @@ async def comment_create(article_id: int,
     # video
     temp_video_key = "delete_video_candidates:0"
     real_video_key = f"delete_video_candidates:{comment_id}"
-    print("await redis_client.exists(temp_video_key)::", await redis_client.exists(temp_video_key))
     """quills content에 이미지를 로드했다가 지우면, 
     await redis_client.exists(temp_video_key)이 1이 되고, if 문을 지나간다. 
     이미지를 로드하지 않거나, 로드했다가 지운 이미지가 없으면 그냥 if 문을 우회한다."""
     await redis_delete_candidates(temp_video_key, real_video_key)
     # 최종 저장 시 삭제 예정 이미지 정리
-    _type = "article_comment"
-    ''' _type은 is_media_used_elsewhere 이 함수에서 적용된다. '''
-    await cleanup_unused_images(_type, comment_id, comment_in.content, db)
-    await cleanup_unused_videos(_type, comment_id, comment_in.content, db)
+    # (실제 파일 삭제는 media gc 스케줄러가 배치로 처리)
+    await cleanup_unused_images(comment_id, comment_in.content)
+    await cleanup_unused_videos(comment_id, comment_in.content)
 
     return created_comment # ORM 객체를 그대로 반환해도 Pydantic이 변환해 줍니다.
 
@@ -67,8 +58,7 @@ async def comment_create(article_id: int,
 async def update_comment(comment_id: int,
                          comment_in: schema_comment.CommentIn,
                          articlecomment_service: ArticleCommentService = Depends(get_articlecomment_service),
-                         current_user: User = Depends(get_current_user),
-                         db: AsyncSession = Depends(get_db)):
+                         current_user: User = Depends(get_current_user)):
 
     _comment = await articlecomment_service.get_comment(comment_id)
     old_quills_imgs = extract_img_srcs(_comment.content)
@@ -93,8 +83,6 @@ async def update_comment(comment_id: int,
     # img 임시 후보 키(0)를 실제 article_id 키로 이동
     temp_img_key = "delete_image_candidates:0"
     real_img_key = f"delete_image_candidates:{comment_id}"
-    redis_client = get_redis_client()
-    print("await redis_client.exists(temp_img_key)::", await redis_client.exists(temp_img_key))
     """quills content에 이미지를 로드했다가 지우면, 
     await redis_client.exists(temp_img_key)이 1이 되고, if 문을 지나간다. 
     이미지를 로드하지 않거나, 로드했다가 지운 이미지가 없으면 그냥 if 문을 우회한다."""
@@ -103,47 +91,20 @@ async def update_comment(comment_id: int,
     # video
     temp_video_key = "delete_video_candidates:0"
     real_video_key = f"delete_video_candidates:{comment_id}"
-    print("await redis_client.exists(temp_video_key)::", await redis_client.exists(temp_video_key))
     """quills content에 이미지를 로드했다가 지우면, 
     await redis_client.exists(temp_video_key)이 1이 되고, if 문을 지나간다. 
     이미지를 로드하지 않거나, 로드했다가 지운 이미지가 없으면 그냥 if 문을 우회한다."""
     await redis_delete_candidates(temp_video_key, real_video_key)
     # 최종 저장 시 삭제 예정 이미지 정리
-    _type = "article_comment"
-    ''' _type은 is_media_used_elsewhere 이 함수에서 적용된다. '''
-    await cleanup_unused_images(_type, comment_id, comment_in.content, db)
-    await cleanup_unused_videos(_type, comment_id, comment_in.content, db)
+    # (실제 파일 삭제는 media gc 스케줄러가 배치로 처리)
+    await cleanup_unused_images(comment_id, comment_in.content)
+    await cleanup_unused_videos(comment_id, comment_in.content)
 
-    # quills content의 이미지 중에서 예전것만 골라서 삭제
+    # quills content의 이미지/동영상 중에서 예전것만 골라서 GC 큐로 (다른 곳에서 쓰고 있으면 GC가 남긴다)
     new_quills_imgs = extract_img_srcs(updated_comment.content)
-    print("new_quills_imgs:", new_quills_imgs)
-    # only_old_quills_imgs = old_quills_imgs - new_quills_imgs
-    only_old_quills_imgs = old_quills_imgs.difference(new_quills_imgs)
-    for url in only_old_quills_imgs:
-        print("url:", url)
-        quill_img_path = f'{APP_DIR}{url}'  # \\없어도 된다. url 맨 앞에 \\ 있다.
-        await remove_file_path(quill_img_path)
-        # 아래도 같은 작동을 한다.
-        # file_path = Path(APP_DIR) / url.lstrip("/\\")
-        # if file_path.exists():
-        #     file_path.unlink()
-
-    # 삭제후 폴더가 비어 있으면 폴더도 삭제
-    img_dir = f'{ARTICLE_COMMENT_EDITOR_USER_IMG_UPLOAD_DIR}' + '/' + f'{current_user.id}'
-    await remove_empty_dir(img_dir)
-
-    # quills content의 동영상 중에서 예전것만 골라서 삭제
     new_quills_videos = extract_video_srcs(updated_comment.content)
-    print("new_quills_videos:", new_quills_videos)
-    only_old_quills_videos = old_quills_videos.difference(new_quills_videos)
-    for url in only_old_quills_videos:
-        print("url:", url)
-        quill_video_path = f'{APP_DIR}{url}'  # \\없어도 된다. url 맨 앞에 \\ 있다.
-        await remove_file_path(quill_video_path)
-
-    # 삭제후 폴더가 비어 있으면 폴더도 삭제
-    video_dir = f'{ARTICLE_COMMENT_EDITOR_USER_VIDEO_UPLOAD_DIR}' + '/' + f'{current_user.id}'
-    await remove_empty_dir(video_dir)
+    await MediaGarbageCollector.enqueue(old_quills_imgs.difference(new_quills_imgs))
+    await MediaGarbageCollector.enqueue(old_quills_videos.difference(new_quills_videos))
     # #### end
     # return updated_comment
     # ORM -> Pydantic 변환
@@ -163,8 +124,7 @@ async def update_comment(comment_id: int,
                }})
 async def delete_comment(comment_id: int,
                          articlecomment_service: ArticleCommentService = Depends(get_articlecomment_service),
-                         current_user: User = Depends(get_current_user),
-                         db: AsyncSession = Depends(get_db)):
+                         current_user: User = Depends(get_current_user)):
 
     _comment = await articlecomment_service.get_comment(comment_id)
     if not _comment:
@@ -186,23 +146,11 @@ async def delete_comment(comment_id: int,
 
     # quills content 이미지
     img_key = f"delete_image_candidates:{comment_id}"
-    await object_delete_with_image_or_video(_type="article_comment", # is_media_used_elsewhere 에서 사용
-                                            _id=comment_id,
-                                            html=_comment.content,
-                                            _dir=ARTICLE_COMMENT_EDITOR_USER_IMG_UPLOAD_DIR,
-                                            current_user_id=current_user.id,
-                                            db=db,
-                                            key=img_key)
+    await object_delete_with_image_or_video(_id=comment_id, html=_comment.content, key=img_key)
 
     # quills content 동영상
     video_key = f"delete_video_candidates:{comment_id}"
-    await object_delete_with_image_or_video(_type="article_comment", # is_media_used_elsewhere 에서 사용
-                                            _id=comment_id,
-                                            html=_comment.content,
-                                            _dir=ARTICLE_COMMENT_EDITOR_USER_VIDEO_UPLOAD_DIR,
-                                            current_user_id=current_user.id,
-                                            db=db,
-                                            key=video_key)
+    await object_delete_with_image_or_video(_id=comment_id, html=_comment.content, key=video_key)
 
     comment = await articlecomment_service.delete_comment(comment_id, current_user)
     if comment is None:
@@ -223,11 +171,10 @@ async def comment_vote(comment_id: int,
                        articlecomment_service: ArticleCommentService = Depends(get_articlecomment_service),
                        current_user: User = Depends(get_current_user)):
 
-    comment = await articlecomment_service.get_comment(comment_id)
-    print("comment:", comment)
-    if not comment:
+    # 존재 확인은 vote_comment 안에서 한다. (VOTE 프로필로 한번만 조회)
+    data = await articlecomment_service.vote_comment(comment_id, current_user)
+    if data is None:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
                             detail="데이터를 찾을수 없습니다.")
-    data = await articlecomment_service.vote_comment(comment_id, current_user)
     # return Response(status_code=status.HTTP_204_NO_CONTENT)
     return data
\ No newline at end of file
@@ -0,0 +1,24 @@
+import os
+
+from fastapi import APIRouter, Depends
+
+from app.core.database import db_pool_stats
+from app.core.redis import redis_stats
+from app.core.settings import ADMINS
+from app.dependencies.auth import allow_usernames
+
+"""prefix="/apis/ops"
+운영 확인용 지표 (관리자만). gunicorn worker마다 따로 쌓이므로 응답한 worker의 pid를 함께 돌려준다.
+"""
+
+router = APIRouter()
+
+
+@router.get("/redis-stats", summary="Redis 풀/circuit/명령별 지표 (응답한 worker 기준)")
+async def get_redis_stats(admin_user=Depends(allow_usernames(ADMINS))):
+    return {"pid": os.getpid(), **redis_stats()}
+
+
+@router.get("/db-pool-stats", summary="DB 커넥션 풀 사용량/대기 시간 히스토그램/요청당 연결 수 (응답한 worker 기준)")
+async def get_db_pool_stats(admin_user=Depends(allow_usernames(ADMINS))):
+    return {"pid": os.getpid(), **db_pool_stats()}
@@ -1,22 +1,28 @@
-from typing import List
+from typing import List, Optional
 
-from fastapi import status, UploadFile, Depends, APIRouter, Body, File, HTTPException
+from fastapi import status, UploadFile, Depends, APIRouter, Body, File, HTTPException, Request, Header
 
-from app.core.database import ARTICLE_EDITOR_USER_VIDEO_UPLOAD_DIR, ARTICLE_EDITOR_USER_IMG_UPLOAD_DIR, ARTICLE_COMMENT_EDITOR_USER_IMG_UPLOAD_DIR, ARTICLE_COMMENT_EDITOR_USER_VIDEO_UPLOAD_DIR
 from app.dependencies.auth import get_current_user
+from app.dependencies.rate_limit import RateLimit
 from app.models.users import User
-from app.utils.commons import file_write_return_url
+from app.schemas.medias import VideoUploadInit, VideoUploadStatus
+from app.services.media_service import MediaBlobStore, get_media_blob_store
+from app.utils.uploads import ResumableVideoUpload
 from app.utils.wysiwyg import redis_add, redis_rem
 
 router = APIRouter()
 """prefix="/apis/wysiwyg"""
 
-@router.post("/article/image/upload")
+# 에디터 파일 업로드(단일 업로드, 이어받기 업로드 시작): 회원당 1분에 30개 (청크 PUT/상태 조회는 제한하지 않는다)
+_upload_rate_limit = RateLimit("editor_upload", limit=30, window=60, per="user")
+
+@router.post("/article/image/upload", dependencies=[Depends(_upload_rate_limit)])
 async def article_image_upload(imagefile: UploadFile,
-                       current_user: User = Depends(get_current_user)):
+                       current_user: User = Depends(get_current_user),
+                       media_blob_store: MediaBlobStore = Depends(get_media_blob_store)):
     try:
-        upload_dir = f'{ARTICLE_EDITOR_USER_IMG_UPLOAD_DIR}' + '/' + f'{current_user.id}' + '/'  # d/t Linux
-        url = await file_write_return_url(upload_dir, current_user, imagefile, "app", _type="image")
+        # 내용 주소 저장: 같은 파일은 한번만 저장되고 항상 같은 URL (회원별 폴더 대신 공용 blob 폴더)
+        url = await media_blob_store.store_upload(imagefile, _type="image")
         return {"url": url}
 
     except Exception as e:
@@ -25,12 +31,13 @@ async def article_image_upload(imagefile: UploadFile,
                             detail="에디터의 이미지 파일이 제대로 Upload되지 않았습니다. ")
 
 
-@router.post("/article/video/upload")
+@router.post("/article/video/upload", dependencies=[Depends(_upload_rate_limit)])
 async def article_video_upload(videofile: UploadFile = File(...),
-                       current_user: User = Depends(get_current_user)):
+                       current_user: User = Depends(get_current_user),
+                       media_blob_store: MediaBlobStore = Depends(get_media_blob_store)):
     try:
-        upload_dir = f'{ARTICLE_EDITOR_USER_VIDEO_UPLOAD_DIR}' + '/' + f'{current_user.id}' + '/'  # d/t Linux
-        url = await file_write_return_url(upload_dir, current_user, videofile, "app", _type="video")
+        # 내용 주소 저장: 같은 파일은 한번만 저장되고 항상 같은 URL (회원별 폴더 대신 공용 blob 폴더)
+        url = await media_blob_store.store_upload(videofile, _type="video")
         return {"url": url}
     except Exception as e:
         print("upload_video error:::", e)
@@ -38,12 +45,13 @@ async def article_video_upload(videofile: UploadFile = File(...),
                             detail="에디터의 동영상 파일이 제대로 Upload되지 않았습니다. ")
 
 
-@router.post("/article/comment/image/upload")
+@router.post("/article/comment/image/upload", dependencies=[Depends(_upload_rate_limit)])
 async def article_comment_image_upload(imagefile: UploadFile,
-                       current_user: User = Depends(get_current_user)):
+                       current_user: User = Depends(get_current_user),
+                       media_blob_store: MediaBlobStore = Depends(get_media_blob_store)):
     try:
-        upload_dir = f'{ARTICLE_COMMENT_EDITOR_USER_IMG_UPLOAD_DIR}' + '/' + f'{current_user.id}' + '/'  # d/t Linux
-        url = await file_write_return_url(upload_dir, current_user, imagefile, "app", _type="image")
+        # 내용 주소 저장: 같은 파일은 한번만 저장되고 항상 같은 URL (회원별 폴더 대신 공용 blob 폴더)
+        url = await media_blob_store.store_upload(imagefile, _type="image")
         return {"url": url}
 
     except Exception as e:
@@ -52,12 +60,13 @@ async def article_comment_image_upload(imagefile: UploadFile,
                             detail="에디터의 이미지 파일이 제대로 Upload되지 않았습니다. ")
 
 
-@router.post("/article/comment/video/upload")
+@router.post("/article/comment/video/upload", dependencies=[Depends(_upload_rate_limit)])
 async def article_comment_video_upload(videofile: UploadFile = File(...),
-                       current_user: User = Depends(get_current_user)):
+                       current_user: User = Depends(get_current_user),
+                       media_blob_store: MediaBlobStore = Depends(get_media_blob_store)):
     try:
-        upload_dir = f'{ARTICLE_COMMENT_EDITOR_USER_VIDEO_UPLOAD_DIR}' + '/' + f'{current_user.id}' + '/'  # d/t Linux
-        url = await file_write_return_url(upload_dir, current_user, videofile, "app", _type="video")
+        # 내용 주소 저장: 같은 파일은 한번만 저장되고 항상 같은 URL (회원별 폴더 대신 공용 blob 폴더)
+        url = await media_blob_store.store_upload(videofile, _type="video")
         return {"url": url}
     except Exception as e:
         print("upload_video error:::", e)
@@ -65,6 +74,41 @@ async def article_comment_video_upload(videofile: UploadFile = File(...),
                             detail="에디터의 동영상 파일이 제대로 Upload되지 않았습니다. ")
 
 
+#############################################################################################################
+""" 동영상 이어받기(resumable) 업로드: init -> 청크 PUT (offset) 반복 -> finalize
+청크를 업로드 파일에 바로 쓰므로 multipart 임시 파일을 거치지 않는다. 청크마다 sha256(X-Chunk-SHA256)을 확인한다. (app/utils/uploads.py)
+게시글/댓글 모두 같은 blob 폴더에 저장되므로 같은 핸들러를 쓴다."""
+@router.post("/article/video/upload/init", response_model=VideoUploadStatus, dependencies=[Depends(_upload_rate_limit)])
+@router.post("/article/comment/video/upload/init", response_model=VideoUploadStatus, dependencies=[Depends(_upload_rate_limit)])
+async def video_upload_init(upload_in: VideoUploadInit,
+                            current_user: User = Depends(get_current_user)):
+    return await ResumableVideoUpload.create(current_user.id, upload_in.filename, upload_in.size, upload_in.sha256)
+
+
+@router.get("/article/video/upload/{upload_id}", response_model=VideoUploadStatus)
+@router.get("/article/comment/video/upload/{upload_id}", response_model=VideoUploadStatus)
+async def video_upload_status(upload_id: str,
+                              current_user: User = Depends(get_current_user)):
+    return await ResumableVideoUpload.status(upload_id, current_user.id)
+
+
+@router.put("/article/video/upload/{upload_id}", response_model=VideoUploadStatus)
+@router.put("/article/comment/video/upload/{upload_id}", response_model=VideoUploadStatus)
+async def video_upload_append(upload_id: str, offset: int, request: Request,
+                              chunk_sha256: Optional[str] = Header(None, alias="X-Chunk-SHA256"),
+                              current_user: User = Depends(get_current_user)):
+    return await ResumableVideoUpload.append(upload_id, current_user.id, offset, request.stream(), chunk_sha256)
+
+
+@router.post("/article/video/upload/{upload_id}/finalize")
+@router.post("/article/comment/video/upload/{upload_id}/finalize")
+async def video_upload_finalize(upload_id: str,
+                                current_user: User = Depends(get_current_user),
+                                media_blob_store: MediaBlobStore = Depends(get_media_blob_store)):
+    url = await ResumableVideoUpload.finalize(upload_id, current_user.id, media_blob_store)
+    return {"url": url}
+
+
 #############################################################################################################
 @router.post("/mark_delete_images/{mark_id}")
 async def mark_delete_images(mark_id: int, srcs: List[str] = Body(...)):
@@ -1,10 +1,16 @@
+import bisect
 import os
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
 from datetime import datetime, timezone
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Optional
 
-from sqlalchemy import Integer, DateTime
+from sqlalchemy import Integer, DateTime, event, exc
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
-from sqlalchemy.orm import declarative_base, Mapped, mapped_column
+from sqlalchemy.orm import declarative_base, Mapped, mapped_column, Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.sql.dml import UpdateBase
 
 from app.core.settings import CONFIG, MEDIA_DIR
 
@@ -15,19 +21,78 @@ ARTICLE_EDITOR_USER_VIDEO_UPLOAD_DIR = os.path.join(MEDIA_DIR, CONFIG.ARTICLE_ED
 
 ARTICLE_COMMENT_EDITOR_USER_IMG_UPLOAD_DIR = os.path.join(MEDIA_DIR, CONFIG.ARTICLE_COMMENT_EDITOR_USER_IMG_DIR)
 ARTICLE_COMMENT_EDITOR_USER_VIDEO_UPLOAD_DIR = os.path.join(MEDIA_DIR, CONFIG.ARTICLE_COMMENT_EDITOR_USER_VIDEO_DIR)
+EDITOR_MEDIA_BLOB_UPLOAD_DIR = os.path.join(MEDIA_DIR, CONFIG.EDITOR_MEDIA_BLOB_DIR)
 
 DATABASE_URL = f"{CONFIG.DB_TYPE}+{CONFIG.DB_DRIVER}://{CONFIG.DB_USER}:{CONFIG.DB_PASSWORD}@{CONFIG.DB_HOST}:{CONFIG.DB_PORT}/{CONFIG.DB_NAME}?charset=utf8mb4"
-ASYNC_ENGINE = create_async_engine(DATABASE_URL,
-                                   echo=CONFIG.DEBUG,
-                                   future=True,
-                                   pool_size=10, max_overflow=0, pool_recycle=300,  # 5분마다 연결 재활용
-                                   # encoding="utf-8"
-                                   )
+# 읽기 전용 replica (DB_REPLICA_HOST가 없으면 모든 쿼리가 primary로 간다)
+REPLICA_DATABASE_URL = (f"{CONFIG.DB_TYPE}+{CONFIG.DB_DRIVER}://{CONFIG.DB_USER}:{CONFIG.DB_PASSWORD}"
+                        f"@{CONFIG.DB_REPLICA_HOST}:{CONFIG.DB_REPLICA_PORT or CONFIG.DB_PORT}/{CONFIG.DB_NAME}?charset=utf8mb4"
+                        if CONFIG.DB_REPLICA_HOST else None)
+
+POOL_WAIT_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000, 5000)  # 커넥션 대기 시간 히스토그램 구간 (ms 이하)
+db_pool_wait_stats = {"checkouts": 0, "timeouts": 0, "wait_seconds": 0.0,
+                      "histogram": [0] * (len(POOL_WAIT_BUCKETS_MS) + 1)}  # worker별 누적, 마지막 칸은 5000ms 초과
+
+
+class TimedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """풀에서 커넥션을 꺼낼 때까지 기다린 시간을 db_pool_wait_stats에 기록하는 풀
+    DB_POOL_TIMEOUT 안에 빈 커넥션이 없으면 sqlalchemy.exc.TimeoutError (exc_handler에서 503)"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            db_pool_wait_stats["timeouts"] += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            db_pool_wait_stats["wait_seconds"] += waited
+            db_pool_wait_stats["histogram"][bisect.bisect_left(POOL_WAIT_BUCKETS_MS, waited * 1000)] += 1
+        db_pool_wait_stats["checkouts"] += 1
+        return connection
+
+
+def create_engine_with_pool(pool_size: int = CONFIG.DB_POOL_SIZE, max_overflow: int = CONFIG.DB_MAX_OVERFLOW,
+                            url: str = DATABASE_URL):
+    """풀 설정은 Settings(DB_POOL_*)에서 읽는다. (maintenance db-pool-load-test는 크기만 바꿔서 만든다)
+    worker 프로세스마다 풀이 따로 생기므로 MySQL 연결 수는 최대 APP_WORKERS x (DB_POOL_SIZE + DB_MAX_OVERFLOW)"""
+    return create_async_engine(url,
+                               echo=CONFIG.DEBUG,
+                               future=True,
+                               poolclass=TimedAsyncQueuePool,
+                               pool_size=pool_size, max_overflow=max_overflow,
+                               pool_timeout=CONFIG.DB_POOL_TIMEOUT,  # 빈 커넥션을 기다리는 최대 시간 (넘으면 503)
+                               pool_recycle=CONFIG.DB_POOL_RECYCLE,  # 이 시간(초)이 지난 연결은 재활용
+                               pool_pre_ping=CONFIG.DB_POOL_PRE_PING,
+                               # encoding="utf-8"
+                               )
+
+
+ASYNC_ENGINE = create_engine_with_pool()
+REPLICA_ENGINE = create_engine_with_pool(url=REPLICA_DATABASE_URL) if REPLICA_DATABASE_URL else None
+
+
+class RoutingSession(Session):
+    """읽기 전용으로 표시된 세션(info["read_replica"])의 조회는 replica로, 나머지는 모두 primary로 보낸다.
+    표시는 요청 단위로 app/dependencies/database.py의 use_read_replica가 한다.
+    표시된 세션이라도 flush와 INSERT/UPDATE/DELETE 문은 primary로 가고, info["wrote"]에 기록된다. (read-your-writes 쿠키)
+    text()로 쓰는 쿼리는 구분하지 못하므로 replica 표시 라우트에서는 쓰지 않는다.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self._flushing or isinstance(clause, UpdateBase):
+            self.info["wrote"] = True
+        elif REPLICA_ENGINE is not None and self.info.get("read_replica"):
+            return REPLICA_ENGINE.sync_engine
+        return super().get_bind(mapper, clause=clause, **kw)
+
 
 # 세션 로컬 클래스 생성
 AsyncSessionLocal = async_sessionmaker(
     ASYNC_ENGINE,
     class_=AsyncSession,  # add
+    sync_session_class=RoutingSession,
     expire_on_commit=False,
     autocommit=False,
     autoflush=False,
@@ -57,7 +122,124 @@ class BaseModel(Base):
                                                  onupdate=lambda: datetime.now(timezone.utc))
 
 
+class RequestDBScope:
+    """요청 하나가 함께 쓰는 DB 세션 (RequestDBSessionMiddleware가 요청마다 만들고 닫는다)
+    미들웨어(토큰 리프레시), 의존성(get_db), 예외 핸들러가 모두 같은 세션을 받는다.
+    세션은 처음 필요할 때 만들고, 커넥션은 SQLAlchemy가 첫 쿼리 때 풀에서 꺼낸다. (DB를 안 쓰는 요청은 커넥션을 잡지 않는다)
+    checkouts/peak: 이 요청에서 풀에서 커넥션을 꺼낸 횟수 / 동시에 잡고 있던 최대 수 (1을 넘으면 세션이 2개 이상 쓰인 것)
+    """
+
+    def __init__(self):
+        self._session: Optional[AsyncSession] = None
+        self.checkouts = 0
+        self.in_use = 0
+        self.peak = 0
+
+    @property
+    def session(self) -> AsyncSession:
+        if self._session is None:
+            self._session = AsyncSessionLocal()
+        return self._session
+
+    @property
+    def wrote(self) -> bool:
+        """이 요청에서 primary에 쓰기(flush/DML)를 했는지: 응답에 read-your-writes 쿠키를 붙인다."""
+        return self._session is not None and bool(self._session.info.get("wrote"))
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+_request_db_scope: ContextVar[Optional[RequestDBScope]] = ContextVar("request_db_scope", default=None)
+db_checkout_stats = {"requests": 0, "checkouts": 0, "multi_connection_requests": 0}  # worker별 누적
+
+
+def current_db_scope() -> Optional[RequestDBScope]:
+    return _request_db_scope.get()
+
+
+@asynccontextmanager
+async def request_db_scope():
+    """요청 처리 전체를 감싸서 공유 세션을 열고, 끝나면 닫고 커넥션 사용 수를 기록한다."""
+    scope = RequestDBScope()
+    token = _request_db_scope.set(scope)
+    try:
+        yield scope
+    finally:
+        _request_db_scope.reset(token)
+        await scope.close()
+        db_checkout_stats["requests"] += 1
+        db_checkout_stats["checkouts"] += scope.checkouts
+        if scope.peak > 1:
+            db_checkout_stats["multi_connection_requests"] += 1
+            print(f"[db] 요청 하나가 커넥션을 동시에 {scope.peak}개 사용했습니다.")
+
+
+def _count_checkout(dbapi_connection, connection_record, connection_proxy):
+    scope = _request_db_scope.get()
+    if scope is not None:
+        scope.checkouts += 1
+        scope.in_use += 1
+        scope.peak = max(scope.peak, scope.in_use)
+
+
+def _count_checkin(dbapi_connection, connection_record):
+    scope = _request_db_scope.get()
+    if scope is not None and scope.in_use > 0:
+        scope.in_use -= 1
+
+
+for _engine in (ASYNC_ENGINE, REPLICA_ENGINE):
+    if _engine is not None:
+        event.listen(_engine.sync_engine.pool, "checkout", _count_checkout)
+        event.listen(_engine.sync_engine.pool, "checkin", _count_checkin)
+
+
+def _pool_usage(engine) -> dict:
+    pool = engine.sync_engine.pool
+    return {
+        "size": pool.size(),
+        "max_overflow": CONFIG.DB_MAX_OVERFLOW,
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "timeout_seconds": CONFIG.DB_POOL_TIMEOUT,
+    }
+
+
+def db_pool_stats() -> dict:
+    """운영 확인용: 풀 사용량(primary/replica), 커넥션 대기 시간 히스토그램(두 풀 합산), 요청당 커넥션 사용 수 (worker별)"""
+    histogram = db_pool_wait_stats["histogram"]
+    labels = [f"<={bucket}ms" for bucket in POOL_WAIT_BUCKETS_MS] + [f">{POOL_WAIT_BUCKETS_MS[-1]}ms"]
+    return {
+        "pool": _pool_usage(ASYNC_ENGINE),
+        "replica_pool": _pool_usage(REPLICA_ENGINE) if REPLICA_ENGINE is not None else None,
+        "wait": {
+            "checkouts": db_pool_wait_stats["checkouts"],
+            "timeouts": db_pool_wait_stats["timeouts"],
+            "wait_seconds": round(db_pool_wait_stats["wait_seconds"], 3),
+            "histogram": dict(zip(labels, histogram)),
+        },
+        "requests": dict(db_checkout_stats),
+    }
+
+
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
+    # 요청 처리 중이면 요청 공유 세션 (닫기는 RequestDBSessionMiddleware가 한다)
+    scope = _request_db_scope.get()
+    if scope is not None:
+        session = scope.session
+        try:
+            yield session
+        except Exception as e:
+            print(f"Session rollback triggered due to exception: {e}")
+            await session.rollback()
+            raise
+        return
+
+    # 스케줄러/스크립트 등 요청 밖에서는 호출마다 새 세션
     session: AsyncSession = AsyncSessionLocal()
     print(f"[get_session] new session: {id(session)}")
     try:
@@ -68,4 +250,4 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
         raise
     finally:
         print(f"[get_session] close session: {id(session)}")
-        await session.close()
\ No newline at end of file
+        await session.close()
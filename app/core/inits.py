@@ -1,26 +1,37 @@
+import asyncio
+import contextlib
 from contextlib import asynccontextmanager
+from datetime import datetime
 
 import pytz
 import redis
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi_csrf_jinja.middleware import FastAPICSRFJinjaMiddleware
+from sqlalchemy.exc import TimeoutError as DBPoolTimeoutError
 from starlette.exceptions import HTTPException as StarletteHTTPException
 
 from app.apis import accounts as apis_accounts
 from app.apis.articles import articles as apis_articles
 from app.apis.articles import comments as apis_articles_comments
 from app.apis import auth as apis_auth
+from app.apis import ops as apis_ops
 from app.apis import wysiwyg as apis_wysiwyg
 from app.core.database import ASYNC_ENGINE
 from app.core.redis import get_redis_client
 from app.core.settings import STATIC_DIR, MEDIA_DIR, CONFIG, templates
+from app.services.token_service import AsyncTokenService, BLACKLIST_BLOOM_REBUILD_INTERVAL
 from app.utils import exc_handler
+from app.utils.accounts import shutdown_password_executor
 from app.utils.apschedulers import scheduler, scheduled_lotto_update
+from app.utils.email_outbox import run_email_sender
+from app.utils.images import image_variant_path, shutdown_image_process_pool
+from app.utils.media_gc import scheduled_media_gc
 from app.utils.commons import to_kst, num_format, urlencode_filter, get_kst
-from app.utils.middleware import AccessTokenSetCookieMiddleware
+from app.utils.middleware import AccessTokenSetCookieMiddleware, RequestDBSessionMiddleware, VideoChunkSizeLimitMiddleware
 from app.views import index
 from app.views import accounts as views_accounts
 from app.views import articles as views_articles
@@ -39,8 +50,28 @@ async def lifespan(app: FastAPI):
         id='lotto_update_job',
         replace_existing=True
     )
+    scheduler.add_job(
+        scheduled_media_gc,
+        IntervalTrigger(seconds=CONFIG.MEDIA_GC_INTERVAL_SECONDS),  # 에디터 미디어 삭제 후보 정리
+        id='media_gc_job',
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True,
+    )
+    scheduler.add_job(
+        AsyncTokenService.rebuild_blacklist_bloom,
+        IntervalTrigger(seconds=BLACKLIST_BLOOM_REBUILD_INTERVAL),  # 블랙리스트 Bloom filter: 시작할 때 + 매시간 다시 만들기
+        id='blacklist_bloom_rebuild_job',
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True,
+        next_run_time=datetime.now(KST),
+    )
     scheduler.start()
     print("Starting Scheduler......")
+    print(f"DB pool: worker당 {CONFIG.DB_POOL_SIZE}(+{CONFIG.DB_MAX_OVERFLOW}), "
+          f"전체 최대 {CONFIG.APP_WORKERS * (CONFIG.DB_POOL_SIZE + CONFIG.DB_MAX_OVERFLOW)} 연결, "
+          f"대기 {CONFIG.DB_POOL_TIMEOUT}초 초과 시 503")
 
     try:
         redis_client = get_redis_client()
@@ -48,8 +79,13 @@ async def lifespan(app: FastAPI):
         print("Redis connection established......")
     except redis.exceptions.ConnectionError:
         print("Failed to connect to Redis......")
+    email_sender = asyncio.create_task(run_email_sender()) if CONFIG.EMAIL_OUTBOX_SENDER else None  # 이메일 발송 대기열
     print("Starting up...")
     yield
+    if email_sender is not None:
+        email_sender.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await email_sender
     # FastAPI 인스턴스 종료시 필요한 작업 수행
     redis_client = get_redis_client()
     await redis_client.aclose()
@@ -57,6 +93,8 @@ async def lifespan(app: FastAPI):
     print("Shutting down...")
     await ASYNC_ENGINE.dispose()
     scheduler.shutdown()
+    shutdown_image_process_pool()
+    shutdown_password_executor()
 
 
 def including_middleware(app):
@@ -81,10 +119,14 @@ def including_middleware(app):
     """ AccessTokenSetCookieMiddleware: access_token이 만료되면, 
     get_current_user 리프레시로 폴백하면서 액세스토큰을 만들때 가로채서 쿠키에 심는다."""
     app.add_middleware(AccessTokenSetCookieMiddleware)
+    app.add_middleware(RequestDBSessionMiddleware)  # 요청 하나에 DB 세션 하나
+    app.add_middleware(VideoChunkSizeLimitMiddleware)  # 마지막에 추가 = 가장 바깥: CSRF 미들웨어가 본문을 읽기 전에 청크 크기 확인
 
 def including_exception_handler(app):
     app.add_exception_handler(StarletteHTTPException,
                               exc_handler.custom_http_exception_handler)
+    app.add_exception_handler(DBPoolTimeoutError,
+                              exc_handler.db_pool_timeout_handler)  # DB 커넥션 풀 대기 초과: 503
 
 def including_router(app):
     app.include_router(index.router, prefix="", tags=["IndexViews"])
@@ -94,6 +136,7 @@ def including_router(app):
     app.include_router(apis_articles.router, prefix="/apis/articles", tags=["ArticlesAPI"])
     app.include_router(apis_articles_comments.router, prefix="/apis/articles/comments", tags=["ArticlesCommentsAPI"])
     app.include_router(apis_wysiwyg.router, prefix="/apis/wysiwyg", tags=["WysiwygAPI"])
+    app.include_router(apis_ops.router, prefix="/apis/ops", tags=["OpsAPI"])
     app.include_router(views_accounts.router, prefix="/views/accounts", tags=["AccountsViews"])
     app.include_router(views_articles.router, prefix="/views/articles", tags=["ArticlesViews"])
 
@@ -115,6 +158,7 @@ def initialize_app():
     templates.env.filters["to_kst"] = to_kst
     templates.env.filters["num_format"] = num_format
     templates.env.filters["urlencode"] = urlencode_filter
+    templates.env.filters["img_variant"] = image_variant_path
 
     including_middleware(app)
     including_exception_handler(app)
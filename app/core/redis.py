@@ -1,4 +1,11 @@
-from redis.asyncio import Redis, ConnectionPool
+import asyncio
+import time
+
+from redis.asyncio import Redis, BlockingConnectionPool
+from redis.asyncio.client import Pipeline
+from redis.asyncio.retry import Retry
+from redis.backoff import ExponentialWithJitterBackoff
+from redis.exceptions import ConnectionError as RedisConnectionError, TimeoutError as RedisTimeoutError, RedisError
 
 from app.core.settings import CONFIG
 
@@ -25,26 +32,149 @@ db = CONFIG.REDIS_DB if CONFIG.APP_ENV == "production" else 0
 redis_pool = None
 redis_client = None
 
+# circuit이 열려 있을 때 던지는 예외. ConnectionError의 하위 클래스라서 Redis 장애를 이미 처리하는 곳은 그대로 동작한다.
+class RedisCircuitOpenError(RedisConnectionError):
+    pass
+
+
+class RedisCircuitBreaker:
+    """worker별 circuit breaker
+    연속 REDIS_BREAKER_FAILURES 번 연결 오류/타임아웃이면 REDIS_BREAKER_COOLDOWN_SECONDS 동안 Redis를 호출하지 않고 바로 실패시킨다.
+    (요청마다 socket_timeout 만큼 기다리지 않게 해서, 캐시/블랙리스트/미디어 추적처럼 Redis 없이도 되는 기능은 바로 우회한다.)
+    cooldown이 지나면 호출 1번을 통과시켜(half-open) 성공하면 닫는다.
+    """
+    failures = 0
+    opened_until = 0.0
+    half_open = False
+
+    @classmethod
+    def before_call(cls) -> bool:
+        """통과시키면 이번 호출이 복구 확인(half-open) 호출인지 돌려준다."""
+        if cls.opened_until == 0.0:
+            return False
+        if cls.half_open or time.monotonic() < cls.opened_until:
+            raise RedisCircuitOpenError("Redis circuit open")
+        cls.half_open = True  # cooldown 지남: 이번 호출로 복구 확인
+        return True
+
+    @classmethod
+    def record_success(cls) -> None:
+        if cls.opened_until:
+            print("Redis circuit closed......")
+        cls.failures = 0
+        cls.opened_until = 0.0
+        cls.half_open = False
+
+    @classmethod
+    def record_failure(cls) -> None:
+        cls.failures += 1
+        if cls.half_open or cls.failures >= CONFIG.REDIS_BREAKER_FAILURES:
+            if not cls.opened_until or cls.half_open:
+                print(f"Redis circuit open: {CONFIG.REDIS_BREAKER_COOLDOWN_SECONDS}초 동안 Redis 호출 차단")
+            cls.opened_until = time.monotonic() + CONFIG.REDIS_BREAKER_COOLDOWN_SECONDS
+            cls.half_open = False
+
+
+# 명령별 지표: {"GET": {"calls": 0, "errors": 0, "rejected": 0, "seconds": 0.0}, ...}
+redis_command_stats: dict[str, dict] = {}
+
+
+def _record(name: str, started: float, outcome: str) -> None:
+    stats = redis_command_stats.get(name)
+    if stats is None:
+        stats = redis_command_stats[name] = {"calls": 0, "errors": 0, "rejected": 0, "seconds": 0.0}
+    stats["calls"] += 1
+    if outcome != "ok":
+        stats[outcome] += 1
+    stats["seconds"] += time.perf_counter() - started
+
+
+async def _guarded(name: str, call):
+    """모든 Redis 호출이 지나가는 곳: circuit 확인 -> 실행(재시도는 연결의 Retry가 담당) -> 지표 기록"""
+    started = time.perf_counter()
+    try:
+        probe = RedisCircuitBreaker.before_call()
+    except RedisCircuitOpenError:
+        _record(name, started, "rejected")
+        raise
+    try:
+        result = await call()
+    except (RedisConnectionError, RedisTimeoutError) as e:
+        if not isinstance(e.__cause__, asyncio.TimeoutError):  # 풀 대기 시간 초과(부하)는 Redis 장애로 보지 않는다.
+            RedisCircuitBreaker.record_failure()
+        _record(name, started, "errors")
+        raise
+    except RedisError:
+        # ResponseError/WRONGTYPE 등 서버가 응답한 오류: Redis는 살아 있으므로 성공으로 센다.
+        RedisCircuitBreaker.record_success()
+        _record(name, started, "errors")
+        raise
+    finally:
+        # 복구 확인 호출이 결과 없이 끝나면(CancelledError 등) half-open을 풀어서 다음 호출이 다시 확인하게 한다.
+        # (그대로 두면 이 worker는 Redis 호출을 영원히 차단한다)
+        if probe and RedisCircuitBreaker.half_open:
+            RedisCircuitBreaker.half_open = False
+    RedisCircuitBreaker.record_success()
+    _record(name, started, "ok")
+    return result
+
+
+class ResilientPipeline(Pipeline):
+    async def execute(self, raise_on_error: bool = True):
+        return await _guarded("PIPELINE", lambda: super(ResilientPipeline, self).execute(raise_on_error))
+
+
+class ResilientRedis(Redis):
+    async def execute_command(self, *args, **options):
+        return await _guarded(str(args[0]).upper(), lambda: super(ResilientRedis, self).execute_command(*args, **options))
+
+    def pipeline(self, transaction: bool = True, shard_hint=None) -> ResilientPipeline:
+        return ResilientPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
+def redis_stats() -> dict:
+    """운영 확인용: 풀 사용량, circuit 상태, 명령별 지표"""
+    pool = redis_pool
+    return {
+        "pool": {
+            "max_connections": CONFIG.REDIS_MAX_CONNECTIONS,
+            "in_use": len(pool._in_use_connections) if pool is not None else 0,
+            "idle": len(pool._available_connections) if pool is not None else 0,
+        },
+        "circuit": {
+            "open": bool(RedisCircuitBreaker.opened_until),
+            "consecutive_failures": RedisCircuitBreaker.failures,
+        },
+        "commands": {name: dict(stats) for name, stats in redis_command_stats.items()},
+    }
+
+
 def get_redis_pool():
     """각 worker 프로세스마다 독립적인 connection pool 생성
 
     gunicorn의 여러 worker 프로세스 간 Redis 연결 공유 문제 해결:
     - asyncio 기반 Redis 클라이언트는 프로세스 간 공유 불가
     - 각 worker가 자체 연결 풀을 생성하도록 lazy initialization 적용
+
+    BlockingConnectionPool: 연결이 모두 사용 중이면 바로 "Too many connections" 오류 대신 REDIS_POOL_TIMEOUT 만큼 기다린다.
+    끊어진 연결은 풀이 다시 연결하고, 연결 오류/타임아웃은 지수 backoff + jitter로 REDIS_RETRIES 번 재시도한다.
     """
     global redis_pool
     if redis_pool is None:
-        redis_pool = ConnectionPool(
+        redis_pool = BlockingConnectionPool(
             host=host,
             port=port,
             db=db,
             password=password,
             decode_responses=True,
-            max_connections=10,
+            max_connections=CONFIG.REDIS_MAX_CONNECTIONS,
+            timeout=CONFIG.REDIS_POOL_TIMEOUT,
             socket_keepalive=True,
             socket_connect_timeout=5,
             socket_timeout=5,
-            retry_on_timeout=True,
+            retry=Retry(ExponentialWithJitterBackoff(cap=0.5, base=0.02), CONFIG.REDIS_RETRIES),
+            retry_on_error=[RedisConnectionError, RedisTimeoutError],
+            health_check_interval=30,
         )
     return redis_pool
 
@@ -54,8 +184,10 @@ def get_redis_client():
     사용법:
         redis_client = get_redis_client()
         await redis_client.set("key", "value")
+
+    모든 명령과 pipeline은 circuit breaker와 명령별 지표(redis_stats)를 거친다.
     """
     global redis_client
     if redis_client is None:
-        redis_client = Redis(connection_pool=get_redis_pool())
+        redis_client = ResilientRedis(connection_pool=get_redis_pool())
     return redis_client
@@ -72,6 +72,14 @@ class Settings(BaseSettings):
     SMTP_PASSWORD: str
     SMTP_PORT: int  # = int(os.getenv("SMTP_PORT", 587))
     SMTP_HOST: str  # = os.getenv("SMTP_HOST", "smtp.gmail.com")
+    SMTP_STARTTLS: bool = True  # 로컬 테스트용 SMTP 서버(aiosmtpd 등)는 False
+    SMTP_VALIDATE_CERTS: bool = True
+
+    # 이메일 발송 대기열 (app/utils/email_outbox.py)
+    EMAIL_OUTBOX_SENDER: bool = True  # 이 프로세스에서 백그라운드 발송 작업을 실행할지
+    EMAIL_OUTBOX_BATCH_SIZE: int = 20  # 한번에 꺼내서 같은 SMTP 연결로 보낼 메일 수
+    EMAIL_OUTBOX_MAX_ATTEMPTS: int = 5  # 이 횟수만큼 실패하면 failed
+    EMAIL_OUTBOX_SMTP_IDLE_SECONDS: int = 60  # 보낼 메일이 없을 때 SMTP 연결을 유지하는 시간
 
     # 액세스/리프페시 토큰
     ACCESS_COOKIE_NAME: str
@@ -89,6 +97,58 @@ class Settings(BaseSettings):
     ARTICLE_EDITOR_USER_VIDEO_DIR: str
     ARTICLE_COMMENT_EDITOR_USER_IMG_DIR: str
     ARTICLE_COMMENT_EDITOR_USER_VIDEO_DIR: str
+    EDITOR_MEDIA_BLOB_DIR: str = "editor/blobs"  # 에디터 업로드 파일(내용 주소 저장, 게시글/댓글 공용)
+    IMAGE_PROCESS_WORKERS: int = 2  # 썸네일/프로필 이미지 파생본 생성 프로세스 수 (app/utils/images.py)
+
+    # 에디터 동영상 이어받기(resumable) 업로드 (app/utils/uploads.py)
+    VIDEO_UPLOAD_CHUNK_BYTES: int = 8 * 1024 * 1024  # 클라이언트에 알려주는 청크 크기
+    VIDEO_UPLOAD_MAX_BYTES: int = 2 * 1024 * 1024 * 1024  # 동영상 1개 최대 크기
+    VIDEO_UPLOAD_SESSION_TTL_SECONDS: int = 60 * 60  # 마지막 청크 이후 이 시간이 지나면 버려진 업로드로 보고 정리
+
+    # 에디터 미디어 GC (app/utils/media_gc.py)
+    MEDIA_GC_INTERVAL_SECONDS: int = 60  # 스케줄 실행 간격
+    MEDIA_GC_BATCH_SIZE: int = 200  # 한 배치에서 확인/삭제할 후보 수
+    MEDIA_GC_GRACE_SECONDS: int = 60  # 후보로 등록된 뒤 이 시간이 지나야 삭제 (저장 트랜잭션과 경합 방지)
+    MEDIA_GC_ORPHAN_SECONDS: int = 60 * 60 * 24  # 업로드 후 이 시간 동안 어디에도 저장되지 않은 파일은 GC 대상
+
+    # DB 커넥션 풀 (app/core/database.py): worker 프로세스마다 풀이 따로 생긴다.
+    # APP_WORKERS x (DB_POOL_SIZE + DB_MAX_OVERFLOW) <= MySQL max_connections (여유분 남기기)
+    # 크기는 python -m app.utils.maintenance db-pool-load-test 로 정한다.
+    APP_WORKERS: int = 9  # gunicorn worker 수 (Dockerfile -w): 연결 총량 계산용
+    DB_POOL_SIZE: int = 10  # worker당 유지하는 연결 수
+    DB_MAX_OVERFLOW: int = 0  # 몰릴 때 잠깐 더 여는 연결 수
+    DB_POOL_TIMEOUT: float = 3.0  # 초: 빈 연결을 기다리는 최대 시간 (넘으면 대기열에 쌓지 않고 바로 503)
+    DB_POOL_RECYCLE: int = 300  # 초: 이 시간이 지난 연결은 다시 연결 (MySQL wait_timeout보다 짧게)
+    DB_POOL_PRE_PING: bool = False  # 꺼낼 때마다 연결 확인 (왕복 1번 추가)
+
+    # 읽기 전용 replica (app/core/database.py RoutingSession): 게시판 목록/상세, 로또 페이지의 조회만 보낸다.
+    # replica도 worker마다 같은 크기의 풀을 가진다. 비워 두면 모두 primary.
+    DB_REPLICA_HOST: Optional[str] = None
+    DB_REPLICA_PORT: Optional[str] = None  # 비워 두면 DB_PORT
+    DB_PRIMARY_COOKIE_NAME: str = "db_primary"  # 쓰기 직후 이 쿠키가 있는 동안은 조회도 primary (read-your-writes)
+    DB_READ_YOUR_WRITES_SECONDS: int = 5  # 쿠키 유지 시간: replica 복제 지연보다 길게
+
+    # Redis 연결 (app/core/redis.py): worker 프로세스마다 풀이 따로 생긴다. (worker 수 x MAX_CONNECTIONS <= Redis maxclients)
+    REDIS_MAX_CONNECTIONS: int = 50  # worker당 최대 연결 수
+    REDIS_POOL_TIMEOUT: float = 2.0  # 초: 풀이 모두 사용 중일 때 빈 연결을 기다리는 시간
+    REDIS_RETRIES: int = 3  # 연결 오류/타임아웃 재시도 횟수 (지수 backoff + jitter)
+    REDIS_BREAKER_FAILURES: int = 5  # 연속 실패가 이만큼이면 circuit을 열고 Redis 호출을 바로 실패시킨다.
+    REDIS_BREAKER_COOLDOWN_SECONDS: float = 10.0  # circuit이 열려 있는 시간 (이후 호출 1번으로 복구 확인)
+
+    # 비밀번호 해시 (app/utils/accounts.py): 바꾸면 기존 해시는 다음 로그인 때 다시 해시된다.
+    PASSWORD_HASH_SCHEME: str = "bcrypt"  # "bcrypt" | "argon2"
+    PASSWORD_BCRYPT_ROUNDS: int = 12  # python -m app.utils.maintenance calibrate-password-hash 로 정한다.
+    PASSWORD_HASH_TARGET_MS: int = 250  # 해시 1번에 쓸 시간 목표 (calibrate-password-hash 기준)
+
+    # 비밀번호 해시/검증 전용 실행기 (app/utils/accounts.py)
+    PASSWORD_HASH_EXECUTOR: str = "thread"  # "thread" | "process"
+    PASSWORD_HASH_WORKERS: int = 2  # worker 프로세스당 동시에 계산하는 수
+    PASSWORD_HASH_MAX_PENDING: int = 16  # 실행 중 + 대기 중 최대 수 (넘으면 기다렸다가 439)
+    PASSWORD_HASH_ADMISSION_TIMEOUT: float = 2.0  # 초: 자리가 나기를 기다리는 최대 시간
+
+    RATE_LIMIT_ENABLED: bool = True  # 로그인/인증코드/업로드 요청 제한 (app/dependencies/rate_limit.py)
+    # X-Forwarded-For를 믿을 프록시 주소 (쉼표로 구분, "*"는 모두). unix socket으로 붙은 프록시는 항상 믿는다.
+    FORWARDED_ALLOW_IPS: str = "127.0.0.1,::1"
 
     ORIGINS: List[str] = Field(default_factory=list)
 
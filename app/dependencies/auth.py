@@ -12,6 +12,7 @@ from app.core.settings import CONFIG
 from app.models.users import User
 from app.services.auth_service import AuthService
 from app.utils.auth import payload_to_user
+from app.utils.commons import refresh_expire
 from app.utils.cookies import compute_cookie_attrs
 
 # 헤더는 선택적으로만 받도록 설정 (없어도 에러 발생 X)
@@ -70,6 +71,17 @@ async def get_current_user(
         path="/",
         max_age=ACCESS_COOKIE_MAX_AGE,
     )
+    new_refresh = token_payload.get(CONFIG.REFRESH_COOKIE_NAME)
+    if new_refresh:  # refresh_token 회전
+        response.set_cookie(
+            key=CONFIG.REFRESH_COOKIE_NAME,
+            value=new_refresh,
+            httponly=True,
+            secure=attrs["secure"],
+            samesite=attrs["samesite"],
+            path="/",
+            expires=refresh_expire(),
+        )
 
     user = await payload_to_user(new_access, db)
     return user
@@ -0,0 +1,19 @@
+from fastapi import Request
+
+from app.core.database import REPLICA_ENGINE, current_db_scope
+from app.core.settings import CONFIG
+
+"""
+읽기 전용 라우트의 조회를 replica로 보내는 의존성 (app/core/database.py RoutingSession)
+    @router.get("/all", dependencies=[Depends(use_read_replica)])
+라우트의 dependencies=[...]는 다른 파라미터 의존성보다 먼저 실행되므로, 요청 공유 세션의 첫 쿼리부터 replica로 간다.
+쓰기 직후(DB_PRIMARY_COOKIE_NAME 쿠키가 있는 동안)에는 primary에서 읽는다. (방금 쓴 글이 목록에 안 보이는 일이 없도록)
+"""
+
+
+async def use_read_replica(request: Request):
+    if REPLICA_ENGINE is None or request.cookies.get(CONFIG.DB_PRIMARY_COOKIE_NAME):
+        return
+    scope = current_db_scope()
+    if scope is not None:
+        scope.session.info["read_replica"] = True
@@ -0,0 +1,66 @@
+from typing import Optional
+
+from fastapi import Request
+
+from app.core.settings import CONFIG
+from app.utils.auth import verify_token
+from app.utils.exc_handler import CustomErrorException
+from app.utils.rate_limit import SlidingWindowRateLimiter
+
+"""
+요청 제한 의존성 (429 Too Many Requests == 439, Retry-After 헤더)
+    @router.post("/login", dependencies=[Depends(RateLimit("login", limit=10, window=60))])
+per="ip": 클라이언트 IP 기준, per="user": 로그인한 회원 기준(토큰이 없거나 만료되었으면 IP 기준)
+클라이언트 IP를 알 수 없으면 제한하지 않는다. (모든 요청이 한 키를 같이 쓰면 한 사람 때문에 전체가 막힌다)
+"""
+
+TRUSTED_PROXIES = {ip.strip() for ip in CONFIG.FORWARDED_ALLOW_IPS.split(",") if ip.strip()}
+
+
+def _client_ip(request: Request) -> Optional[str]:
+    """신뢰하는 프록시(FORWARDED_ALLOW_IPS, 또는 unix socket으로 붙은 로컬 nginx)를 거친 요청은 X-Forwarded-For에서,
+    오른쪽부터 신뢰하는 프록시가 아닌 첫 주소를 쓴다. (왼쪽 값은 클라이언트가 마음대로 넣을 수 있다)"""
+    peer = request.client.host if request.client else None  # unix socket이면 None
+    if peer is None or peer in TRUSTED_PROXIES or "*" in TRUSTED_PROXIES:
+        forwarded = [addr.strip() for addr in request.headers.get("x-forwarded-for", "").split(",") if addr.strip()]
+        for addr in reversed(forwarded):
+            if addr not in TRUSTED_PROXIES:
+                return addr
+    return peer
+
+
+def _token_user_id(request: Request) -> Optional[int]:
+    # 인증 의존성(get_current_user)보다 먼저 실행되므로 DB 조회 없이 토큰(검증 결과는 worker 캐시)만 본다.
+    auth = request.headers.get("authorization")
+    token = auth.split(" ", 1)[1].strip() if auth and auth.lower().startswith("bearer ") else None
+    if not token:
+        token = request.cookies.get(CONFIG.ACCESS_COOKIE_NAME)
+    payload = verify_token(token) if token else None
+    return payload.get("user_id") if payload else None
+
+
+class RateLimit:
+    def __init__(self, name: str, limit: int, window: int, per: str = "ip"):
+        self.name = name
+        self.limit = limit
+        self.window = window
+        self.per = per
+
+    async def __call__(self, request: Request):
+        if not CONFIG.RATE_LIMIT_ENABLED:
+            return
+        user_id = _token_user_id(request) if self.per == "user" else None
+        if user_id is not None:
+            identity = f"user:{user_id}"
+        else:
+            client_ip = _client_ip(request)
+            if client_ip is None:
+                print("요청 제한 생략: 클라이언트 IP를 알 수 없음 (FORWARDED_ALLOW_IPS/X-Forwarded-For 확인)", self.name)
+                return
+            identity = f"ip:{client_ip}"
+        retry_after = await SlidingWindowRateLimiter.hit(f"{self.name}:{identity}", self.limit, self.window)
+        if retry_after:
+            print("CustomErrorException STATUS_CODE: ", 439, "과도한 요청", self.name, identity)
+            raise CustomErrorException(status_code=439,
+                                       detail=f"과도한 요청: {retry_after}초 후에 다시 진행해 주세요",
+                                       headers={"Retry-After": str(retry_after)})
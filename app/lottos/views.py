@@ -9,6 +9,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.database import get_db
 from app.core.settings import templates, ADMINS
 from app.dependencies.auth import get_optional_current_user, allow_usernames
+from app.dependencies.database import use_read_replica
 from app.lottos.models import LottoNum, STATUS
 from app.lottos.utils import extract_latest_round, extract_first_win_num, latest_lotto, extract_frequent_num
 from app.models.users import User
@@ -19,7 +20,7 @@ from app.utils.exc_handler import CustomErrorException
 router = APIRouter()
 
 
-@router.get("/random")
+@router.get("/random", dependencies=[Depends(use_read_replica)])
 async def random_lotto(request: Request,
                        num: str = None,
                        db: AsyncSession = Depends(get_db),
@@ -121,7 +122,7 @@ async def random_lotto(request: Request,
 
 
 """# TOP10으로 로또번호를 추출하는 함수"""
-@router.get("/top10")
+@router.get("/top10", dependencies=[Depends(use_read_replica)])
 async def top10_lotto(request: Request,
                       num: str = None,
                       db: AsyncSession = Depends(get_db),
@@ -176,7 +177,7 @@ async def top10_lotto(request: Request,
     )
 
 
-@router.get("/win/extract")
+@router.get("/win/extract", dependencies=[Depends(use_read_replica)])
 async def win_extract_lotto(request: Request,
                             db: AsyncSession = Depends(get_db),
                             current_user: Optional[User] = Depends(get_optional_current_user)
@@ -1,6 +1,6 @@
 from typing import Optional
 
-from sqlalchemy import ForeignKey, Integer, String, func, Text, Boolean, select
+from sqlalchemy import ForeignKey, Integer, String, Text, Boolean, Index
 from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import relationship, Mapped, mapped_column, backref
 
@@ -20,27 +20,26 @@ class Article(BaseModel):
     # 외래키를 사용할 때, 제약 조건에 name을 ForeignKey 안에 ForeignKey("users.id", name="fk_author_id") 이렇게 넣어라.
     author_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id", name="article_author_id", ondelete='CASCADE'), nullable=False)
     # author_id가 nullable=True 이므로 Optional["User"]가 일관됩니다.
+    # 관계는 자동으로 로드하지 않는다(raise): 필요한 관계는 조회할 때 로딩 프로필로 지정한다. (app/services/articles/loading.py)
+    # raise_on_sql: 이미 세션에 올라와 있는 User면 SQL 없이 그대로 쓰고, SQL이 필요하면 예외
     author: Mapped["User"] = relationship("User", backref=backref("article_user",
-                                                                  lazy="selectin",
+                                                                  lazy="raise",
                                                                   cascade="all, delete-orphan",
-                                                                  passive_deletes=True), lazy="selectin")
+                                                                  passive_deletes=True), lazy="raise_on_sql")
 
-    # 1. 모델 관계에 비동기에서는 lazy='selectin' 기본 적용 안그러면 빙글빙글 돈다.
-    voter = relationship('User', secondary=article_voter, backref='article_voters', lazy="selectin")  # 1. 모델 관계에 lazy='selectin' 기본 적용 안그러면 빙글빙글 돈다.
+    # 좋아요 수는 vote_count 컬럼에 저장(투표/취소 시 UPDATE ... SET vote_count = vote_count ± 1)
+    # voter 목록은 더 이상 자동으로 로드하지 않는다: 글 하나 로드할 때마다 투표한 User 전체를 끌어오던 문제
+    # 투표 여부는 article_voter 테이블을 직접 조회한다. (ArticleService.get_vote_state)
+    voter = relationship('User', secondary=article_voter, backref=backref('article_voters', lazy="noload"), lazy="noload")
+    vote_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
 
     @hybrid_property
     def voter_count(self):
-        return len(self.voter)
+        return self.vote_count or 0
 
     @voter_count.expression
     def voter_count(cls):
-        return (
-            select(func.count(article_voter.c.user_id))
-            # lambda로 감싸나 안싸나 결과는 같음 (파이참의 정적 검사기 오류?)
-            .where(lambda: article_voter.c.article_id == cls.id)
-            .correlate(cls)
-            .scalar_subquery()
-        )
+        return cls.vote_count
 
     """ author 속성은 User 모델에서 Article 모델을 참조하기 위해 추가했다. 위와 같이 relationship으로 author(User) 속성을 생성하면,
     게시글 객체(예: article)에서 연결된 저자의 username 을 article.user.username 처럼 참조할 수 있다. 
@@ -84,32 +83,48 @@ class ArticleComment(BaseModel):
 
     author_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id", name="articlecomment_author_id", ondelete='CASCADE'), nullable=False)
     author: Mapped["User"] = relationship("User", backref=backref("articlecomment_user",
-                                                                  lazy="selectin",
+                                                                  lazy="raise",
                                                                   cascade="all, delete-orphan",
-                                                                  passive_deletes=True), lazy="selectin")
+                                                                  passive_deletes=True), lazy="raise_on_sql")
 
     article_id: Mapped[int] = mapped_column(Integer, ForeignKey("articles.id", name="fk_article_id", ondelete='CASCADE'), nullable=False)
     article: Mapped["Article"] = relationship("Article", backref=backref("articlecomments_all",
-                                                                         lazy="selectin",
+                                                                         lazy="raise",
                                                                          cascade="all, delete-orphan",
-                                                                         passive_deletes=True), lazy="selectin")
+                                                                         passive_deletes=True), lazy="raise_on_sql")
 
-    # 1. 모델 관계에 비동기에서는 lazy='selectin' 기본 적용 안그러면 빙글빙글 돈다.
-    voter = relationship('User', secondary=articlecomment_voter, backref='articlecomment_voters', lazy="selectin")
+    # Article과 같은 방식: 좋아요 수는 vote_count 컬럼, voter 목록은 자동 로드하지 않는다.
+    voter = relationship('User', secondary=articlecomment_voter, backref=backref('articlecomment_voters', lazy="noload"), lazy="noload")
+    vote_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
 
     @hybrid_property
     def voter_count(self):
-        return len(self.voter)
+        return self.vote_count or 0
 
     @voter_count.expression
     def voter_count(cls):
-        return (
-            select(func.count(articlecomment_voter.c.user_id))
-            # lambda로 감싸나 안싸나 결과는 같음 (파이참의 정적 검사기 오류?)
-            .where(lambda: articlecomment_voter.c.articlecomment_id == cls.id)
-            .correlate(cls)
-            .scalar_subquery()
-        )
+        return cls.vote_count
 
     def __repr__(self):
         return f"<ArticleComment(id={self.id}, author_id={self.author_id}, created_at={self.created_at})>"
+
+
+class ArticleSearchDocument(BaseModel):
+    """게시글 검색용 역색인 문서 (게시글 1개당 1행)
+
+    제목/내용/작성자/댓글내용/댓글작성자를 태그를 걷어낸 텍스트로 합쳐서 body 하나에 저장하고,
+    MySQL FULLTEXT(ngram parser) 인덱스로 검색한다. ngram parser라서 한글도 2글자 단위로 색인된다.
+    게시글/댓글의 생성/수정/삭제 시 ArticleSearchIndex.reindex_article()로 갱신된다.
+    """
+    __tablename__ = "article_search_documents"
+
+    article_id: Mapped[int] = mapped_column(Integer, ForeignKey("articles.id", name="fk_search_article_id", ondelete='CASCADE'),
+                                            unique=True, nullable=False)
+    body: Mapped[str] = mapped_column(Text, nullable=False, default="")
+
+    __table_args__ = (
+        Index("ft_article_search_body", "body", mysql_prefix="FULLTEXT", mysql_with_parser="ngram"),
+    )
+
+    def __repr__(self):
+        return f"<ArticleSearchDocument(id={self.id}, article_id={self.article_id})>"
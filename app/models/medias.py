@@ -0,0 +1,44 @@
+from sqlalchemy import BigInteger, Integer, String, Index, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.core.database import BaseModel
+
+
+class MediaReference(BaseModel):
+    """에디터(quill) 본문이 참조하는 미디어 파일 색인 (src 1개 x 소유 객체 1개 = 1행)
+
+    게시글/댓글 저장 시 본문의 img/video src로 갱신된다. (MediaReferenceIndex.sync_references)
+    "이 파일을 다른 곳에서도 쓰고 있나?"를 본문 전체 검색 대신 src 인덱스 조회로 확인한다.
+    owner_type: "article" | "article_comment" (wysiwyg 유틸의 _type 값과 같다)
+    """
+    __tablename__ = "media_references"
+
+    src: Mapped[str] = mapped_column(String(500), nullable=False)
+    owner_type: Mapped[str] = mapped_column(String(30), nullable=False)
+    owner_id: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("src", "owner_type", "owner_id", name="uq_media_references"),
+        Index("ix_media_references_owner", "owner_type", "owner_id"),
+    )
+
+    def __repr__(self):
+        return f"<MediaReference(id={self.id}, src='{self.src}', owner_type='{self.owner_type}', owner_id={self.owner_id})>"
+
+
+class MediaBlob(BaseModel):
+    """에디터 업로드 파일(내용 주소 저장): 같은 내용의 파일은 sha256 기준으로 1개만 저장한다.
+
+    src: /media/<EDITOR_MEDIA_BLOB_DIR>/<sha256 앞 2자리>/<sha256><ext> (내용이 같으면 항상 같은 URL)
+    ref_count: 이 src를 본문에서 참조하는 게시글/댓글 수 (media_references 기준으로 MediaReferenceIndex가 갱신)
+    updated_at: 마지막 업로드(중복 업로드 포함) 시각. GC는 최근에 업로드된 파일은 건너뛴다.
+    """
+    __tablename__ = "media_blobs"
+
+    sha256: Mapped[str] = mapped_column(String(64), nullable=False, index=True)
+    src: Mapped[str] = mapped_column(String(500), unique=True, nullable=False)
+    size: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    ref_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+
+    def __repr__(self):
+        return f"<MediaBlob(id={self.id}, src='{self.src}', ref_count={self.ref_count})>"
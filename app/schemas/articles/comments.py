@@ -30,7 +30,7 @@ class CommentOut(BaseModel):
     updated_at: datetime
     author: Optional[UserOrm] = None
     article_id: int
-    voter: list[UserOrm] = []
+    vote_count: int = 0
     model_config = ConfigDict(from_attributes=True)
 
     """
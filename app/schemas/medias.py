@@ -0,0 +1,47 @@
+import os
+import re
+from typing import Optional
+
+from pydantic import BaseModel, field_validator
+from pydantic_core import PydanticCustomError
+
+from app.core.settings import CONFIG
+
+SHA256_HEX = re.compile(r"^[0-9a-f]{64}$")
+VIDEO_EXT = re.compile(r"^\.[0-9a-z]{1,10}$")
+
+
+class VideoUploadInit(BaseModel):
+    """이어받기 업로드 시작: 파일 이름(확장자), 전체 크기, 파일 전체의 sha256(hex, 선택: 청크마다 X-Chunk-SHA256으로 확인한다)"""
+    filename: str
+    size: int
+    sha256: Optional[str] = None
+
+    @field_validator('filename')
+    def valid_ext(cls, v):
+        ext = os.path.splitext(v or "")[1].lower()
+        if not VIDEO_EXT.match(ext):
+            raise PydanticCustomError('invalid_filename', '파일 확장자를 확인할 수 없습니다.')
+        return v
+
+    @field_validator('size')
+    def valid_size(cls, v):
+        if v <= 0 or v > CONFIG.VIDEO_UPLOAD_MAX_BYTES:
+            raise PydanticCustomError('invalid_size', '업로드할 수 없는 파일 크기입니다.')
+        return v
+
+    @field_validator('sha256')
+    def valid_sha256(cls, v):
+        if v is None:
+            return v
+        v = v.strip().lower()
+        if not SHA256_HEX.match(v):
+            raise PydanticCustomError('invalid_checksum', 'sha256 값이 올바르지 않습니다.')
+        return v
+
+
+class VideoUploadStatus(BaseModel):
+    upload_id: str
+    offset: int
+    size: int
+    chunk_size: int
@@ -1,11 +1,16 @@
 from pydantic import EmailStr
-from sqlalchemy import select
+from sqlalchemy import select, delete, update, or_
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import Depends
 
 from app.core.database import get_db
-from app.models.users import User
+from app.models.articles import Article, ArticleComment
+from app.models.users import User, article_voter, articlecomment_voter
 from app.schemas.accounts import UserIn, UserPasswordUpdate, UserUpdate
+from app.services.articles.count_cache import ArticleCountCache
+from app.services.articles.search_service import ArticleSearchIndex
+from app.services.media_service import MediaReferenceIndex
+from app.services.user_cache import UserCache
 from app.utils.accounts import get_password_hash
 
 
@@ -52,12 +57,19 @@ class UserService:
         user = await self.get_user_by_id(user_id)
         if user is None:
             return None
+        username_changed = user_update.username is not None and user_update.username != user.username
         if user_update.username is not None:
             user.username = user_update.username
         if user_update.email is not None:
             user.email = str(user_update.email)
+        if username_changed:
+            # 작성자/댓글작성자 닉네임도 게시글 검색 대상이므로 관련 게시글을 다시 색인
+            await self.db.flush()
+            search_index = ArticleSearchIndex(self.db)
+            await search_index.reindex_articles(await search_index.related_article_ids_of_user(user_id))
         await self.db.commit()
         await self.db.refresh(user)
+        await UserCache.invalidate(user.id)
         return user
 
     async def update_email(self, old_email: EmailStr, email: EmailStr):
@@ -67,6 +79,7 @@ class UserService:
         user.email = str(email)
         await self.db.commit()
         await self.db.refresh(user)
+        await UserCache.invalidate(user.id)
         return user
 
     async def update_password(self, user_id: int, password_update: UserPasswordUpdate):
@@ -77,6 +90,7 @@ class UserService:
         user.password = hashed_password
         await self.db.commit()
         await self.db.refresh(user)
+        await UserCache.invalidate(user.id)
         return user
 
     async def user_image_update(self, user_id: int, img_path: str):
@@ -86,15 +100,56 @@ class UserService:
         user.img_path = img_path
         await self.db.commit()
         await self.db.refresh(user)
+        await UserCache.invalidate(user.id)
         return user
 
     async def delete_user(self, user_id: int):
         user = await self.get_user_by_id(user_id)
         if user is None:
             return False
+        # 회원의 게시글은 DB cascade로 지워지지만, 다른 게시글에 남긴 댓글이 검색 문서에 남지 않도록 다시 색인
+        search_index = ArticleSearchIndex(self.db)
+        related_article_ids = await search_index.related_article_ids_of_user(user_id)
+        await self._release_votes(user_id)
+        await MediaReferenceIndex(self.db).remove_references_of_user(user_id)
         await self.db.delete(user)
+        await self.db.flush()
+        await search_index.reindex_articles(related_article_ids)
         await self.db.commit()
+        await UserCache.invalidate(user_id)
+        await ArticleCountCache.invalidate_total()  # 회원의 게시글이 cascade로 함께 삭제됨
         return True
 
+    async def _release_votes(self, user_id: int):
+        """
+        voter 관계는 로드하지 않으므로(noload) 회원 삭제 전에 연결 테이블의 투표 기록을 직접 정리한다.
+        1) 회원이 누른 좋아요: 대상 게시글/댓글의 vote_count를 1씩 줄이고 기록 삭제
+        2) 회원의 게시글/댓글(및 그 게시글에 달린 댓글)이 받은 좋아요: 글과 함께 지워지므로 기록만 삭제
+        """
+        voted_article_ids = select(article_voter.c.article_id).where(article_voter.c.user_id == user_id)
+        await self.db.execute(
+            update(Article).where(Article.id.in_(voted_article_ids))
+            .values(vote_count=Article.vote_count - 1)
+            .execution_options(synchronize_session=False)
+        )
+        voted_comment_ids = select(articlecomment_voter.c.articlecomment_id).where(articlecomment_voter.c.user_id == user_id)
+        await self.db.execute(
+            update(ArticleComment).where(ArticleComment.id.in_(voted_comment_ids))
+            .values(vote_count=ArticleComment.vote_count - 1)
+            .execution_options(synchronize_session=False)
+        )
+
+        own_article_ids = select(Article.id).where(Article.author_id == user_id)
+        own_comment_ids = select(ArticleComment.id).where(or_(ArticleComment.author_id == user_id,
+                                                              ArticleComment.article_id.in_(own_article_ids)))
+        await self.db.execute(
+            delete(article_voter).where(or_(article_voter.c.user_id == user_id,
+                                            article_voter.c.article_id.in_(own_article_ids)))
+        )
+        await self.db.execute(
+            delete(articlecomment_voter).where(or_(articlecomment_voter.c.user_id == user_id,
+                                                   articlecomment_voter.c.articlecomment_id.in_(own_comment_ids)))
+        )
+
 def get_user_service(db: AsyncSession = Depends(get_db)) -> 'UserService':
     return UserService(db)
\ No newline at end of file
@@ -7,14 +7,17 @@ from enum import StrEnum
 from typing import Optional, Tuple, Sequence
 
 from fastapi import Depends
-from sqlalchemy import and_, func, select, or_, delete, distinct
+from sqlalchemy import and_, func, select, or_, delete, update
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload, aliased
 
 from app.core.database import get_db
 from app.models.articles import Article, ArticleComment
-from app.models.users import User, article_voter
+from app.models.users import User, article_voter, articlecomment_voter
 from app.schemas.articles.articles import ArticleIn, ArticleUpdate
+from app.services.articles.count_cache import ArticleCountCache
+from app.services.articles.loading import LoadProfile, article_load_options
+from app.services.articles.search_service import ArticleSearchIndex, apply_article_search_filter
+from app.services.media_service import MediaReferenceIndex, MEDIA_OWNER_ARTICLE, MEDIA_OWNER_ARTICLE_COMMENT
 
 
 class KeysetDirection(StrEnum):
@@ -54,36 +57,15 @@ def _row_to_cursor(row: Article) -> Optional[str]:
 
 
 
-def _apply_article_search_filter(stmt, q: Optional[str]):
-    if not q:
-        return stmt
-
-    pattern = f"%{q.strip()}%"
-    comment_user = aliased(User)
-
-    # 조인: 작성자 / 댓글 / 댓글 작성자
-    stmt = (
-        stmt
-        .join(User, User.id == Article.author_id)
-        .outerjoin(ArticleComment, ArticleComment.article_id == Article.id)
-        .outerjoin(comment_user, comment_user.id == ArticleComment.author_id)
-    )
-
-    stmt = stmt.where(
-        or_(
-            Article.title.ilike(pattern),
-            Article.content.ilike(pattern),
-            User.username.ilike(pattern),
-            ArticleComment.content.ilike(pattern),
-            comment_user.username.ilike(pattern),
-        )
-    )
-    return stmt
-
-
 class ArticleService:
     def __init__(self, db: AsyncSession):
         self.db = db
+        self.search_index = ArticleSearchIndex(db)
+        self.media_index = MediaReferenceIndex(db)
+
+    def _apply_article_search_filter(self, stmt, q: Optional[str]):
+        dialect_name = self.db.get_bind().dialect.name
+        return apply_article_search_filter(stmt, q, dialect_name)
 
     async def create_article(self, article_in: ArticleIn, user: User, img_path: str = None):
         create_article = Article(**article_in.model_dump())
@@ -92,21 +74,27 @@ class ArticleService:
         create_article.img_path = img_path
 
         self.db.add(create_article)
+        await self.db.flush()  # article.id 확보 후 같은 트랜잭션에서 검색 문서 생성
+        await self.search_index.reindex_article(create_article.id)
+        await self.media_index.sync_references(MEDIA_OWNER_ARTICLE, create_article.id, create_article.content)
+        count_version = await ArticleCountCache.begin_change()  # 커밋 전에 세대를 올려 둔다 (count_cache 참고)
         await self.db.commit()
         await self.db.refresh(create_article)
+        await ArticleCountCache.adjust_total(1, count_version)
 
         return create_article
 
 
-    async def get_articles(self):
-        query = (select(Article).order_by(Article.created_at.desc()))
+    async def get_articles(self, profile: LoadProfile = LoadProfile.LIST):
+        query = (select(Article).options(*article_load_options(profile)).order_by(Article.created_at.desc()))
         result = await self.db.execute(query)
         created_desc_articles = result.scalars().all()
         return created_desc_articles
 
 
-    async def get_article(self, article_id: int):
-        query = (select(Article).where(Article.id == article_id))
+    async def get_article(self, article_id: int, profile: LoadProfile = LoadProfile.MINIMAL):
+        """profile: 호출하는 쪽에서 필요한 관계만 지정 (상세 페이지 DETAIL, 좋아요 VOTE, 수정/삭제 MINIMAL)"""
+        query = (select(Article).options(*article_load_options(profile)).where(Article.id == article_id))
         result = await self.db.execute(query)
         article = result.scalar_one_or_none()
         return article
@@ -126,6 +114,9 @@ class ArticleService:
         if article_update.content is not None:
             article.content = article_update.content
 
+        await self.db.flush()
+        await self.search_index.reindex_article(article.id)
+        await self.media_index.sync_references(MEDIA_OWNER_ARTICLE, article.id, article.content)
         await self.db.commit()
         await self.db.refresh(article)
         return article
@@ -137,68 +128,96 @@ class ArticleService:
             return None
         if article.author_id != user.id:
             return False
+        # voter 관계는 로드하지 않으므로(noload) 연결 테이블의 투표 기록은 직접 지운다.
+        await self.db.execute(delete(article_voter).where(article_voter.c.article_id == article_id))
+        # 댓글(articlecomments_all)도 로드하지 않고 DB cascade로 지워지므로, 댓글 투표 기록도 먼저 지운다. (FK에 ON DELETE CASCADE 없음)
+        comment_ids = select(ArticleComment.id).where(ArticleComment.article_id == article_id)
+        await self.db.execute(delete(articlecomment_voter).where(articlecomment_voter.c.articlecomment_id.in_(comment_ids)))
+        await self.media_index.remove_references(MEDIA_OWNER_ARTICLE, [article_id])
+        # cascade로 지워질 댓글의 미디어 참조도 정리한다. (남겨두면 GC가 그 파일을 계속 참조 중으로 본다, ref_count도 다시 계산)
+        await self.media_index.remove_references(MEDIA_OWNER_ARTICLE_COMMENT,
+                                                 (await self.db.execute(comment_ids)).scalars().all())
         await self.db.delete(article)
+        count_version = await ArticleCountCache.begin_change()
         await self.db.commit()
+        await ArticleCountCache.adjust_total(-1, count_version)
         return True
 
     # Pagination
     async def count_articles(self, *, query: Optional[str] = None) -> int:
-        stmt = select(func.count(distinct(Article.id))).select_from(Article)
-
-        # 이 안에서 ArticleComment 를 join 한다면, 동일 테이블을 또 join 하지 않도록 주의
-        stmt = _apply_article_search_filter(stmt, q=query)
+        """게시판 페이지마다 호출되므로 Redis 캐시를 먼저 본다.
+        - 검색어 없음: 생성/삭제 시 증감하는 전체 게시글 수
+        - 검색어 있음: 정규화한 검색어별 짧은 TTL 메모"""
+        searching = bool(query and query.strip())
+        if searching:
+            cached = await ArticleCountCache.get_search_count(query)
+            if cached is None:
+                cached = await self._count_articles_from_db(query=query)
+                await ArticleCountCache.set_search_count(query, cached)
+            return cached
+
+        # 세대는 COUNT 전에 읽는다: 그 사이에 생성/삭제가 있었으면 set_total이 저장하지 않는다
+        cached, count_version = await ArticleCountCache.get_total()
+        if cached is not None:
+            return cached
+        total = await self._count_articles_from_db()
+        await ArticleCountCache.set_total(total, count_version)
+        return total
+
+    async def _count_articles_from_db(self, *, query: Optional[str] = None) -> int:
+        stmt = select(func.count(Article.id)).select_from(Article)
+
+        # 검색 문서와는 1:1 join 이라서 DISTINCT가 필요 없다.
+        stmt = self._apply_article_search_filter(stmt, q=query)
 
         result = await self.db.execute(stmt)
 
         total = result.scalar_one()
         return int(total or 0)
 
+    async def _hydrate_articles(self, article_ids: Sequence[int]) -> list[Article]:
+        """id 목록에 해당하는 게시글만 로드하고, 넘어온 id 순서(정렬 순서)를 그대로 유지"""
+        if not article_ids:
+            return []
+        stmt = (
+            select(Article)
+            .options(*article_load_options(LoadProfile.LIST))
+            .where(Article.id.in_(article_ids))
+        )
+        result = await self.db.execute(stmt)
+        by_id = {article.id: article for article in result.scalars().all()}
+        return [by_id[article_id] for article_id in article_ids if article_id in by_id]
+
     async def list_articles_offset(
         self,
         page: int,
         size: int,
         query: Optional[str] = None,
+        total: Optional[int] = None,
     ) -> tuple[list[Article], int]:
+        """total을 이미 알고 있으면(뷰에서 count_articles 호출) 넘겨서 COUNT를 한번 더 하지 않는다."""
 
-        total = await self.count_articles(query=query)
+        if total is None:
+            total = await self.count_articles(query=query)
         if total == 0:
             return [], 0
 
         start = (page - 1) * size
 
-        # 검색 조건이 있을 때는 전체 데이터를 가져와서 메모리에서 페이지네이션 처리
-        if query and query.strip():
-            # 검색이 있을 때는 limit 없이 전체 결과를 가져옴
-            stmt = (
-                select(Article)
-                .options(
-                    selectinload(getattr(Article, "author", None)),
-                )
-                .order_by(Article.created_at.desc(), Article.id.desc())
-            )
-
-            # 검색 조건 적용
-            stmt = _apply_article_search_filter(stmt, query)
-
-            result = await self.db.execute(stmt)
-            all_items: Sequence[Article] = result.scalars().unique().all()
-
-            # 메모리에서 페이지네이션 적용
-            items = list(all_items)[start:start + size]
-        else:
-            # 검색이 없을 때는 DB에서 직접 페이지네이션
-            stmt = (
-                select(Article)
-                .options(
-                    selectinload(getattr(Article, "author", None)),
-                )
-                .order_by(Article.created_at.desc(), Article.id.desc())
-                .offset(start)
-                .limit(size)
-            )
+        # 1) 검색 여부와 관계없이 해당 페이지의 id만 DB에서 LIMIT/OFFSET으로 고른다.
+        #    (검색 문서와 1:1 join이라 행이 불어나지 않으므로 DISTINCT 없이 그대로 페이지네이션 가능)
+        id_stmt = (
+            select(Article.id)
+            .order_by(Article.created_at.desc(), Article.id.desc())
+            .offset(start)
+            .limit(size)
+        )
+        id_stmt = self._apply_article_search_filter(id_stmt, query)
+        result = await self.db.execute(id_stmt)
+        page_ids = list(result.scalars().all())
 
-            result = await self.db.execute(stmt)
-            items = list(result.scalars().all())
+        # 2) 그 페이지의 게시글만 로드: 검색 결과가 몇 건이든 요청당 메모리는 size 만큼만 쓴다.
+        items = await self._hydrate_articles(page_ids)
 
         return items, total
 
@@ -214,7 +233,7 @@ class ArticleService:
             .limit(1)
         )
 
-        stmt = _apply_article_search_filter(stmt, query)
+        stmt = self._apply_article_search_filter(stmt, query)
 
         result = await self.db.execute(stmt)
         first_row = result.scalar_one_or_none()
@@ -241,16 +260,14 @@ class ArticleService:
         limit = size + 1  # 다음/이전 페이지 존재 확인용
 
         # 기본 select
+        # 목록에는 작성자만 필요하다. (댓글까지 로드하지 않는다)
         stmt = (
             select(Article)
-            .options(
-                selectinload(getattr(Article, "author", None)),
-                selectinload(getattr(Article, "articlecomments_all", None)),  # 필요 시
-            )
+            .options(*article_load_options(LoadProfile.LIST))
         )
 
         # 우선 검색조건 적용
-        stmt = _apply_article_search_filter(stmt, query)
+        stmt = self._apply_article_search_filter(stmt, query)
 
         if cursor:
             ts_iso, cid = _decode_cursor(cursor)
@@ -327,49 +344,61 @@ class ArticleService:
 
 
     async def vote_article(self, article_id: int, user: User):
-        article = await self.get_article(article_id)
+        article = await self.get_article(article_id, profile=LoadProfile.VOTE)
         if article is None:
             return None
         if article.author_id == user.id:
             # (에러 반환으로 수정하자))
             return False
 
-        # 2) 이미 투표했는지 확인
-        query = select(article_voter.c.user_id).where(
+        # 이미 투표했으면 취소, 아니면 추가 (article_voter 테이블을 직접 다룬다: 관계 접근 없음 -> MissingGreenlet 회피)
+        # 좋아요 수는 같은 트랜잭션에서 vote_count 컬럼을 원자적으로 증감한다. (voter 목록을 로드하지 않는다)
+        deleted = await self.db.execute(
+            delete(article_voter).where(
                 and_(article_voter.c.article_id == article_id,
-                article_voter.c.user_id == user.id)
+                     article_voter.c.user_id == user.id, )
             )
-        result = await self.db.execute(query)
-        exists = result.scalar_one_or_none()
-        if exists is not None:
-            # 이미 투표했다면 아무 것도 하지 않음(또는 에러 반환으로 수정하자)
-            # raise CustomErrorException(status_code=416, detail="이미 '좋아요' 하셨습니다.")
+        )
+        if deleted.rowcount:
             await self.db.execute(
-                delete(article_voter).where(
-                    and_(article_voter.c.article_id == article_id,
-                         article_voter.c.user_id == user.id, )
+                update(Article).where(Article.id == article_id).values(vote_count=Article.vote_count - 1)
+            )
+            result = "delete"
+        else:
+            await self.db.execute(
+                article_voter.insert().values(
+                    article_id=article_id,
+                    user_id=user.id,
                 )
             )
-            await self.db.commit()
-            await self.db.refresh(article) # article을 refresh해도 적용된다. 좋아요 테이블은 객체가 않이라서...
-            print("4. exists id: ", exists)
-            print("5. vote delete post: ", article.voter_count)
-            # return None
-            return {"result": "delete", "voter_count": article.voter_count}
-
-        # 3) 직접 연결 테이블에 insert (관계 접근 없음 -> MissingGreenlet 회피)
-        await self.db.execute(
-            article_voter.insert().values(
-                article_id=article_id,
-                user_id=user.id,
+            await self.db.execute(
+                update(Article).where(Article.id == article_id).values(vote_count=Article.vote_count + 1)
             )
-        )
+            result = "insert"
 
+        vote_count = (await self.db.execute(select(Article.vote_count).where(Article.id == article_id))).scalar_one()
         await self.db.commit()
-        await self.db.refresh(article)
-        print("6. vote add post: ", article.voter_count)
-        # return True
-        return {"result": "insert", "voter_count": article.voter_count}
+        article.vote_count = vote_count  # 세션에 올라와 있는 객체도 맞춰둔다.
+        return {"result": result, "voter_count": vote_count}
+
+    async def get_vote_state(self, article: Article, user: Optional[User]) -> tuple[bool, set[int]]:
+        """상세 페이지용: 로그인 사용자가 이 게시글과 이 게시글의 댓글(답글)들에 좋아요 했는지"""
+        if user is None:
+            return False, set()
+
+        query = select(article_voter.c.article_id).where(
+            and_(article_voter.c.article_id == article.id,
+                 article_voter.c.user_id == user.id)
+        )
+        article_voted = (await self.db.execute(query)).scalar_one_or_none() is not None
+
+        comment_ids = select(ArticleComment.id).where(ArticleComment.article_id == article.id)
+        query = select(articlecomment_voter.c.articlecomment_id).where(
+            and_(articlecomment_voter.c.user_id == user.id,
+                 articlecomment_voter.c.articlecomment_id.in_(comment_ids))
+        )
+        voted_comment_ids = set((await self.db.execute(query)).scalars().all())
+        return article_voted, voted_comment_ids
 
 
 def get_article_service(db: AsyncSession = Depends(get_db)) -> 'ArticleService':
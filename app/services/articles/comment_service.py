@@ -1,17 +1,22 @@
 from fastapi import Depends
-from sqlalchemy import select, and_, delete, func
+from sqlalchemy import select, and_, delete, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.database import get_db
 from app.models.articles import Article, ArticleComment
 from app.models.users import User, articlecomment_voter
 from app.schemas.articles.comments import CommentIn
+from app.services.articles.loading import LoadProfile, comment_load_options
+from app.services.articles.search_service import ArticleSearchIndex
+from app.services.media_service import MediaReferenceIndex, MEDIA_OWNER_ARTICLE_COMMENT
 from app.utils.exc_handler import CustomErrorException
 
 
 class ArticleCommentService:
     def __init__(self, db: AsyncSession):
         self.db = db
+        self.search_index = ArticleSearchIndex(db)
+        self.media_index = MediaReferenceIndex(db)
 
     async def create_comment(self, article: Article, comment_in: CommentIn, user: User):
         create_comment = ArticleComment(**comment_in.model_dump())
@@ -19,20 +24,25 @@ class ArticleCommentService:
         create_comment.author_id = user.id
 
         self.db.add(create_comment)
+        await self.db.flush()
+        await self.search_index.reindex_article(article.id)  # 댓글 내용/작성자도 게시글 검색 대상
+        await self.media_index.sync_references(MEDIA_OWNER_ARTICLE_COMMENT, create_comment.id, create_comment.content)
         await self.db.commit()
-        await self.db.refresh(create_comment)
 
-        return create_comment
+        # 응답(CommentOut)에 작성자가 들어가므로 DETAIL 프로필로 다시 조회
+        return await self.get_comment(create_comment.id, profile=LoadProfile.DETAIL)
 
-    async def get_comment(self, comment_id: int):
-        query = (select(ArticleComment).where(ArticleComment.id == comment_id))
+    async def get_comment(self, comment_id: int, profile: LoadProfile = LoadProfile.MINIMAL):
+        """profile: 호출하는 쪽에서 필요한 관계만 지정 (응답에 작성자 포함 DETAIL, 좋아요 VOTE, 수정/삭제 MINIMAL)"""
+        query = (select(ArticleComment).options(*comment_load_options(profile)).where(ArticleComment.id == comment_id))
         result = await self.db.execute(query)
         comment = result.scalar_one_or_none()
         return comment
 
     async def get_replies_with_paired_comment_id(self, comment_id: int):
         # 댓글의 id가 다른 코멘트의 paired_comment_id(즉, 해당 댓글의 답글(reply)들을 모두 골라낸다.)
-        query = (select(ArticleComment).where(ArticleComment.paired_comment_id == comment_id))
+        query = (select(ArticleComment).options(*comment_load_options(LoadProfile.MINIMAL))
+                 .where(ArticleComment.paired_comment_id == comment_id))
         result = await self.db.execute(query)
         replies_with_paired_comment_id = result.scalars().all()
         return replies_with_paired_comment_id
@@ -44,9 +54,11 @@ class ArticleCommentService:
         if comment.author_id != user.id:
             return False
         comment.content = comment_in.content
+        await self.db.flush()
+        await self.search_index.reindex_article(comment.article_id)
+        await self.media_index.sync_references(MEDIA_OWNER_ARTICLE_COMMENT, comment.id, comment.content)
         await self.db.commit()
-        await self.db.refresh(comment)
-        return comment
+        return await self.get_comment(comment_id, profile=LoadProfile.DETAIL)
 
     async def delete_comment(self, comment_id: int, user: User):
         comment = await self.get_comment(comment_id)
@@ -54,62 +66,56 @@ class ArticleCommentService:
             return None
         if comment.author_id != user.id:
             return False
+        article_id = comment.article_id
+        # voter 관계는 로드하지 않으므로(noload) 연결 테이블의 투표 기록은 직접 지운다.
+        await self.db.execute(delete(articlecomment_voter).where(articlecomment_voter.c.articlecomment_id == comment_id))
+        await self.media_index.remove_references(MEDIA_OWNER_ARTICLE_COMMENT, [comment_id])
         await self.db.delete(comment)
+        await self.db.flush()
+        await self.search_index.reindex_article(article_id)
         await self.db.commit()
         return True
 
     async def vote_comment(self, comment_id: int, user: User):
-        comment = await self.get_comment(comment_id)
+        comment = await self.get_comment(comment_id, profile=LoadProfile.VOTE)
         if comment is None:
             return None
         if comment.author_id == user.id:
             # (에러 반환으로 수정하자))
             return False
 
-        # 2) 이미 투표했는지 확인
-        query = select(articlecomment_voter.c.user_id).where(
+        # 이미 투표했으면 취소, 아니면 추가 (articlecomment_voter 테이블을 직접 다룬다: 관계 접근 없음 -> MissingGreenlet 회피)
+        # 좋아요 수는 같은 트랜잭션에서 vote_count 컬럼을 원자적으로 증감한다. (voter 목록을 로드하지 않는다)
+        deleted = await self.db.execute(
+            delete(articlecomment_voter).where(
                 and_(articlecomment_voter.c.articlecomment_id == comment_id,
-                     articlecomment_voter.c.user_id == user.id)
+                     articlecomment_voter.c.user_id == user.id, )
             )
-        result = await self.db.execute(query)
-        exists = result.scalar_one_or_none()
-        if exists is not None:
-            # 이미 투표했다면 아무 것도 하지 않음(또는 에러 반환으로 수정하자)
-            # return None
-            # raise CustomErrorException(status_code=416, detail="이미 '좋아요' 하셨습니다.")
+        )
+        if deleted.rowcount:
             await self.db.execute(
-                delete(articlecomment_voter).where(
-                    and_(articlecomment_voter.c.articlecomment_id == comment_id,
-                         articlecomment_voter.c.user_id == user.id, )
+                update(ArticleComment).where(ArticleComment.id == comment_id)
+                .values(vote_count=ArticleComment.vote_count - 1)
+            )
+            result = "delete"
+        else:
+            await self.db.execute(
+                articlecomment_voter.insert().values(
+                    articlecomment_id=comment_id,
+                    user_id=user.id,
                 )
             )
-            await self.db.commit()
-            await self.db.refresh(comment) # comment를 refresh해도 적용된다. 좋아요 테이블은 객체가 않이라서...
-            # return None
-            return { "result": "delete", "voter_count": comment.voter_count}
-
-        # 3) 직접 연결 테이블에 insert (관계 접근 없음 -> MissingGreenlet 회피)
-        await self.db.execute(
-            articlecomment_voter.insert().values(
-                articlecomment_id=comment_id,
-                user_id=user.id,
+            await self.db.execute(
+                update(ArticleComment).where(ArticleComment.id == comment_id)
+                .values(vote_count=ArticleComment.vote_count + 1)
             )
-        )
-        await self.db.commit()
-        await self.db.refresh(comment)
+            result = "insert"
 
-        """
-        # articlecomment_voter: ArticleComment <-> User 를 잇는 association Table
-        query = (select(func.count())
-                 .select_from(articlecomment_voter)
-                 .where(lambda: articlecomment_voter.c.articlecomment_id == comment_id)) 
-        result = await self.db.execute(query)
-        count = result.scalar()  # AsyncSession 기준
-        print("투표 콜: 새로 추가 후 해당 Comment의 좋아요 갯수: ", count) 
-        model에 함수로 넣었다."""
-
-        # return True
-        return { "result": "insert", "voter_count": comment.voter_count}
+        query = select(ArticleComment.vote_count).where(ArticleComment.id == comment_id)
+        vote_count = (await self.db.execute(query)).scalar_one()
+        await self.db.commit()
+        comment.vote_count = vote_count  # 세션에 올라와 있는 객체도 맞춰둔다.
+        return {"result": result, "voter_count": vote_count}
 
 
 def get_articlecomment_service(db: AsyncSession = Depends(get_db)) -> 'ArticleCommentService':
@@ -0,0 +1,119 @@
+import hashlib
+from typing import Optional
+
+from app.core.redis import get_redis_client
+
+ARTICLE_TOTAL_KEY = "articles:count:total"  # 전체 게시글 수 (생성/삭제 시 증감)
+ARTICLE_TOTAL_TTL = 60 * 60  # 1시간: 혹시 어긋나더라도(회원 탈퇴 cascade 등) 만료 후 DB 기준으로 다시 맞춰진다.
+# 전체 게시글 수의 세대 번호: 생성/삭제(커밋 전), 무효화, 채우기마다 올라간다. 만료 없음 (정수 하나)
+ARTICLE_TOTAL_VERSION_KEY = "articles:count:total:version"
+SEARCH_COUNT_PREFIX = "articles:count:q:"  # 검색어별 결과 수 (짧은 TTL 메모)
+SEARCH_COUNT_TTL = 30  # 초
+
+""" 채우기(COUNT)와 증감이 엇갈리는 경쟁 조건
+    COUNT를 읽은 뒤 채우기 전에 다른 요청이 커밋하고 증감하면(키가 없어 증감 무시) 그 게시글이 빠진 값이 1시간 남고,
+    커밋 뒤 증감 전에 COUNT를 읽어 채우면 그 게시글이 두 번 세어진다.
+    - 쓰는 쪽: 커밋 전에 begin_change()로 세대를 올려 두고, 커밋 뒤 adjust_total()은 세대가 그대로일 때만 증감한다.
+              그 사이에 누가 채웠거나(세대가 바뀜) 다른 쓰기가 끼었으면 증감 대신 키를 지운다. (다음 요청이 다시 센다)
+    - 채우는 쪽: COUNT 전에 세대를 읽고, set_total()은 세대가 그대로이고 키가 없을 때만 저장하면서 세대를 올린다.
+"""
+
+# 키가 있고 세대가 커밋 전 그대로일 때만 증감, 아니면 키 삭제
+_ADJUST_IF_VERSION_LUA = """
+if redis.call('GET', KEYS[2]) == ARGV[2] and redis.call('EXISTS', KEYS[1]) == 1 then
+    return redis.call('INCRBY', KEYS[1], ARGV[1])
+end
+redis.call('DEL', KEYS[1])
+return nil
+"""
+
+# COUNT 전에 읽은 세대가 그대로일 때만 저장 (NX), 저장하면 세대를 올려서 진행 중인 증감이 이 값에 더해지지 않게 한다
+_SET_IF_VERSION_LUA = """
+if (redis.call('GET', KEYS[2]) or '0') ~= ARGV[2] or redis.call('EXISTS', KEYS[1]) == 1 then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[3])
+redis.call('INCR', KEYS[2])
+return 1
+"""
+
+
+def _search_count_key(query: str) -> str:
+    normalized = " ".join(query.lower().split())
+    digest = hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+    return f"{SEARCH_COUNT_PREFIX}{digest}"
+
+
+class ArticleCountCache:
+    """
+    게시판 페이지네이션용 게시글 수 캐시
+    Redis 장애 시에는 None을 돌려주고, 호출한 쪽은 DB COUNT로 폴백한다.
+    """
+
+    @classmethod
+    async def get_total(cls) -> tuple[Optional[int], Optional[str]]:
+        """(캐시된 전체 게시글 수, 세대). 캐시가 없으면 COUNT 후 이 세대로 set_total 한다."""
+        try:
+            value, version = await get_redis_client().mget(ARTICLE_TOTAL_KEY, ARTICLE_TOTAL_VERSION_KEY)
+        except Exception as e:
+            print(f"ArticleCountCache.get_total Redis 오류: {e}")
+            return None, None
+        return (int(value) if value is not None else None), (version or "0")
+
+    @classmethod
+    async def set_total(cls, total: int, version: Optional[str]) -> None:
+        if version is None:  # 세대를 못 읽었으면(Redis 오류) 채우지 않는다
+            return
+        try:
+            await get_redis_client().eval(_SET_IF_VERSION_LUA, 2, ARTICLE_TOTAL_KEY, ARTICLE_TOTAL_VERSION_KEY,
+                                          total, version, ARTICLE_TOTAL_TTL)
+        except Exception as e:
+            print(f"ArticleCountCache.set_total Redis 오류: {e}")
+
+    @classmethod
+    async def begin_change(cls) -> Optional[int]:
+        """게시글 생성/삭제 커밋 전에 호출. 돌려받은 세대를 커밋 뒤 adjust_total에 넘긴다."""
+        try:
+            return await get_redis_client().incr(ARTICLE_TOTAL_VERSION_KEY)
+        except Exception as e:
+            print(f"ArticleCountCache.begin_change Redis 오류: {e}")
+            return None
+
+    @classmethod
+    async def adjust_total(cls, delta: int, version: Optional[int]) -> None:
+        if version is None:
+            await cls.invalidate_total()
+            return
+        try:
+            await get_redis_client().eval(_ADJUST_IF_VERSION_LUA, 2, ARTICLE_TOTAL_KEY, ARTICLE_TOTAL_VERSION_KEY,
+                                          delta, version)
+        except Exception as e:
+            print(f"ArticleCountCache.adjust_total Redis 오류, 캐시 무효화: {e}")
+            await cls.invalidate_total()
+
+    @classmethod
+    async def invalidate_total(cls) -> None:
+        try:
+            # 세대도 올려서, 무효화 전에 COUNT를 읽은 요청이 옛 값을 다시 채우지 못하게 한다
+            async with get_redis_client().pipeline(transaction=True) as pipe:
+                pipe.incr(ARTICLE_TOTAL_VERSION_KEY)
+                pipe.delete(ARTICLE_TOTAL_KEY)
+                await pipe.execute()
+        except Exception as e:
+            print(f"ArticleCountCache.invalidate_total Redis 오류: {e}")
+
+    @classmethod
+    async def get_search_count(cls, query: str) -> Optional[int]:
+        try:
+            value = await get_redis_client().get(_search_count_key(query))
+        except Exception as e:
+            print(f"ArticleCountCache.get_search_count Redis 오류: {e}")
+            return None
+        return int(value) if value is not None else None
+
+    @classmethod
+    async def set_search_count(cls, query: str, count: int) -> None:
+        try:
+            await get_redis_client().set(_search_count_key(query), count, ex=SEARCH_COUNT_TTL)
+        except Exception as e:
+            print(f"ArticleCountCache.set_search_count Redis 오류: {e}")
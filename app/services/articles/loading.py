@@ -0,0 +1,54 @@
+from enum import StrEnum
+
+from sqlalchemy.orm import selectinload, load_only
+
+from app.models.articles import Article, ArticleComment
+
+""" 게시글/댓글 관계 로딩 프로필
+모델의 관계는 기본이 raise(접근하면 예외)라서 아무것도 자동으로 로드되지 않는다.
+각 엔드포인트는 필요한 프로필을 골라서 ArticleService / ArticleCommentService 조회 메서드에 넘긴다.
+(예전처럼 lazy="selectin"을 모델에 걸어두면 게시글 하나 조회에 author, 댓글, 댓글 author, 댓글의 article 까지 줄줄이 SELECT가 나갔다.)
+"""
+
+
+class LoadProfile(StrEnum):
+    MINIMAL = "minimal"  # 컬럼만 (수정/삭제/존재 확인)
+    LIST = "list"        # 목록: + 작성자
+    DETAIL = "detail"    # 상세: + 작성자, 댓글 전체, 댓글 작성자
+    VOTE = "vote"        # 좋아요: 작성자 id / vote_count 만
+
+
+ARTICLE_LOAD_OPTIONS = {
+    LoadProfile.MINIMAL: (),
+    LoadProfile.LIST: (
+        selectinload(Article.author),
+    ),
+    LoadProfile.DETAIL: (
+        selectinload(Article.author),
+        selectinload(Article.articlecomments_all).selectinload(ArticleComment.author),
+    ),
+    LoadProfile.VOTE: (
+        load_only(Article.id, Article.author_id, Article.vote_count, raiseload=True),
+    ),
+}
+
+COMMENT_LOAD_OPTIONS = {
+    LoadProfile.MINIMAL: (),
+    LoadProfile.LIST: (
+        selectinload(ArticleComment.author),
+    ),
+    LoadProfile.DETAIL: (
+        selectinload(ArticleComment.author),
+    ),
+    LoadProfile.VOTE: (
+        load_only(ArticleComment.id, ArticleComment.author_id, ArticleComment.vote_count, raiseload=True),
+    ),
+}
+
+
+def article_load_options(profile: LoadProfile = LoadProfile.MINIMAL):
+    return ARTICLE_LOAD_OPTIONS[LoadProfile(profile)]
+
+
+def comment_load_options(profile: LoadProfile = LoadProfile.MINIMAL):
+    return COMMENT_LOAD_OPTIONS[LoadProfile(profile)]
@@ -0,0 +1,127 @@
+import re
+from typing import Optional, Iterable
+
+from sqlalchemy import select
+from sqlalchemy.dialects.mysql import match
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.articles import Article, ArticleComment, ArticleSearchDocument
+from app.models.users import User
+
+""" 게시글 검색 역색인
+기존에는 User/ArticleComment/댓글작성자를 모두 join 해서 5개 컬럼에 '%q%' ILIKE를 걸었기 때문에
+인덱스를 탈 수 없고, 댓글 수만큼 행이 불어나서 COUNT(DISTINCT)까지 해야 했다.
+지금은 게시글 1개당 검색 문서 1행(ArticleSearchDocument)을 유지하고 FULLTEXT 인덱스로 찾는다.
+"""
+
+NGRAM_TOKEN_SIZE = 2  # MySQL ngram_token_size 기본값: 이보다 짧은 검색어는 FULLTEXT로 찾을 수 없다.
+REINDEX_BATCH_SIZE = 200
+
+HTML_TAG_CLEANER = re.compile(r'<.*?>|&([a-z0-9]+|#[0-9]{1,6}|#x[0-9a-f]{1,6});', re.IGNORECASE)
+BOOLEAN_MODE_OPERATORS = re.compile(r'["+\-<>()~*@]')
+
+
+def _html_to_text(html: Optional[str]) -> str:
+    if not html:
+        return ""
+    return re.sub(HTML_TAG_CLEANER, ' ', html)
+
+
+def _normalize_query(q: Optional[str]) -> str:
+    if not q:
+        return ""
+    # FULLTEXT boolean mode 연산자는 제거하고 공백은 하나로 모은다.
+    return " ".join(BOOLEAN_MODE_OPERATORS.sub(" ", q).split())
+
+
+def apply_article_search_filter(stmt, q: Optional[str], dialect_name: str = "mysql"):
+    """stmt(select ... from articles)에 검색 조건을 건다. 검색 문서와는 1:1 join이므로 행이 불어나지 않는다."""
+    if not q or not q.strip():
+        return stmt
+
+    stmt = stmt.join(ArticleSearchDocument, ArticleSearchDocument.article_id == Article.id)
+
+    term = _normalize_query(q)
+    if dialect_name == "mysql" and len(term.replace(" ", "")) >= NGRAM_TOKEN_SIZE:
+        # 큰따옴표로 감싼 phrase 검색: 기존 '%q%' 부분일치와 같은 의미로 동작한다.
+        return stmt.where(match(ArticleSearchDocument.body, against=f'"{term}"').in_boolean_mode())
+
+    # ngram 크기보다 짧은 검색어(한 글자 등)나 MySQL이 아닌 DB(SQLite 테스트 등)는 검색 문서 한 테이블만 LIKE 검색
+    return stmt.where(ArticleSearchDocument.body.ilike(f"%{q.strip()}%"))
+
+
+class ArticleSearchIndex:
+    """게시글 검색 문서를 만들고 갱신한다. commit은 호출한 쪽에서 한다."""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def build_body(self, article_id: int) -> Optional[str]:
+        query = (select(Article.title, Article.content, User.username)
+                 .join(User, User.id == Article.author_id)
+                 .where(Article.id == article_id))
+        result = await self.db.execute(query)
+        row = result.one_or_none()
+        if row is None:
+            return None
+
+        title, content, author_username = row
+        parts = [title or "", _html_to_text(content), author_username or ""]
+
+        comment_query = (select(ArticleComment.content, User.username)
+                         .join(User, User.id == ArticleComment.author_id)
+                         .where(ArticleComment.article_id == article_id)
+                         .order_by(ArticleComment.id))
+        comment_result = await self.db.execute(comment_query)
+        for comment_content, comment_username in comment_result.all():
+            parts.append(_html_to_text(comment_content))
+            parts.append(comment_username or "")
+
+        return " ".join(" ".join(parts).split())
+
+    async def reindex_article(self, article_id: int) -> None:
+        body = await self.build_body(article_id)
+        result = await self.db.execute(
+            select(ArticleSearchDocument).where(ArticleSearchDocument.article_id == article_id)
+        )
+        document = result.scalar_one_or_none()
+
+        if body is None:
+            # 게시글이 없어졌으면 검색 문서도 정리 (DB의 ON DELETE CASCADE가 있지만 안전하게)
+            if document is not None:
+                await self.db.delete(document)
+            return
+
+        if document is None:
+            self.db.add(ArticleSearchDocument(article_id=article_id, body=body))
+        else:
+            document.body = body
+
+    async def reindex_articles(self, article_ids: Iterable[int]) -> None:
+        for article_id in set(article_ids):
+            await self.reindex_article(article_id)
+
+    async def related_article_ids_of_user(self, user_id: int) -> set[int]:
+        """회원이 작성한 게시글 + 댓글을 단 게시글: 닉네임 변경/탈퇴 시 다시 색인해야 하는 대상"""
+        query = (select(Article.id).where(Article.author_id == user_id)
+                 .union(select(ArticleComment.article_id).where(ArticleComment.author_id == user_id)))
+        result = await self.db.execute(query)
+        return set(result.scalars().all())
+
+    async def reindex_all(self) -> int:
+        """전체 재색인(백필). 배치 단위로 commit 한다."""
+        last_id = 0
+        total = 0
+        while True:
+            query = (select(Article.id).where(Article.id > last_id)
+                     .order_by(Article.id).limit(REINDEX_BATCH_SIZE))
+            result = await self.db.execute(query)
+            ids = list(result.scalars().all())
+            if not ids:
+                break
+            await self.reindex_articles(ids)
+            await self.db.commit()
+            total += len(ids)
+            last_id = ids[-1]
+        return total
+
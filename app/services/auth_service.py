@@ -1,4 +1,11 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+import uuid
 from datetime import timedelta, datetime, timezone
+from typing import Optional
 
 from fastapi import Depends
 from jose import jwt
@@ -6,15 +13,30 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.database import get_db
+from app.core.redis import get_redis_client
 from app.core.settings import CONFIG
 from app.models.users import User
 from app.schemas.auth import LoginRequest
 from app.services.token_service import AsyncTokenService
-from app.utils.accounts import verify_password
+from app.utils.accounts import verify_and_update_password
 from app.utils.auth import create_access_token, create_refresh_token, verify_token
+from app.utils.commons import refresh_expire
 from app.utils.exc_handler import CustomErrorException
 
 
+REFRESH_FLIGHT_RESULT_PREFIX = "refresh_flight:result:"  # refresh_token digest -> 새 액세스/리프레시 토큰 (worker 간 공유)
+REFRESH_FLIGHT_LOCK_PREFIX = "refresh_flight:lock:"
+REFRESH_FLIGHT_RESULT_TTL = 10  # 초: 동시에 몰린 요청들이 같은 액세스 토큰을 받을 만큼만
+REFRESH_FLIGHT_LOCK_TTL = 5  # 초: 발급하던 worker가 죽어도 이 시간 뒤에는 다른 요청이 발급한다.
+REFRESH_FLIGHT_POLL_SECONDS = 0.05
+
+_refresh_inflight: dict[str, asyncio.Future] = {}  # worker 안에서 실행 중인 리프레시
+
+
+def _refresh_digest(refresh_token: str) -> str:
+    return hashlib.sha256(refresh_token.encode("utf-8")).hexdigest()
+
+
 class AuthService:
     def __init__(self, db: AsyncSession):
         self.db = db
@@ -44,7 +66,7 @@ class AuthService:
                                    detail="인증 실패: 가입된 이메일이 존재하지 않습니다.",
                                    headers={"WWW-Authenticate": "Bearer"})
 
-        password_ok = await verify_password(login_data.password, str(user.password))
+        password_ok, new_hash = await verify_and_update_password(login_data.password, str(user.password))
         if not password_ok:
             # return None
             # raise PydanticCustomError를 던지면 Internal Server Error가 터져버린다.
@@ -53,8 +75,22 @@ class AuthService:
             raise CustomErrorException(status_code=411,
                                    detail="인증 실패: 비밀번호가 일치하지 않습니다.",
                                    headers={"WWW-Authenticate": "Bearer"})
+        if new_hash:
+            await self._upgrade_password_hash(user, new_hash)
         return user
 
+    async def _upgrade_password_hash(self, user: User, new_hash: str):
+        """해시 알고리즘/비용이 바뀐 뒤 처음 로그인할 때 새 설정으로 다시 해시해서 저장 (마이그레이션 없이 점진적으로 교체)
+        저장에 실패해도 로그인은 계속한다. (다음 로그인 때 다시 시도)"""
+        try:
+            user.password = new_hash
+            await self.db.commit()
+        except Exception as e:
+            user_id = user.id
+            await self.db.rollback()
+            await self.db.refresh(user)  # rollback으로 만료된 속성을 다시 읽는다. (이후 토큰 발급에서 사용)
+            print(f"비밀번호 해시 업그레이드 실패: user_id={user_id} {e}")
+
     """
     사용자 정보를 기반으로 액세스 토큰을 생성합니다.
     """
@@ -91,10 +127,8 @@ class AuthService:
             print("get_unverified_claims 실패는 단순 디버깅 용도이므로 그대로 진행", e)
             pass
 
-        # 리프레시 토큰 생성
-        refresh_token = await create_refresh_token(
-            data=token_data
-        )
+        # 리프레시 토큰 생성 (+ Redis에 jti 저장)
+        refresh_token = await AuthService.issue_refresh_token(user.id)
 
         try:
             unverified = jwt.get_unverified_claims(refresh_token)
@@ -108,23 +142,97 @@ class AuthService:
             print("get_unverified_claims 실패는 단순 디버깅 용도이므로 그대로 진행", e)
             pass
 
-
-        # refresh_token을 Redis에 저장
-        await AsyncTokenService.store_refresh_token(user.id, refresh_token)
-
         return {
             CONFIG.ACCESS_COOKIE_NAME: access_token,
             CONFIG.REFRESH_COOKIE_NAME: refresh_token,
             "token_type": "bearer"
         }
 
+    @staticmethod
+    async def issue_refresh_token(user_id: int, replaces: Optional[str] = None) -> str:
+        """새 jti로 refresh_token을 만들고 저장한다. replaces: 회전으로 대체되는 이전 jti"""
+        jti = uuid.uuid4().hex
+        expire = refresh_expire()
+        refresh_token = await create_refresh_token({"user_id": user_id, "jti": jti}, expire=expire)
+        await AsyncTokenService.store_refresh_token(user_id, jti, expire.timestamp(), replaces=replaces)
+        return refresh_token
+
     """
     리프레시 토큰을 사용하여 새 액세스 토큰을 발급합니다.
     """
 
     async def refresh_access_token(self, refresh_token: str):
-        # 리프레시 토큰 검증
-        payload = verify_token(refresh_token)
+        """ single-flight: 같은 refresh_token으로 동시에 들어온 리프레시는 한번만 실행한다.
+        액세스 토큰이 만료되면 페이지 + XHR 요청이 한꺼번에 refresh 쿠키만 들고 들어오기 때문.
+        1) 같은 worker: 실행 중인 Future를 같이 기다린다.
+        2) worker 간: Redis 락을 잡은 한 곳만 발급하고, 나머지는 결과 키(짧은 TTL)를 기다렸다가 같은 토큰을 쓴다.
+        (refresh_token도 회전되므로 동시에 몰린 요청들이 모두 같은 새 refresh_token을 받는다)
+        """
+        digest = _refresh_digest(refresh_token)
+        inflight = _refresh_inflight.get(digest)
+        if inflight is not None:
+            result = await asyncio.shield(inflight)
+            return dict(result) if result else result
+
+        future = asyncio.get_running_loop().create_future()
+        _refresh_inflight[digest] = future
+        try:
+            result = await self._refresh_across_workers(refresh_token, digest)
+            future.set_result(result)
+            return dict(result) if result else result
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # 기다리는 쪽이 없어도 경고가 남지 않게
+            raise
+        finally:
+            _refresh_inflight.pop(digest, None)
+
+    async def _refresh_across_workers(self, refresh_token: str, digest: str):
+        redis_client = get_redis_client()
+        result_key = f"{REFRESH_FLIGHT_RESULT_PREFIX}{digest}"
+        lock_key = f"{REFRESH_FLIGHT_LOCK_PREFIX}{digest}"
+        locked = False
+        try:
+            cached = await redis_client.get(result_key)
+            if cached is None:
+                locked = bool(await redis_client.set(lock_key, os.getpid(), nx=True, ex=REFRESH_FLIGHT_LOCK_TTL))
+                if not locked:
+                    # 다른 worker가 발급 중: 결과를 기다린다. (락 TTL 안에 안 나오면 직접 발급)
+                    deadline = time.monotonic() + REFRESH_FLIGHT_LOCK_TTL
+                    while cached is None and time.monotonic() < deadline:
+                        await asyncio.sleep(REFRESH_FLIGHT_POLL_SECONDS)
+                        cached = await redis_client.get(result_key)
+            if cached is not None:
+                # 빈 문자열: 유효하지 않은 refresh_token으로 판정된 결과
+                return json.loads(cached) if cached else None
+        except Exception as e:
+            print(f"refresh single-flight Redis 오류, 직접 발급: {e}")
+
+        try:
+            result = await self._issue_access_token(refresh_token)
+            try:
+                await redis_client.set(result_key, json.dumps(result) if result else "", ex=REFRESH_FLIGHT_RESULT_TTL)
+            except Exception as e:
+                print(f"refresh single-flight 결과 저장 실패: {e}")
+            return result
+        finally:
+            if locked:
+                try:
+                    await redis_client.delete(lock_key)
+                except Exception as e:
+                    print(f"refresh single-flight 락 해제 실패: {e}")
+
+    @staticmethod
+    async def forget_refresh_result(refresh_token: str) -> None:
+        """로그아웃/탈퇴: 같은 refresh_token으로 최근 발급된 액세스 토큰 결과를 재사용하지 않게 지운다."""
+        try:
+            await get_redis_client().delete(f"{REFRESH_FLIGHT_RESULT_PREFIX}{_refresh_digest(refresh_token)}")
+        except Exception as e:
+            print(f"refresh single-flight 결과 삭제 실패: {e}")
+
+    async def _issue_access_token(self, refresh_token: str):
+        # 리프레시 토큰 검증 (액세스 토큰을 refresh 쿠키로 보내는 경우를 막기 위해 type 확인)
+        payload = verify_token(refresh_token, type_="refresh")
         if not payload:
             print("refresh_access_token payload 없다.: ", payload)
             return None
@@ -135,15 +243,14 @@ class AuthService:
             print("refresh_access_token user_id 없다.: ", user_id)
             return None
 
-        """ # refresh_token이 만료기간이 남아 있는 경우 redis에 저장하는 로직을 한번 더 실행
-        # 뭔가 redis 관련 문제로 인해 is_valid가 None으로 반환되어 버리는 오류?를 없애기 위해 인위적으로 redis에 저장하는 로직을 한번더 실행한다. """
-
-        print("refresh_token 인위적 다시 redis 저장 시작")
-        await AsyncTokenService.store_refresh_token(user_id, refresh_token)
-        print("refresh_token 인위적 다시 저장 끝 ===> Redis에서 리프레시 토큰 유효성 확인")
-
-        # Redis에서 리프레시 토큰 유효성 확인
-        is_valid = await AsyncTokenService.validate_refresh_token(user_id, refresh_token)
+        # Redis에서 리프레시 토큰 유효성 확인 (jti ZSCORE 1회). jti가 없으면 예전 방식으로 저장된 토큰
+        jti = payload.get("jti")
+        if jti:
+            is_valid = await AsyncTokenService.validate_refresh_token(user_id, jti)
+        else:
+            is_valid = await AsyncTokenService.validate_legacy_refresh_token(user_id, refresh_token)
+        if is_valid and await AsyncTokenService.is_token_blacklisted(refresh_token):
+            is_valid = False  # 로그아웃 때 블랙리스트에 올라간 토큰 (예전 방식 토큰은 jti 폐기가 없다)
         if not is_valid:
             print("refresh_access_token is_valid 안됐다.: ", is_valid)
             return None
@@ -167,8 +274,14 @@ class AuthService:
         access_token = await create_access_token(token_data)
         print("refresh_access_token access_token 만들었다.: ", access_token)
 
+        # refresh_token 회전: 새 jti로 다시 발급하고 이전 jti는 잠깐(REFRESH_ROTATION_GRACE)만 유효
+        new_refresh_token = await self.issue_refresh_token(user.id, replaces=jti)
+        if not jti:
+            await AsyncTokenService.revoke_legacy_refresh_token(user.id, refresh_token)
+
         return {
             CONFIG.ACCESS_COOKIE_NAME: access_token,
+            CONFIG.REFRESH_COOKIE_NAME: new_refresh_token,
             "token_type": "bearer"
         }
 
@@ -0,0 +1,139 @@
+from app.core.redis import get_redis_client, CODE_TTL_SECONDS
+
+AUTHCODE_RESEND_COOLDOWN = 30  # 초: 같은 이메일로 인증코드 재요청 금지 시간
+
+# 결과 코드 (스크립트 반환값)
+AUTHCODE_OK = 1
+AUTHCODE_MISSING = 0  # 코드/인증토큰이 없거나 만료됨 (발급: 최근 요청 있음)
+AUTHCODE_MISMATCH = -1  # 코드/인증토큰 불일치
+AUTHCODE_SESSION_MISMATCH = -2  # 세션에 저장된 이메일과 다름
+
+# 재요청 제한 확인 + 세션/코드/최근 요청 키 저장을 한번에 (확인과 저장 사이에 다른 요청이 끼어들 수 없다)
+# KEYS: verify_recent:{email}, user:{email}, verify:{email}
+# ARGV: email, 인증코드, 코드 TTL, 재요청 제한(초)
+_ISSUE_CODE_LUA = """
+if redis.call('SET', KEYS[1], '1', 'NX', 'EX', ARGV[4]) == false then
+    return 0
+end
+redis.call('HSET', KEYS[2], 'email', ARGV[1])
+redis.call('EXPIRE', KEYS[2], ARGV[3])
+redis.call('SET', KEYS[3], ARGV[2], 'EX', ARGV[3])
+return 1
+"""
+
+# 인증코드 확인. ARGV[3](verified_token)이 있으면 코드를 지우고(한번만 사용) 인증토큰을 저장한다.
+# KEYS: verify:{email}, user:{email}, verified:{email}
+# ARGV: 입력 코드, email, verified_token('' = 확인만), 인증토큰 TTL
+_VERIFY_CODE_LUA = """
+local stored = redis.call('GET', KEYS[1])
+if not stored then
+    return 0
+end
+if stored ~= ARGV[1] then
+    return -1
+end
+if redis.call('HGET', KEYS[2], 'email') ~= ARGV[2] then
+    return -2
+end
+if ARGV[3] ~= '' then
+    redis.call('DEL', KEYS[1])
+    redis.call('SET', KEYS[3], ARGV[3], 'EX', ARGV[4])
+end
+return 1
+"""
+
+AUTHCODE_CLAIM_TTL = 60  # 초: 가입/비밀번호 설정 처리 중 인증토큰을 잡아 두는 시간 (처리 중 프로세스가 죽으면 이 시간 뒤 만료)
+
+# 인증토큰 확인. ARGV[3] == '1'이면 확인과 동시에 인증토큰을 처리 중 표시(claimed:<token>)로 바꾼다.
+# (동시에 들어온 요청 중 하나만 성공, 나머지는 불일치. 처리가 끝나면 finish_claim, 실패하면 release_claim)
+# KEYS: verified:{email}, user:{email}
+# ARGV: 입력 인증토큰, email, claim('1'/'0'), 처리 중 표시 TTL
+_CHECK_VERIFIED_LUA = """
+local stored = redis.call('GET', KEYS[1])
+if not stored then
+    return 0
+end
+if stored ~= ARGV[1] then
+    return -1
+end
+if redis.call('HGET', KEYS[2], 'email') ~= ARGV[2] then
+    return -2
+end
+if ARGV[3] == '1' then
+    redis.call('SET', KEYS[1], 'claimed:' .. ARGV[1], 'EX', ARGV[4])
+end
+return 1
+"""
+
+# 처리 성공: 내가 잡은 인증토큰/세션을 지운다. (한번만 사용)
+# KEYS: verified:{email}, user:{email} / ARGV: 인증토큰
+_FINISH_CLAIM_LUA = """
+if redis.call('GET', KEYS[1]) == 'claimed:' .. ARGV[1] then
+    return redis.call('DEL', KEYS[1], KEYS[2])
+end
+return 0
+"""
+
+# 처리 실패: 인증토큰을 되돌려서 다시 시도할 수 있게 한다.
+# KEYS: verified:{email} / ARGV: 인증토큰, 인증토큰 TTL
+_RELEASE_CLAIM_LUA = """
+if redis.call('GET', KEYS[1]) == 'claimed:' .. ARGV[1] then
+    redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+    return 1
+end
+return 0
+"""
+
+
+def _keys(email: str) -> dict:
+    return {
+        "recent": f"verify_recent:{email}",
+        "session": f"user:{email}",  # Redis 해시 키 (세션 역할)
+        "code": f"verify:{email}",
+        "verified": f"verified:{email}",
+    }
+
+
+class AuthCodeStore:
+    """
+    이메일 인증코드 흐름(회원가입/비밀번호 분실/이메일 변경)의 Redis 상태
+    단계마다 Lua 스크립트 하나(= Redis 왕복 1번)로 확인과 변경을 함께 처리한다.
+    """
+
+    @classmethod
+    async def issue_code(cls, email: str, authcode: str) -> bool:
+        """False: AUTHCODE_RESEND_COOLDOWN 안에 같은 이메일로 요청이 있었다."""
+        keys = _keys(email)
+        return bool(await get_redis_client().eval(
+            _ISSUE_CODE_LUA, 3, keys["recent"], keys["session"], keys["code"],
+            email, authcode, CODE_TTL_SECONDS, AUTHCODE_RESEND_COOLDOWN))
+
+    @classmethod
+    async def discard_code(cls, email: str) -> None:
+        """이메일 발송 실패 시 저장한 코드 제거"""
+        await get_redis_client().delete(_keys(email)["code"])
+
+    @classmethod
+    async def verify_code(cls, email: str, authcode: str, verified_token: str = "") -> int:
+        """verified_token을 주면 성공 시 코드를 소비하고 인증토큰을 저장한다. 비우면 확인만 한다. (이메일 변경)"""
+        keys = _keys(email)
+        return int(await get_redis_client().eval(
+            _VERIFY_CODE_LUA, 3, keys["code"], keys["session"], keys["verified"],
+            authcode, email, verified_token, CODE_TTL_SECONDS))
+
+    @classmethod
+    async def check_verified(cls, email: str, token: str, claim: bool = False) -> int:
+        """claim=True면 확인과 동시에 인증토큰을 잡는다. 호출한 쪽은 finish_claim 또는 release_claim 중 하나를 반드시 호출한다."""
+        keys = _keys(email)
+        return int(await get_redis_client().eval(
+            _CHECK_VERIFIED_LUA, 2, keys["verified"], keys["session"],
+            token, email, "1" if claim else "0", AUTHCODE_CLAIM_TTL))
+
+    @classmethod
+    async def finish_claim(cls, email: str, token: str) -> None:
+        keys = _keys(email)
+        await get_redis_client().eval(_FINISH_CLAIM_LUA, 2, keys["verified"], keys["session"], token)
+
+    @classmethod
+    async def release_claim(cls, email: str, token: str) -> None:
+        await get_redis_client().eval(_RELEASE_CLAIM_LUA, 1, _keys(email)["verified"], token, CODE_TTL_SECONDS)
@@ -0,0 +1,159 @@
+import os
+from datetime import datetime, timezone
+from typing import Iterable, Optional
+
+from fastapi import Depends, UploadFile
+from sqlalchemy import select, delete, update, func, and_, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from app.core.database import get_db, EDITOR_MEDIA_BLOB_UPLOAD_DIR
+from app.core.settings import MEDIA_DIR
+from app.models.articles import Article, ArticleComment
+from app.models.medias import MediaReference, MediaBlob
+from app.utils.commons import write_hashed_temp_file, move_into_place, remove_file_path
+from app.utils.wysiwyg import extract_img_srcs, extract_video_srcs
+
+MEDIA_OWNER_ARTICLE = "article"
+MEDIA_OWNER_ARTICLE_COMMENT = "article_comment"
+REBUILD_BATCH_SIZE = 200
+
+
+def extract_media_srcs(html: Optional[str]) -> set[str]:
+    return extract_img_srcs(html) | extract_video_srcs(html)
+
+
+class MediaReferenceIndex:
+    """에디터 본문의 미디어 참조(media_references)를 갱신한다. commit은 호출한 쪽에서 한다.
+    조회(다른 곳에서 쓰는지)는 app.utils.wysiwyg.media_srcs_used_elsewhere"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def sync_references(self, owner_type: str, owner_id: int, html: Optional[str]) -> None:
+        """저장된 본문 기준으로 참조 목록을 맞춘다: 빠진 src는 지우고 새 src는 추가"""
+        current_srcs = extract_media_srcs(html)
+        result = await self.db.execute(
+            select(MediaReference.src).where(and_(MediaReference.owner_type == owner_type,
+                                                  MediaReference.owner_id == owner_id))
+        )
+        stored_srcs = set(result.scalars().all())
+
+        removed_srcs = stored_srcs - current_srcs
+        if removed_srcs:
+            await self.db.execute(
+                delete(MediaReference).where(and_(MediaReference.owner_type == owner_type,
+                                                  MediaReference.owner_id == owner_id,
+                                                  MediaReference.src.in_(removed_srcs)))
+            )
+        added_srcs = current_srcs - stored_srcs
+        for src in added_srcs:
+            self.db.add(MediaReference(src=src, owner_type=owner_type, owner_id=owner_id))
+        if removed_srcs or added_srcs:
+            await self.db.flush()
+            await self.refresh_blob_ref_counts(removed_srcs | added_srcs)
+
+    async def refresh_blob_ref_counts(self, srcs: Iterable[str]) -> None:
+        """media_blobs.ref_count를 media_references 기준으로 다시 센다. (증감이 아니라 재계산이라 어긋나지 않는다)"""
+        srcs = set(srcs)
+        if not srcs:
+            return
+        ref_count = (select(func.count()).select_from(MediaReference)
+                     .where(MediaReference.src == MediaBlob.src)
+                     .scalar_subquery())
+        await self.db.execute(
+            update(MediaBlob).where(MediaBlob.src.in_(srcs)).values(ref_count=ref_count)
+            .execution_options(synchronize_session=False)
+        )
+
+    async def remove_references(self, owner_type: str, owner_ids: Iterable[int]) -> None:
+        owner_ids = set(owner_ids)
+        if not owner_ids:
+            return
+        condition = and_(MediaReference.owner_type == owner_type, MediaReference.owner_id.in_(owner_ids))
+        srcs = (await self.db.execute(select(MediaReference.src).where(condition))).scalars().all()
+        await self.db.execute(delete(MediaReference).where(condition))
+        await self.refresh_blob_ref_counts(srcs)
+
+    async def remove_references_of_user(self, user_id: int) -> None:
+        """회원 탈퇴: cascade로 지워질 게시글/댓글(회원의 게시글에 달린 댓글 포함)의 참조를 정리"""
+        own_article_ids = select(Article.id).where(Article.author_id == user_id)
+        own_comment_ids = select(ArticleComment.id).where(or_(ArticleComment.author_id == user_id,
+                                                              ArticleComment.article_id.in_(own_article_ids)))
+        condition = or_(
+            and_(MediaReference.owner_type == MEDIA_OWNER_ARTICLE, MediaReference.owner_id.in_(own_article_ids)),
+            and_(MediaReference.owner_type == MEDIA_OWNER_ARTICLE_COMMENT, MediaReference.owner_id.in_(own_comment_ids)),
+        )
+        srcs = (await self.db.execute(select(MediaReference.src).where(condition))).scalars().all()
+        await self.db.execute(delete(MediaReference).where(condition))
+        await self.refresh_blob_ref_counts(srcs)
+
+    async def rebuild_all(self) -> int:
+        """전체 재구성(백필). 게시글/댓글 본문을 배치 단위로 읽어서 다시 만든다."""
+        total = 0
+        for owner_type, model in ((MEDIA_OWNER_ARTICLE, Article), (MEDIA_OWNER_ARTICLE_COMMENT, ArticleComment)):
+            last_id = 0
+            while True:
+                query = (select(model.id, model.content).where(model.id > last_id)
+                         .order_by(model.id).limit(REBUILD_BATCH_SIZE))
+                rows = (await self.db.execute(query)).all()
+                if not rows:
+                    break
+                for owner_id, content in rows:
+                    await self.sync_references(owner_type, owner_id, content)
+                await self.db.commit()
+                total += len(rows)
+                last_id = rows[-1][0]
+        return total
+
+
+class MediaBlobStore:
+    """
+    에디터 업로드를 내용 주소(sha256)로 저장한다: 같은 파일을 여러 글에 붙여도 디스크에는 1개만 남는다.
+    파일 이동과 media_blobs 행 갱신을 같은 행 잠금(SELECT ... FOR UPDATE) 안에서 해서,
+    GC(media_gc)가 같은 파일을 지우는 중에 중복 업로드가 끼어들지 않게 한다.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    @staticmethod
+    def blob_path(sha256: str, ext: str) -> str:
+        return os.path.join(EDITOR_MEDIA_BLOB_UPLOAD_DIR, sha256[:2], f"{sha256}{ext}")
+
+    @staticmethod
+    def blob_src(path: str) -> str:
+        return "/media/" + os.path.relpath(path, MEDIA_DIR).replace(os.sep, "/")
+
+    async def store_upload(self, file: UploadFile, _type: str) -> Optional[str]:
+        """업로드 파일을 저장하고 URL(src)을 돌려준다. 파일명이 비어 있으면 None"""
+        written = await write_hashed_temp_file(os.path.join(EDITOR_MEDIA_BLOB_UPLOAD_DIR, ".tmp"), file, _type)
+        if written is None:
+            return None
+        tmp_path, sha256, size, ext = written
+        return await self.store_file(tmp_path, sha256, size, ext)
+
+    async def store_file(self, tmp_path: str, sha256: str, size: int, ext: str) -> str:
+        """이미 디스크에 다 쓴 파일(sha256 계산 완료)을 blob 경로로 옮긴다. (이어받기 업로드의 finalize도 여기로)"""
+        path = self.blob_path(sha256, ext)
+        src = self.blob_src(path)
+        try:
+            query = select(MediaBlob).where(MediaBlob.src == src).with_for_update()
+            blob = (await self.db.execute(query)).scalar_one_or_none()
+            if blob is None:
+                self.db.add(MediaBlob(sha256=sha256, src=src, size=size))
+            else:
+                blob.updated_at = datetime.now(timezone.utc)  # 최근 업로드: GC 유예
+            await run_in_threadpool(move_into_place, tmp_path, path)
+            await self.db.commit()
+        except IntegrityError:
+            # 같은 파일이 동시에 처음 업로드된 경우: 다른 요청이 먼저 행을 만들고 파일도 옮겼다.
+            await self.db.rollback()
+        finally:
+            await remove_file_path(tmp_path)  # 중복이라 옮기지 않았으면 임시 파일 정리 (옮겼으면 이미 없다)
+        return src
+
+
+def get_media_blob_store(db: AsyncSession = Depends(get_db)) -> 'MediaBlobStore':
+    return MediaBlobStore(db)
@@ -1,13 +1,62 @@
-from datetime import timedelta
+import asyncio
+import hashlib
+import time
 from typing import Optional
 
 from app.core.redis import get_redis_client
 from app.core.settings import CONFIG
+from app.utils.bloom import BloomFilter
 
 TOKEN_BLACKLIST_PREFIX = "blacklist:"  # 토큰 블랙리스트 키 접두사
-REFRESH_TOKEN_PREFIX = "refresh:"  # Refresh 토큰 저장 접두사
+REFRESH_TOKEN_PREFIX = "refresh:"  # (예전) 회원별 Refresh 토큰 문자열 SET 접두사
+REFRESH_JTI_PREFIX = "refresh_jti:"  # 회원별 Refresh 토큰 jti ZSET (score=만료 시각) 접두사
+REFRESH_TOKENS_PER_USER = 10  # 회원당 동시에 유효한 refresh_token 수 (기기/브라우저 수)
+REFRESH_ROTATION_GRACE = 30  # 초: 회전된 이전 refresh_token이 더 유효한 시간 (동시에 나간 요청용)
 DEFAULT_TOKEN_EXPIRY = 60 * 30  # 토큰 유효 기간 (초)
 
+# 블랙리스트: 키는 토큰 문자열 대신 sha256, 세대(generation)를 올려서 한번에 비운다.
+TOKEN_BLACKLIST_GENERATION_KEY = "blacklist_meta:generation"
+TOKEN_BLACKLIST_STREAM_KEY = "blacklist_meta:revocations"  # 폐기된 토큰 digest 스트림 (worker별 Bloom filter 갱신용)
+BLACKLIST_STREAM_RETENTION = 60 * 60 * 24 * (CONFIG.REFRESH_TOKEN_EXPIRE + 1)  # 초: 가장 긴 토큰 수명보다 오래된 항목은 필요 없다.
+BLACKLIST_SYNC_INTERVAL = 1.0  # 초: worker가 폐기 스트림을 읽는 간격 (다른 worker의 로그아웃이 반영되기까지 최대 지연)
+BLACKLIST_SYNC_BATCH = 1000
+BLACKLIST_BLOOM_REBUILD_INTERVAL = 60 * 60  # 초: 만료된 토큰을 Bloom filter에서 빼기 위해 주기적으로 다시 만든다. (스케줄러 작업)
+
+_blacklist_bloom = BloomFilter()
+_blacklist_sync_lock = asyncio.Lock()  # 증분 갱신과 다시 만든 filter 교체가 겹치지 않게
+_blacklist_rebuild_task: Optional[asyncio.Task] = None  # 첫 빌드 재시도 (시작할 때 스케줄러 작업이 실패한 경우)
+# built_at == 0: 아직 한번도 만들지 않음 -> Bloom filter를 믿지 않고 Redis로 확인한다.
+_blacklist_state = {"generation": "0", "last_id": "0", "synced_at": 0.0, "built_at": 0.0}
+
+# KEYS[1]: refresh_jti:{user_id}
+# ARGV: jti, 만료 시각, 현재 시각, 회원당 최대 개수, 회전 유예(초), [대체되는 이전 jti]
+_STORE_REFRESH_JTI_LUA = """
+redis.call('ZADD', KEYS[1], ARGV[2], ARGV[1])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[3])
+local count = redis.call('ZCARD', KEYS[1])
+local cap = tonumber(ARGV[4])
+if count > cap then
+    redis.call('ZREMRANGEBYRANK', KEYS[1], 0, count - cap - 1)
+end
+-- 개수 정리 뒤에 이전 jti의 만료를 당긴다. (먼저 당기면 가장 먼저 만료되는 것으로 보고 바로 지워진다)
+if ARGV[6] then
+    local old = redis.call('ZSCORE', KEYS[1], ARGV[6])
+    local grace_until = tonumber(ARGV[3]) + tonumber(ARGV[5])
+    if old and tonumber(old) > grace_until then
+        redis.call('ZADD', KEYS[1], grace_until, ARGV[6])
+    end
+end
+local last = redis.call('ZRANGE', KEYS[1], -1, -1, 'WITHSCORES')
+if last[2] then
+    redis.call('EXPIREAT', KEYS[1], math.ceil(tonumber(last[2])))
+end
+return 1
+"""
+
+
+def _token_digest(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
 
 class AsyncTokenService:
     """
@@ -16,139 +65,164 @@ class AsyncTokenService:
 
     @classmethod
     async def blacklist_token(cls, token: str, expires_in: int = DEFAULT_TOKEN_EXPIRY) -> bool:
-        redis_client = get_redis_client()
-        key = f"{TOKEN_BLACKLIST_PREFIX}{token}"
-
-        try:
-            await redis_client.set(key, "1", ex=expires_in)
-        except Exception as e:
-            print(f"Redis 연결 오류 발생, 재시도 중: {e}")
-            # 연결 초기화
-            await redis_client.close()
-
-            # 전역 변수 초기화를 위해 redis.py의 로직을 다시 타게 함
-            import app.core.redis as redis_module
-            redis_module.redis_client = None
-            new_client = get_redis_client()
+        """폐기 키(blacklist:{세대}:{digest}) + 폐기 스트림(다른 worker의 Bloom filter 갱신용)에 기록"""
+        digest = _token_digest(token)
+        min_id = int((time.time() - BLACKLIST_STREAM_RETENTION) * 1000)
 
-            # 재시도
-            await new_client.set(key, "1", ex=expires_in)
+        async def execute_blacklist(client):
+            generation = await client.get(TOKEN_BLACKLIST_GENERATION_KEY) or "0"
+            async with client.pipeline(transaction=True) as pipe:
+                pipe.set(f"{TOKEN_BLACKLIST_PREFIX}{generation}:{digest}", "1", ex=max(int(expires_in), 1))
+                pipe.xadd(TOKEN_BLACKLIST_STREAM_KEY, {"digest": digest}, minid=min_id, approximate=True)
+                await pipe.execute()
 
+        await cls._execute(execute_blacklist)
+        # 이 worker는 바로 반영. 다시 만드는 중인 filter는 교체 직전에 스트림을 끝까지 읽으므로 여기서 넣지 않아도 된다.
+        _blacklist_bloom.add(digest)
         return True
 
     @classmethod
     async def is_token_blacklisted(cls, token: str) -> bool:
-        redis_client = get_redis_client()
-        key = f"{TOKEN_BLACKLIST_PREFIX}{token}"
-
+        """Bloom filter에 없으면 Redis에 묻지 않고 False (대부분의 요청).
+        있으면(폐기됐거나 드물게 false positive) Redis 키로 확인한다."""
+        digest = _token_digest(token)
         try:
-            return bool(await redis_client.exists(key))
+            await cls._sync_blacklist_bloom()
         except Exception as e:
-            print(f"Redis 연결 오류 발생, 재시도 중: {e}")
-            await redis_client.close()
-
-            import app.core.redis as redis_module
-            redis_module.redis_client = None
-            new_client = get_redis_client()
+            print(f"블랙리스트 Bloom filter 갱신 실패: {e}")
+        built = bool(_blacklist_state["built_at"])
+        if built and digest not in _blacklist_bloom:
+            return False
 
-            return bool(await new_client.exists(key))
-
-    @classmethod
-    async def clear_blacklist(cls) -> None:
-        redis_client = get_redis_client()
-
-        async def execute_clear(client):
-            keys = []
-            async for key in client.scan_iter(match=f"{TOKEN_BLACKLIST_PREFIX}*"):
-                keys.append(key)
-            if keys:
-                await client.delete(*keys)
+        async def execute_exists(client):
+            # 첫 빌드 전에는 세대도 동기화되지 않았으므로 Redis에서 읽는다.
+            generation = _blacklist_state["generation"] if built else (
+                await client.get(TOKEN_BLACKLIST_GENERATION_KEY) or "0")
+            return await client.exists(f"{TOKEN_BLACKLIST_PREFIX}{generation}:{digest}")
 
         try:
-            await execute_clear(redis_client)
+            return bool(await cls._execute(execute_exists))
         except Exception as e:
-            print(f"Redis 연결 오류 발생, 재시도 중: {e}")
-            await redis_client.close()
-
-            import app.core.redis as redis_module
-            redis_module.redis_client = None
-            new_client = get_redis_client()
-
-            await execute_clear(new_client)
+            print(f"블랙리스트 확인 실패, 폐기된 것으로 처리: {e}")
+            return True
 
     @classmethod
-    async def store_refresh_token(cls, user_id: int, refresh_token: str) -> bool:
-        redis_client = get_redis_client()
-        user_key = f"{REFRESH_TOKEN_PREFIX}{user_id}"
-        print("store_refresh_token user_key: ")
-
-        expire_seconds = int(timedelta(days=CONFIG.REFRESH_TOKEN_EXPIRE + 1).total_seconds())
-        print("store_refresh_token expire_seconds: ", expire_seconds)
-
-        # asyncio 파이프라인
-        # 로그인 시 Refresh Token을 Redis에 저장하는 순간 터졌습니다.
-        # pipeline 사용 시 반드시 예외 처리 + 재시도
-        async def execute_storage(client):
+    async def clear_blacklist(cls) -> None:
+        """SCAN + DELETE 대신 세대를 올린다: 이전 세대 키는 아무도 읽지 않고 TTL로 사라진다."""
+        async def execute_clear(client):
             async with client.pipeline(transaction=True) as pipe:
-                await pipe.sadd(user_key, refresh_token)
-                await pipe.expire(user_key, expire_seconds)
+                pipe.incr(TOKEN_BLACKLIST_GENERATION_KEY)
+                pipe.delete(TOKEN_BLACKLIST_STREAM_KEY)
                 await pipe.execute()
 
-        try:
-            await execute_storage(redis_client)
-        except Exception as e:
-            print(f"Redis 연결 오류 발생, 재시도 중: {e}")
-            # 연결 초기화 (redis.py 구조에 따라 client를 새로 고침)
-            await redis_client.close()
-
-            # 전역 변수 초기화를 위해 redis.py의 로직을 다시 타게 함
-            import app.core.redis as redis_module
-            redis_module.redis_client = None
-            new_client = get_redis_client()
-
-            # 재시도 (한 번 더 실패하면 상위로 예외 던짐)
-            await execute_storage(new_client)
-
-        return True
+        await cls._execute(execute_clear)
+        _blacklist_state["synced_at"] = 0.0  # 다음 확인 때 바로 새 세대로 맞춘다.
 
     @classmethod
-    async def validate_refresh_token(cls, user_id: int, refresh_token: str) -> bool:
-        redis_client = get_redis_client()
-        user_key = f"{REFRESH_TOKEN_PREFIX}{user_id}"
+    async def _sync_blacklist_bloom(cls) -> None:
+        """요청 경로: BLACKLIST_SYNC_INTERVAL 마다 한번, 폐기 스트림의 새 항목만 Bloom filter에 추가한다.
+        처음부터 다시 만드는 일(시작할 때, 매시간)은 rebuild_blacklist_bloom(스케줄러 작업)이 한다."""
+        global _blacklist_bloom, _blacklist_rebuild_task
+        now = time.monotonic()
+        if _blacklist_sync_lock.locked() or now - _blacklist_state["synced_at"] < BLACKLIST_SYNC_INTERVAL:
+            return
+        _blacklist_state["synced_at"] = now  # 동시에 들어온 요청이 같이 갱신하지 않게 먼저 기록
+        if not _blacklist_state["built_at"]:
+            # 첫 빌드 전(시작 직후, Redis 장애로 실패): 요청은 기다리지 않고 백그라운드에서 다시 시도한다.
+            if _blacklist_rebuild_task is None or _blacklist_rebuild_task.done():
+                _blacklist_rebuild_task = asyncio.create_task(cls.rebuild_blacklist_bloom())
+            return
+        async with _blacklist_sync_lock:
+            _blacklist_bloom, generation, last_id = await cls._read_blacklist_stream(
+                _blacklist_bloom, _blacklist_state["generation"], _blacklist_state["last_id"])
+            _blacklist_state.update(generation=generation, last_id=last_id)
 
+    @classmethod
+    async def rebuild_blacklist_bloom(cls) -> None:
+        """스케줄러 작업(inits.py lifespan): 시작할 때와 BLACKLIST_BLOOM_REBUILD_INTERVAL 마다 Bloom filter를 처음부터 다시 만든다.
+        (스트림에서 잘려 나간 만료 토큰이 빠진다) 다시 만드는 동안 요청은 기존 filter를 보고 증분 갱신도 계속한다.
+        기존 filter는 새 filter의 상위 집합이라, 이전 항목은 Redis 확인에서 걸러진다."""
+        global _blacklist_bloom
         try:
-            return bool(await redis_client.sismember(user_key, refresh_token))
+            bloom, generation, last_id = await cls._read_blacklist_stream(
+                BloomFilter(), _blacklist_state["generation"], "0")
+            async with _blacklist_sync_lock:
+                # 진행 중인 증분 갱신이 끝난 뒤, 그 사이에 들어온 항목까지 읽고 바꾼다.
+                bloom, generation, last_id = await cls._read_blacklist_stream(bloom, generation, last_id)
+                _blacklist_bloom = bloom
+                _blacklist_state.update(generation=generation, last_id=last_id, built_at=time.monotonic())
         except Exception as e:
-            print(f"Redis 연결 오류 발생, 재시도 중: {e}")
-            await redis_client.close()
-
-            import app.core.redis as redis_module
-            redis_module.redis_client = None
-            new_client = get_redis_client()
+            print(f"블랙리스트 Bloom filter 다시 만들기 실패: {e}")
 
-            return bool(await new_client.sismember(user_key, refresh_token))
+    @classmethod
+    async def _read_blacklist_stream(cls, bloom: BloomFilter, generation: str,
+                                     last_id: str) -> tuple[BloomFilter, str, str]:
+        """last_id 이후의 폐기 스트림을 끝까지 읽어 bloom에 추가한다. 세대가 바뀌었으면(clear) 새 filter로 처음부터 읽는다.
+        (clear가 스트림도 지우므로 새 세대의 스트림은 짧다) (filter, 세대, 마지막 id)를 돌려준다."""
+        async def execute_sync(client):
+            async with client.pipeline(transaction=False) as pipe:
+                pipe.get(TOKEN_BLACKLIST_GENERATION_KEY)
+                pipe.xread({TOKEN_BLACKLIST_STREAM_KEY: last_id}, count=BLACKLIST_SYNC_BATCH)
+                return await pipe.execute()
+
+        while True:
+            current_generation, entries = await cls._execute(execute_sync)
+            current_generation = current_generation or "0"
+            if current_generation != generation:
+                generation = current_generation
+                bloom = BloomFilter()
+                last_id = "0"
+                continue
+            messages = entries[0][1] if entries else []
+            for message_id, fields in messages:
+                bloom.add(fields["digest"])
+                last_id = message_id
+            if len(messages) < BLACKLIST_SYNC_BATCH:
+                return bloom, generation, last_id
 
     @classmethod
-    async def revoke_refresh_token(cls, user_id: int, refresh_token: Optional[str] = None) -> bool:
-        redis_client = get_redis_client()
-        user_key = f"{REFRESH_TOKEN_PREFIX}{user_id}"
+    async def _execute(cls, operation):
+        """Redis 작업 실행. 재연결/재시도(backoff + jitter)와 circuit breaker는 app.core.redis의 클라이언트가 처리한다."""
+        return await operation(get_redis_client())
 
-        async def execute_revoke(client):
-            if refresh_token:
-                await client.srem(user_key, refresh_token)
-            else:
-                await client.delete(user_key)
+    @classmethod
+    async def store_refresh_token(cls, user_id: int, jti: str, expires_at: float, replaces: Optional[str] = None) -> bool:
+        """
+        refresh_token의 jti를 회원별 ZSET(score=만료 시각)에 저장한다.
+        같은 스크립트 안에서 만료된 jti를 지우고, 회원당 REFRESH_TOKENS_PER_USER 개만 남긴다. (먼저 만료되는 것부터 삭제)
+        replaces: 회전(rotation)으로 대체되는 이전 jti. 동시에 나간 요청을 위해 REFRESH_ROTATION_GRACE 초만 더 유효하다.
+        """
+        user_key = f"{REFRESH_JTI_PREFIX}{user_id}"
+        args = [jti, expires_at, time.time(), REFRESH_TOKENS_PER_USER, REFRESH_ROTATION_GRACE]
+        if replaces:
+            args.append(replaces)
+        return bool(await cls._execute(lambda client: client.eval(_STORE_REFRESH_JTI_LUA, 1, user_key, *args)))
 
-        try:
-            await execute_revoke(redis_client)
-        except Exception as e:
-            print(f"Redis 연결 오류 발생, 재시도 중: {e}")
-            await redis_client.close()
+    @classmethod
+    async def validate_refresh_token(cls, user_id: int, jti: str) -> bool:
+        """ZSCORE 한번으로 확인 (O(1))"""
+        user_key = f"{REFRESH_JTI_PREFIX}{user_id}"
+        expires_at = await cls._execute(lambda client: client.zscore(user_key, jti))
+        return expires_at is not None and expires_at > time.time()
 
-            import app.core.redis as redis_module
-            redis_module.redis_client = None
-            new_client = get_redis_client()
+    @classmethod
+    async def validate_legacy_refresh_token(cls, user_id: int, refresh_token: str) -> bool:
+        """jti가 없는 예전 refresh_token(토큰 문자열 SET에 저장). 처음 사용될 때 jti 토큰으로 회전된다."""
+        user_key = f"{REFRESH_TOKEN_PREFIX}{user_id}"
+        return bool(await cls._execute(lambda client: client.sismember(user_key, refresh_token)))
 
-            await execute_revoke(new_client)
+    @classmethod
+    async def revoke_legacy_refresh_token(cls, user_id: int, refresh_token: str) -> bool:
+        user_key = f"{REFRESH_TOKEN_PREFIX}{user_id}"
+        await cls._execute(lambda client: client.srem(user_key, refresh_token))
+        return True
 
+    @classmethod
+    async def revoke_refresh_token(cls, user_id: int, jti: Optional[str] = None) -> bool:
+        """jti 하나만, 또는 jti가 없으면 회원의 모든 refresh_token(예전 SET 포함)을 폐기"""
+        if jti:
+            await cls._execute(lambda client: client.zrem(f"{REFRESH_JTI_PREFIX}{user_id}", jti))
+        else:
+            await cls._execute(lambda client: client.delete(f"{REFRESH_JTI_PREFIX}{user_id}",
+                                                            f"{REFRESH_TOKEN_PREFIX}{user_id}"))
         return True
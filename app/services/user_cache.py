@@ -0,0 +1,104 @@
+import json
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+
+from app.core.redis import get_redis_client
+from app.models.users import User
+
+USER_SNAPSHOT_PREFIX = "users:snapshot:"  # 로그인 사용자 조회용 스냅샷 (user_id별)
+USER_SNAPSHOT_TTL = 60  # 초: 다른 경로로 바뀌어도(직접 DB 수정 등) 이 시간 안에 DB 기준으로 다시 맞춰진다.
+LOCAL_SNAPSHOT_TTL = 5  # 초: worker 메모리 캐시. 다른 worker의 무효화는 Redis만 지우므로 짧게 둔다.
+LOCAL_SNAPSHOT_MAXSIZE = 1024
+
+# 비밀번호 해시는 캐시에 두지 않는다. (필요하면 같은 세션의 get_user_by_id 조회가 채운다)
+SNAPSHOT_FIELDS = ("id", "username", "email", "img_path", "is_admin")
+SNAPSHOT_DATETIME_FIELDS = ("created_at", "updated_at")
+
+_local_snapshots: "OrderedDict[int, tuple[float, dict]]" = OrderedDict()
+
+
+def _snapshot_key(user_id: int) -> str:
+    return f"{USER_SNAPSHOT_PREFIX}{user_id}"
+
+
+def _to_snapshot(user: User) -> dict:
+    snapshot = {field: getattr(user, field) for field in SNAPSHOT_FIELDS}
+    for field in SNAPSHOT_DATETIME_FIELDS:
+        snapshot[field] = getattr(user, field).isoformat()
+    return snapshot
+
+
+def _local_get(user_id: int) -> Optional[dict]:
+    entry = _local_snapshots.get(user_id)
+    if entry is None:
+        return None
+    expires_at, snapshot = entry
+    if expires_at < time.monotonic():
+        _local_snapshots.pop(user_id, None)
+        return None
+    _local_snapshots.move_to_end(user_id)
+    return snapshot
+
+
+def _local_set(user_id: int, snapshot: dict) -> None:
+    _local_snapshots[user_id] = (time.monotonic() + LOCAL_SNAPSHOT_TTL, snapshot)
+    _local_snapshots.move_to_end(user_id)
+    while len(_local_snapshots) > LOCAL_SNAPSHOT_MAXSIZE:
+        _local_snapshots.popitem(last=False)
+
+
+class UserCache:
+    """
+    로그인 사용자(get_current_user) 조회 캐시: worker 메모리 LRU -> Redis -> DB 순서로 찾는다.
+    캐시에서 찾으면 요청 세션에 merge(load=False)로 붙여서 돌려주므로 SQL 없이 세션의 User 객체가 된다.
+    (같은 요청에서 get_user_by_id로 다시 조회해도 같은 객체이므로 user != current_user 비교가 그대로 동작한다)
+    회원 정보가 바뀌면 UserService에서 commit 후 invalidate 한다.
+    Redis 장애 시에는 캐시 없이 DB 조회로 폴백한다.
+    """
+
+    @classmethod
+    async def get(cls, user_id: int, db: AsyncSession) -> Optional[User]:
+        snapshot = _local_get(user_id)
+        if snapshot is None:
+            try:
+                value = await get_redis_client().get(_snapshot_key(user_id))
+            except Exception as e:
+                print(f"UserCache.get Redis 오류: {e}")
+                return None
+            if value is None:
+                return None
+            snapshot = json.loads(value)
+            _local_set(user_id, snapshot)
+        return await cls._attach(snapshot, db)
+
+    @classmethod
+    async def set(cls, user: User) -> None:
+        snapshot = _to_snapshot(user)
+        _local_set(user.id, snapshot)
+        try:
+            await get_redis_client().set(_snapshot_key(user.id), json.dumps(snapshot), ex=USER_SNAPSHOT_TTL)
+        except Exception as e:
+            print(f"UserCache.set Redis 오류: {e}")
+
+    @classmethod
+    async def invalidate(cls, user_id: int) -> None:
+        _local_snapshots.pop(user_id, None)
+        try:
+            await get_redis_client().delete(_snapshot_key(user_id))
+        except Exception as e:
+            print(f"UserCache.invalidate Redis 오류: {e}")
+
+    @classmethod
+    async def _attach(cls, snapshot: dict, db: AsyncSession) -> User:
+        # 요청마다 새 객체를 만든다: 캐시된 객체를 여러 세션이 같이 쓰면 안 된다.
+        values = {field: snapshot[field] for field in SNAPSHOT_FIELDS}
+        for field in SNAPSHOT_DATETIME_FIELDS:
+            values[field] = datetime.fromisoformat(snapshot[field])
+        user = User(**values)
+        make_transient_to_detached(user)  # password는 로드되지 않은 속성으로 남는다.
+        return await db.merge(user, load=False)
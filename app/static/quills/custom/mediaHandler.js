@@ -254,8 +254,67 @@ export class QuillImageVideoHandler {
         return response.json();
     }
 
-    // 서버에 동영상 파일을 업로드하는 비동기 메서드
+    // 동영상 이어받기 업로드: init -> 청크 PUT(offset) -> finalize
+    // 청크 요청이 실패하면 서버가 받은 offset을 다시 물어보고 거기서부터 이어서 보낸다.
+    // sha256은 청크마다 계산한다. (파일 전체를 한번에 메모리에 올리지 않는다: 최대 청크 크기만큼만)
     async videoUploadToServer(file) {
+        if (!(window.crypto && window.crypto.subtle)) {
+            return this.videoUploadToServerOnce(file); // https/localhost가 아니면 sha256 계산 불가: 한번에 업로드
+        }
+        const baseUrl = this.config.videoUploadUrl;
+        const jsonHeaders = {...(this.config.headers || {}), 'Content-Type': 'application/json'};
+
+        let response = await fetch(`${baseUrl}/init`, {
+            method: 'POST',
+            body: JSON.stringify({filename: file.name, size: file.size}),
+            headers: jsonHeaders,
+        });
+        if (!response.ok) {
+            throw new Error('Upload init failed: ' + response.status);
+        }
+        let state = await response.json();
+        const uploadUrl = `${baseUrl}/${state.upload_id}`;
+
+        let retries = 0;
+        while (state.offset < state.size) {
+            const controller = new AbortController();
+            const timeoutId = setTimeout(() => controller.abort(), this.config.timeoutMs);
+            try {
+                const chunk = await file.slice(state.offset, state.offset + state.chunk_size).arrayBuffer();
+                const digest = await window.crypto.subtle.digest('SHA-256', chunk);
+                const chunkSha256 = Array.from(new Uint8Array(digest)).map(b => b.toString(16).padStart(2, '0')).join('');
+                response = await fetch(`${uploadUrl}?offset=${state.offset}`, {
+                    method: 'PUT',
+                    body: chunk,
+                    headers: {...(this.config.headers || {}), 'Content-Type': 'application/octet-stream',
+                              'X-Chunk-SHA256': chunkSha256},
+                    signal: controller.signal,
+                });
+                if (!response.ok) {
+                    throw new Error('Upload chunk failed: ' + response.status);
+                }
+                state = await response.json();
+                retries = 0;
+            } catch (e) {
+                if (++retries > 5) throw e;
+                await new Promise(resolve => setTimeout(resolve, 1000 * retries));
+                response = await fetch(uploadUrl, {headers: this.config.headers});
+                if (!response.ok) throw e; // 세션 만료 등
+                state = await response.json();
+            } finally {
+                clearTimeout(timeoutId);
+            }
+        }
+
+        response = await fetch(`${uploadUrl}/finalize`, {method: 'POST', headers: this.config.headers});
+        if (!response.ok) {
+            throw new Error('Upload failed: ' + response.status);
+        }
+        return response.json();
+    }
+
+    // 서버에 동영상 파일을 한번에 업로드하는 비동기 메서드
+    async videoUploadToServerOnce(file) {
         const controller = new AbortController();
         const timeoutId = setTimeout(() => controller.abort(), this.config.timeoutMs);
 
@@ -1,9 +1,12 @@
 import asyncio
 import re
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
 
 from passlib.context import CryptContext
 
-from app.core.settings import ADMINS
+from app.core.settings import ADMINS, CONFIG
 from app.models.users import User
 from app.utils.exc_handler import CustomErrorException
 
@@ -12,20 +15,123 @@ pip install "bcrypt==4.0.1"  # 반드시 bcrypt==4.0.1로 설치해야 한다.
 pip install "passlib[bcrypt]"
 """
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+def build_password_context(scheme: str = CONFIG.PASSWORD_HASH_SCHEME,
+                           bcrypt_rounds: int = CONFIG.PASSWORD_BCRYPT_ROUNDS) -> CryptContext:
+    """설정된 알고리즘/비용으로 새 해시를 만든다. (bcrypt 비용은 calibrate-password-hash 명령으로 정한다)
+    이전 알고리즘과 다른 비용의 bcrypt 해시도 검증되고, needs_update가 True가 되어 로그인 때 다시 해시된다.
+    argon2로 바꾸려면 PASSWORD_HASH_SCHEME=argon2 (argon2-cffi 설치 필요)"""
+    schemes = [scheme] if scheme == "bcrypt" else [scheme, "bcrypt"]
+    return CryptContext(schemes=schemes, deprecated="auto",
+                        bcrypt__default_rounds=bcrypt_rounds,
+                        bcrypt__min_rounds=bcrypt_rounds,
+                        bcrypt__max_rounds=bcrypt_rounds)
+
+
+pwd_context = build_password_context()
 
 # 미리 컴파일된 정규식 (알파벳, 숫자, 특수문자 포함 9~50자)
 # PASSWORD_REGEX = re.compile(r"^(?=.*[A-Za-z])(?=.*\d)(?=.*[!@#$%^&*?_=+-])[A-Za-z\d!@#$%^&*?_=+-]{9,50}$")
 
 
+""" 비밀번호 해시/검증 전용 실행기
+bcrypt는 일부러 느린(CPU) 연산이라, 기본 스레드 풀(asyncio.to_thread: JWT 생성, 파일 삭제 등이 함께 쓰는 풀)을 쓰면
+로그인이 몰릴 때 다른 작업까지 기다리게 된다. 그래서 크기가 정해진 별도 실행기에서만 돌린다.
+- PASSWORD_HASH_EXECUTOR: "thread"(기본, bcrypt는 GIL을 놓고 계산한다) 또는 "process"
+- 동시에 실행/대기할 수 있는 요청은 PASSWORD_HASH_MAX_PENDING 개. 자리가 PASSWORD_HASH_ADMISSION_TIMEOUT 초 안에 나지 않으면
+  439(과도한 요청, Retry-After)로 바로 돌려보낸다. (대기열이 끝없이 길어지지 않게)
+"""
+_password_executor: Optional[Executor] = None
+_password_slots: Optional[asyncio.Semaphore] = None
+password_hash_stats = {"running": 0, "waiting": 0, "completed": 0, "rejected": 0, "wait_seconds": 0.0}
+
+
+def _hash_password(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _verify_password(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+def _verify_and_update_password(plain_password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+def get_password_executor() -> Executor:
+    """worker 프로세스마다 lazy 생성 (이미지 프로세스 풀과 같은 방식)"""
+    global _password_executor
+    if _password_executor is None:
+        if CONFIG.PASSWORD_HASH_EXECUTOR == "process":
+            _password_executor = ProcessPoolExecutor(max_workers=CONFIG.PASSWORD_HASH_WORKERS)
+        else:
+            _password_executor = ThreadPoolExecutor(max_workers=CONFIG.PASSWORD_HASH_WORKERS,
+                                                    thread_name_prefix="password-hash")
+    return _password_executor
+
+
+def shutdown_password_executor() -> None:
+    global _password_executor
+    if _password_executor is not None:
+        _password_executor.shutdown(wait=False, cancel_futures=True)
+        _password_executor = None
+
+
+async def _run_password_task(func, *args):
+    global _password_slots
+    if _password_slots is None:
+        _password_slots = asyncio.Semaphore(CONFIG.PASSWORD_HASH_MAX_PENDING)
+
+    started = time.perf_counter()
+    password_hash_stats["waiting"] += 1
+    try:
+        await asyncio.wait_for(_password_slots.acquire(), timeout=CONFIG.PASSWORD_HASH_ADMISSION_TIMEOUT)
+    except asyncio.TimeoutError:
+        password_hash_stats["rejected"] += 1
+        print("CustomErrorException STATUS_CODE: ", 439, "비밀번호 연산 대기 초과")
+        raise CustomErrorException(status_code=439, detail="과도한 요청: 잠시 후에 다시 진행해 주세요",
+                                   headers={"Retry-After": "1"})
+    finally:
+        password_hash_stats["waiting"] -= 1
+    password_hash_stats["wait_seconds"] += time.perf_counter() - started
+
+    password_hash_stats["running"] += 1
+    try:
+        task = get_password_executor().submit(func, *args)
+    except BaseException:
+        _release_password_slot()
+        raise
+    # 자리는 실행기 작업이 실제로 끝날 때 돌려준다. 요청(코루틴)이 먼저 취소돼도 실행 중인 bcrypt는 멈추지 않으므로,
+    # 코루틴의 finally에서 돌려주면 실행기 안의 작업 수가 PASSWORD_HASH_MAX_PENDING을 넘을 수 있다.
+    future = asyncio.wrap_future(task)
+    future.add_done_callback(_release_password_slot)
+    try:
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        task.cancel()  # 아직 시작 전이면 취소된다. (실행 중이면 끝날 때까지 자리를 잡고 있다)
+        raise
+
+
+def _release_password_slot(_future=None) -> None:
+    password_hash_stats["running"] -= 1
+    password_hash_stats["completed"] += 1
+    _password_slots.release()
+
+
 async def get_password_hash(password: str) -> str:
-    # CPU 바운드 작업: 스레드 풀로 오프로드
-    return await asyncio.to_thread(pwd_context.hash, password)
+    # CPU 바운드 작업: 비밀번호 전용 실행기로 오프로드
+    return await _run_password_task(_hash_password, password)
 
 
 async def verify_password(plain_password: str, hashed_password: str) -> bool:
-    # CPU 바운드 작업: 스레드 풀로 오프로드
-    return await asyncio.to_thread(pwd_context.verify, plain_password, hashed_password)
+    # CPU 바운드 작업: 비밀번호 전용 실행기로 오프로드
+    return await _run_password_task(_verify_password, plain_password, hashed_password)
+
+
+async def verify_and_update_password(plain_password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+    """(일치 여부, 새 해시). 해시의 알고리즘/비용이 현재 설정과 다르면 같은 실행에서 새 해시를 만들어 돌려준다. (아니면 None)"""
+    return await _run_password_task(_verify_and_update_password, plain_password, hashed_password)
 
 
 def optimal_password(password: str):
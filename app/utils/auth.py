@@ -1,4 +1,6 @@
 import asyncio
+import hashlib
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
 import time
 from typing import Optional, Any
@@ -12,6 +14,8 @@ from fastapi import Depends, HTTPException
 from app.core.database import get_db
 from app.core.settings import CONFIG
 from app.models.users import User
+from app.services.token_service import AsyncTokenService
+from app.services.user_cache import UserCache
 from app.utils.commons import refresh_expire
 
 """
@@ -44,11 +48,11 @@ async def create_access_token(data: dict, expires_delta: Optional[timedelta] = N
 JWT refresh 토큰을 생성합니다.
 """
 
-async def create_refresh_token(data: dict) -> str:
+async def create_refresh_token(data: dict, expire: Optional[datetime] = None) -> str:
     user_id = data["user_id"]
     # 만료 시간 설정(7일)
-    _REFRESH_COOKIE_EXPIRE = refresh_expire()
-    expire = _REFRESH_COOKIE_EXPIRE
+    if expire is None:
+        expire = refresh_expire()
 
     # JWT 페이로드에 만료 시간과 고유 ID 추가
     refresh_payload = {
@@ -56,6 +60,8 @@ async def create_refresh_token(data: dict) -> str:
         "exp": expire,
         "type": "refresh"  # 토큰 타입 명시
     }
+    if data.get("jti"):
+        refresh_payload["jti"] = data["jti"]  # Redis 저장/폐기는 토큰 문자열 대신 jti로 한다.
 
     # JWT 토큰 생성 (스레드로 오프로드)
     encoded_jwt = await asyncio.to_thread(jwt.encode,
@@ -69,23 +75,41 @@ async def create_refresh_token(data: dict) -> str:
 JWT 토큰을 검증하고 페이로드를 반환합니다.
 """
 
+VERIFIED_TOKEN_CACHE_MAXSIZE = 4096  # worker별 서명 검증이 끝난 토큰 수
+_verified_tokens: "OrderedDict[str, tuple[float, dict[str, Any]]]" = OrderedDict()
+verified_token_cache_stats = {"hits": 0, "misses": 0}
+
+
+def _decode_verified(token: str) -> dict[str, Any]:
+    """서명 검증된 payload. 같은 토큰은 worker당 한번만 검증한다. (키: 토큰의 sha256, exp까지만 유효)
+    만료/검증 실패 시 jwt.decode와 같은 예외(ExpiredSignatureError, JWTError)를 던진다."""
+    digest = hashlib.sha256(token.encode("utf-8")).hexdigest()
+    cached = _verified_tokens.get(digest)
+    if cached is not None:
+        exp_ts, payload = cached
+        if exp_ts > time.time():
+            verified_token_cache_stats["hits"] += 1
+            _verified_tokens.move_to_end(digest)
+            return dict(payload)  # 호출한 쪽에서 고쳐도 캐시는 그대로
+        _verified_tokens.pop(digest, None)
+        raise ExpiredSignatureError("Signature has expired.")
+
+    verified_token_cache_stats["misses"] += 1
+    payload = jwt.decode(token, CONFIG.SECRET_KEY, algorithms=[CONFIG.ALGORITHM])
+    exp_ts = payload.get("exp")
+    if isinstance(exp_ts, (int, float)):  # exp 없는 토큰은 캐시하지 않는다.
+        _verified_tokens[digest] = (exp_ts, dict(payload))
+        while len(_verified_tokens) > VERIFIED_TOKEN_CACHE_MAXSIZE:
+            _verified_tokens.popitem(last=False)
+        if CONFIG.DEBUG:
+            print("verify_token: seconds_left:", int(exp_ts - time.time()))
+    return payload
+
+
 # AI Chat 권장: 동기 함수로 두는 것이 좋습니다.
 def verify_token(token: str, *, type_: Optional[str] = None) -> Optional[dict[str, Any]]:
-    # 디버깅용 로그 (원한다면 유지)
-    try:
-        unverified = jwt.get_unverified_claims(token)
-        exp_ts = unverified.get("exp")
-        if exp_ts:
-            print("============== 해당 token의 만료기간 관련 정보 ==============")
-            print("exp:", datetime.fromtimestamp(exp_ts, tz=timezone.utc))
-            print("now:", datetime.now(timezone.utc))
-            print("seconds_left:", int(exp_ts - datetime.now(timezone.utc).timestamp()))
-    except Exception as e:
-        print("get_unverified_claims 실패는 단순 디버깅 용도이므로 그대로 진행", e)
-        pass
-
     try:
-        payload = jwt.decode(token, CONFIG.SECRET_KEY, algorithms=[CONFIG.ALGORITHM])
+        payload = _decode_verified(token)
         if type_ is not None and payload.get("type") != type_:
             # 타입 불일치 시 무효
             return None
@@ -117,7 +141,19 @@ async def payload_to_user(access_token: str, db: AsyncSession = Depends(get_db)
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    # 사용자 조회
+    # 로그아웃 등으로 폐기된 토큰: 대부분은 worker의 Bloom filter에서 Redis 조회 없이 통과한다.
+    if await AsyncTokenService.is_token_blacklisted(access_token):
+        raise HTTPException(
+            status_code=401,
+            detail="만료된 토큰입니다.",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    # 사용자 조회: 캐시(worker 메모리/Redis)에 있으면 DB 조회 없이 세션에 붙여서 돌려준다.
+    user = await UserCache.get(user_id, db)
+    if user is not None:
+        return user
+
     # query = (select(User).where(User.username == username)) # username 변경시 변경된 username때문데 User를 찾을 수 없다.
     query = (select(User).where(User.id == user_id))
     result = await db.execute(query)
@@ -129,6 +165,7 @@ async def payload_to_user(access_token: str, db: AsyncSession = Depends(get_db)
             headers={"WWW-Authenticate": "Bearer"},
         )
     print("payload_to_user: user:::: : ", user)
+    await UserCache.set(user)
     return user
 """
 JWT 토큰의 남은 만료 시간을 초 단위로 계산
@@ -137,7 +174,7 @@ JWT 토큰의 남은 만료 시간을 초 단위로 계산
 # AI chat: 요약: 대부분의 경우 동기 함수로 두는 것이 더 낫습니다.
 def get_token_expiry(token: str) -> int:
     try:
-        payload = jwt.decode(token, CONFIG.SECRET_KEY, algorithms=[CONFIG.ALGORITHM])
+        payload = _decode_verified(token)  # 로그아웃: 요청 인증 때 검증한 토큰이면 다시 디코드하지 않는다.
         # payload = await asyncio.to_thread(
         #     jwt.decode,
         #     token,
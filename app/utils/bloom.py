@@ -0,0 +1,31 @@
+""" 프로세스 안 Bloom filter
+"없다"는 답은 항상 정확하고, "있다"는 답은 드물게(false positive) 틀릴 수 있다.
+토큰 블랙리스트처럼 대부분의 조회 결과가 "없다"인 곳에서 Redis 왕복 앞에 둔다.
+"""
+import hashlib
+
+
+class BloomFilter:
+    def __init__(self, size_bits: int = 1 << 20, hash_count: int = 7):
+        self.size_bits = size_bits
+        self.hash_count = hash_count
+        self.count = 0
+        self._bits = bytearray(size_bits // 8)
+
+    def _positions(self, item: str):
+        # sha256 한번에서 hash_count개 위치를 만든다 (4바이트씩)
+        digest = hashlib.sha256(item.encode("utf-8")).digest()
+        for i in range(self.hash_count):
+            yield int.from_bytes(digest[i * 4:(i + 1) * 4], "big") % self.size_bits
+
+    def add(self, item: str) -> None:
+        for pos in self._positions(item):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+    def clear(self) -> None:
+        self._bits = bytearray(self.size_bits // 8)
+        self.count = 0
@@ -1,4 +1,5 @@
 import datetime
+import hashlib
 import random
 import re
 import shutil
@@ -15,6 +16,8 @@ from pydantic_core import PydanticCustomError
 from starlette.concurrency import run_in_threadpool
 
 from app.core.settings import MEDIA_DIR, CONFIG, templates
+from app.utils.images import (original_image_name, strip_original_mark, image_paths_with_variants,
+                              generate_image_variants)
 from app.models.users import User
 
 
@@ -112,7 +115,13 @@ async def file_renaming(username:str, ext:str):
 async def upload_single_image(path:str, user: User, imagefile: UploadFile = None):
     try:
         upload_dir = f"{path}"+"/"+f"{user.id}"+"/" # d/t Linux
-        url = await file_write_return_url(upload_dir, user, imagefile, "media", _type="image")
+        url = await file_write_return_url(upload_dir, user, imagefile, "media", _type="image", original=True)
+        # 목록/상세용으로 줄인 파생본(+WebP)을 프로세스 풀에서 생성 (템플릿은 img_variant 필터로 선택)
+        if url and not await generate_image_variants(f"{MEDIA_DIR}{url}"):
+            # 파생본을 못 만들었으면(GIF, 깨진 파일 등) 원본 표시(.orig)를 떼서 원본을 그대로 쓰게 한다.
+            plain_url = strip_original_mark(url)
+            await run_in_threadpool(os.replace, f"{MEDIA_DIR}{url}", f"{MEDIA_DIR}{plain_url}")
+            url = plain_url
         return url
 
     except Exception as e:
@@ -121,13 +130,15 @@ async def upload_single_image(path:str, user: User, imagefile: UploadFile = None
                             detail="이미지 파일이 제대로 Upload되지 않았습니다. ")
 
 #
-async def file_write_return_url(upload_dir: str, user: User, file: UploadFile, _dir: str, _type: str):
+async def file_write_return_url(upload_dir: str, user: User, file: UploadFile, _dir: str, _type: str, original: bool = False):
     if not os.path.exists(upload_dir):
         os.makedirs(upload_dir)
 
     filename_only, ext = os.path.splitext(file.filename)
     if len(file.filename.strip()) > 0 and len(filename_only) > 0:
         upload_filename = await file_renaming(user.username, ext)
+        if original:  # 파생본을 만들 원본: 이름.orig.ext
+            upload_filename = original_image_name(upload_filename)
         file_path = upload_dir + upload_filename
 
         async with aio.open(file_path, "wb") as outfile:
@@ -154,6 +165,46 @@ async def file_write_return_url(upload_dir: str, user: User, file: UploadFile, _
     else:
         return None
 
+#
+async def write_hashed_temp_file(tmp_dir: str, file: UploadFile, _type: str):
+    """
+    에디터 업로드(내용 주소 저장)용: 청크를 임시 파일에 쓰면서 sha256을 같이 계산한다. (파일 전체를 메모리에 올리지 않는다)
+    return: (임시 파일 경로, sha256, 크기, 소문자 확장자) 또는 파일명이 비어 있으면 None
+    """
+    filename_only, ext = os.path.splitext(file.filename or "")
+    if not filename_only.strip():
+        return None
+
+    await run_in_threadpool(os.makedirs, tmp_dir, exist_ok=True)
+    tmp_path = os.path.join(tmp_dir, uuid.uuid4().hex)
+
+    hasher = hashlib.sha256()
+    size = 0
+    _CHUNK = 1024 * 1024 if _type == "image" else 8 * 1024 * 1024  # 동영상은 8MB 청크
+    try:
+        async with aio.open(tmp_path, "wb") as outfile:
+            while True:
+                chunk = await file.read(_CHUNK)
+                if not chunk:
+                    break
+                hasher.update(chunk)
+                size += len(chunk)
+                await outfile.write(chunk)
+            await outfile.flush()
+    except Exception:
+        await remove_file_path(tmp_path)
+        raise
+    return tmp_path, hasher.hexdigest(), size, ext.lower()
+
+
+def move_into_place(tmp_path: str, dest_path: str) -> bool:
+    """임시 파일을 최종 위치로 옮긴다. 같은 내용의 파일이 이미 있으면 옮기지 않고 False (임시 파일 정리는 호출한 쪽)"""
+    if os.path.exists(dest_path):
+        return False
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    os.replace(tmp_path, dest_path)  # 같은 파일시스템 안에서 원자적으로 이동
+    return True
+
 #
 """# 존재 체크-후-삭제 사이에 경쟁 상태가 생길 수 있슴, 
 권장: 존재 여부 체크 없이 바로 삭제 시도 (경쟁 상태 방지)"""
@@ -187,8 +238,9 @@ async def old_image_remove(filename:str, path:str):
         filename_only, ext = os.path.splitext(filename)
         if len(filename.strip()) > 0 and len(filename_only) > 0 and path is not None:
             # old_image_path = f'{APP_DIR}{path}' # \\없어도 된다. url 맨 앞에 \\ 있다.
-            old_image_path = f'{MEDIA_DIR}'+'/'+f'{path}'
-            await remove_file_path(old_image_path)
+            for image_path in image_paths_with_variants(path):  # 원본 + 파생본
+                old_image_path = f'{MEDIA_DIR}'+'/'+f'{image_path}'
+                await remove_file_path(old_image_path)
 
     except Exception as e:
         print(e)
@@ -1,4 +1,5 @@
 from fastapi_mail import FastMail, ConnectionConfig
+from jinja2 import Template
 from pydantic import EmailStr, TypeAdapter, SecretStr
 
 from app.core.settings import CONFIG
@@ -61,4 +62,11 @@ AUTHCODE_EMAIL_HTML_TEMPLATE = """
 </html>
 """
 
-fastapi_email = FastMail(mail_conf)
\ No newline at end of file
+fastapi_email = FastMail(mail_conf)
+
+# 템플릿은 모듈 로드 때 한번만 컴파일한다.
+AUTHCODE_EMAIL_TEMPLATE = Template(AUTHCODE_EMAIL_HTML_TEMPLATE)
+
+
+def render_authcode_email(code: str, title: str) -> str:
+    return AUTHCODE_EMAIL_TEMPLATE.render(code=code, title=title)
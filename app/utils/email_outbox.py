@@ -0,0 +1,210 @@
+import asyncio
+import time
+import uuid
+from email.message import EmailMessage
+from typing import Optional
+
+import aiosmtplib
+
+from app.core.redis import get_redis_client
+from app.core.settings import CONFIG
+from app.utils.email import MAIL_FROM
+
+""" 이메일 발송 대기열(outbox)
+요청 처리 중에는 렌더링된 메일을 Redis에 넣기만 하고(왕복 1번), 실제 발송은 worker의 백그라운드 작업(inits.py lifespan)이 한다.
+- 백그라운드 작업은 SMTP 연결(STARTTLS, 로그인)을 유지하면서 EMAIL_OUTBOX_BATCH_SIZE 개씩 같은 연결로 보낸다.
+- 실패하면 지수 backoff로 다시 시도하고, EMAIL_OUTBOX_MAX_ATTEMPTS 번 실패하면 failed로 둔다.
+- 꺼낸 메일은 임대 시간(EMAIL_OUTBOX_LEASE_SECONDS) 동안 예약 ZSET에 남겨 두므로, 발송 중에 프로세스가 죽어도 다시 보내진다.
+  배치 안에서는 메일 하나를 보낼 때마다 남은 메일의 임대를 연장하고, 결과도 보낸 직후에 기록한다.
+  (느린 SMTP 서버에서 배치가 임대 시간을 넘겨도 다른 worker가 같은 메일을 다시 보내지 않게)
+- 발송 상태는 EmailOutbox.status(message_id)로 확인한다. (메일 내용과 함께 EMAIL_OUTBOX_MESSAGE_TTL 동안 보관)
+"""
+
+EMAIL_OUTBOX_QUEUE_KEY = "email_outbox:queue"  # 보낼 메일 id LIST (LPUSH -> RPOP)
+EMAIL_OUTBOX_SCHEDULED_KEY = "email_outbox:scheduled"  # 재시도 대기/발송 중(임대) id ZSET (score=다시 보낼 시각)
+EMAIL_OUTBOX_MESSAGE_PREFIX = "email_outbox:message:"  # 메일 내용과 상태 HASH
+EMAIL_OUTBOX_MESSAGE_TTL = 60 * 60 * 24  # 1일
+EMAIL_OUTBOX_SMTP_TIMEOUT_SECONDS = 30  # SMTP 명령 하나(연결, STARTTLS, 로그인, 발송)의 timeout
+# 메일 하나를 보내기 시작한 뒤 이 시간 안에 결과가 기록되지 않으면 다시 대기열로.
+# 메일 하나의 최악(재연결 3단계 + 발송, 각각 SMTP timeout)보다 길어야 한다.
+EMAIL_OUTBOX_LEASE_SECONDS = 5 * EMAIL_OUTBOX_SMTP_TIMEOUT_SECONDS
+EMAIL_OUTBOX_POLL_SECONDS = 0.5  # 대기열이 비었을 때 확인 간격
+EMAIL_OUTBOX_RETRY_BASE_SECONDS = 5  # 재시도 간격: 5, 10, 20, 40... 초
+EMAIL_OUTBOX_RETRY_MAX_SECONDS = 5 * 60
+
+# 시각이 된 재시도/임대 만료 id를 대기열로 옮기고, 배치만큼 꺼내서 임대 시각으로 예약에 올린다.
+# KEYS: queue, scheduled / ARGV: 현재 시각, 배치 크기, 임대 만료 시각
+_CLAIM_LUA = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', ARGV[1], 'LIMIT', 0, 100)
+for _, id in ipairs(due) do
+    redis.call('ZREM', KEYS[2], id)
+    redis.call('LPUSH', KEYS[1], id)
+end
+local ids = redis.call('RPOP', KEYS[1], ARGV[2])
+if not ids then
+    return {}
+end
+for _, id in ipairs(ids) do
+    redis.call('ZADD', KEYS[2], ARGV[3], id)
+end
+return ids
+"""
+
+
+def _message_key(message_id: str) -> str:
+    return f"{EMAIL_OUTBOX_MESSAGE_PREFIX}{message_id}"
+
+
+class _SmtpConnection:
+    """worker의 백그라운드 작업이 유지하는 SMTP 연결. 오류가 나면 끊고 다음 발송 때 다시 연결한다."""
+
+    def __init__(self):
+        self._smtp: Optional[aiosmtplib.SMTP] = None
+        self._last_used = 0.0
+
+    async def send(self, message: EmailMessage) -> None:
+        if self._smtp is None or not self._smtp.is_connected:
+            self._smtp = aiosmtplib.SMTP(
+                hostname=CONFIG.SMTP_HOST,
+                port=CONFIG.SMTP_PORT,
+                username=CONFIG.SMTP_USERNAME or None,
+                password=CONFIG.SMTP_PASSWORD or None,
+                start_tls=CONFIG.SMTP_STARTTLS,
+                validate_certs=CONFIG.SMTP_VALIDATE_CERTS,
+                timeout=EMAIL_OUTBOX_SMTP_TIMEOUT_SECONDS,
+            )
+            await self._smtp.connect()  # 연결 + STARTTLS + 로그인
+        try:
+            await self._smtp.send_message(message)
+        except (aiosmtplib.SMTPServerDisconnected, aiosmtplib.SMTPTimeoutError):
+            await self.close()
+            raise
+        self._last_used = time.monotonic()
+
+    async def close_if_idle(self) -> None:
+        if self._smtp is not None and time.monotonic() - self._last_used > CONFIG.EMAIL_OUTBOX_SMTP_IDLE_SECONDS:
+            await self.close()
+
+    async def close(self) -> None:
+        smtp, self._smtp = self._smtp, None
+        if smtp is not None and smtp.is_connected:
+            try:
+                await smtp.quit()
+            except Exception:
+                smtp.close()
+
+
+class EmailOutbox:
+
+    @classmethod
+    async def enqueue(cls, to: str, subject: str, html: str) -> str:
+        """메일을 대기열에 넣고 message_id를 돌려준다."""
+        message_id = uuid.uuid4().hex
+        key = _message_key(message_id)
+        async with get_redis_client().pipeline(transaction=True) as pipe:
+            pipe.hset(key, mapping={
+                "to": to,
+                "subject": subject,
+                "html": html,
+                "status": "queued",
+                "attempts": 0,
+                "created_at": int(time.time()),
+            })
+            pipe.expire(key, EMAIL_OUTBOX_MESSAGE_TTL)
+            pipe.lpush(EMAIL_OUTBOX_QUEUE_KEY, message_id)
+            await pipe.execute()
+        return message_id
+
+    @classmethod
+    async def status(cls, message_id: str) -> Optional[dict]:
+        """{"status": queued|retrying|sent|failed, "attempts": n} 또는 없으면 None"""
+        status, attempts = await get_redis_client().hmget(_message_key(message_id), ["status", "attempts"])
+        if status is None:
+            return None
+        return {"status": status, "attempts": int(attempts or 0)}
+
+    @classmethod
+    async def send_batch(cls, smtp: _SmtpConnection) -> int:
+        """대기열에서 배치 하나를 꺼내 보내고 결과를 기록한다. 꺼낸 메일 수를 돌려준다."""
+        redis_client = get_redis_client()
+        now = time.time()
+        ids = await redis_client.eval(_CLAIM_LUA, 2, EMAIL_OUTBOX_QUEUE_KEY, EMAIL_OUTBOX_SCHEDULED_KEY,
+                                      now, CONFIG.EMAIL_OUTBOX_BATCH_SIZE, now + EMAIL_OUTBOX_LEASE_SECONDS)
+        if not ids:
+            return 0
+
+        async with redis_client.pipeline(transaction=False) as pipe:
+            for message_id in ids:
+                pipe.hgetall(_message_key(message_id))
+            messages = await pipe.execute()
+
+        smtp_down = False
+        for index, (message_id, data) in enumerate(zip(ids, messages)):
+            key = _message_key(message_id)
+            async with redis_client.pipeline(transaction=False) as results:
+                if not data:  # 보관 기간이 지나서 내용이 없다.
+                    results.zrem(EMAIL_OUTBOX_SCHEDULED_KEY, message_id)
+                    await results.execute()
+                    continue
+                if smtp_down:  # 연결이 안 되면 배치의 나머지는 시도 횟수를 올리지 않고 미룬다.
+                    results.zadd(EMAIL_OUTBOX_SCHEDULED_KEY, {message_id: time.time() + EMAIL_OUTBOX_RETRY_BASE_SECONDS})
+                    await results.execute()
+                    continue
+                # 이 메일과 배치의 남은 메일 임대 연장: 앞의 메일이 느리게 보내져도 임대가 먼저 끝나지 않게 (XX: 다른 곳에서 이미 지운 id는 되살리지 않음)
+                lease_until = time.time() + EMAIL_OUTBOX_LEASE_SECONDS
+                await redis_client.zadd(EMAIL_OUTBOX_SCHEDULED_KEY, {mid: lease_until for mid in ids[index:]}, xx=True)
+                try:
+                    await smtp.send(cls._build_message(data))
+                except Exception as e:
+                    smtp_down = isinstance(e, (aiosmtplib.SMTPConnectError, aiosmtplib.SMTPServerDisconnected,
+                                               aiosmtplib.SMTPTimeoutError, OSError))
+                    attempts = int(data.get("attempts") or 0) + 1
+                    # 5xx만 영구 실패: 수신 거부도 451(잠시 후 다시) 같은 4xx면 재시도한다.
+                    permanent = (isinstance(e, aiosmtplib.SMTPRecipientsRefused)
+                                 and all(500 <= r.code < 600 for r in e.recipients)) or (
+                        isinstance(e, aiosmtplib.SMTPResponseException) and 500 <= e.code < 600)
+                    if permanent or attempts >= CONFIG.EMAIL_OUTBOX_MAX_ATTEMPTS:
+                        print(f"이메일 발송 실패(중단): {message_id} {e}")
+                        results.hset(key, mapping={"status": "failed", "attempts": attempts, "error": str(e)[:500]})
+                        results.zrem(EMAIL_OUTBOX_SCHEDULED_KEY, message_id)
+                    else:
+                        delay = min(EMAIL_OUTBOX_RETRY_BASE_SECONDS * 2 ** (attempts - 1), EMAIL_OUTBOX_RETRY_MAX_SECONDS)
+                        print(f"이메일 발송 실패, {delay}초 후 재시도: {message_id} {e}")
+                        results.hset(key, mapping={"status": "retrying", "attempts": attempts, "error": str(e)[:500]})
+                        results.zadd(EMAIL_OUTBOX_SCHEDULED_KEY, {message_id: time.time() + delay})
+                else:
+                    results.hset(key, mapping={"status": "sent", "attempts": int(data.get("attempts") or 0) + 1,
+                                               "sent_at": int(time.time())})
+                    results.hdel(key, "html")  # 보낸 메일 본문(인증코드 포함)은 남기지 않는다.
+                    results.zrem(EMAIL_OUTBOX_SCHEDULED_KEY, message_id)
+                # 결과는 보낸 직후에 기록한다: 배치 끝까지 미루면 그 사이 임대가 끝나 다른 worker가 다시 보낼 수 있다.
+                await results.execute()
+        return len(ids)
+
+    @staticmethod
+    def _build_message(data: dict) -> EmailMessage:
+        message = EmailMessage()
+        message["Subject"] = data["subject"]
+        message["From"] = MAIL_FROM
+        message["To"] = data["to"]
+        message.set_content(data["html"], subtype="html")
+        return message
+
+
+async def run_email_sender():
+    """worker마다 하나씩 실행되는 백그라운드 발송 작업 (inits.py lifespan에서 시작/취소)"""
+    smtp = _SmtpConnection()
+    try:
+        while True:
+            try:
+                claimed = await EmailOutbox.send_batch(smtp)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"이메일 발송 작업 오류: {e}")
+                claimed = 0
+            if not claimed:
+                await smtp.close_if_idle()
+                await asyncio.sleep(EMAIL_OUTBOX_POLL_SECONDS)
+    finally:
+        await smtp.close()
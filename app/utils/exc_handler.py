@@ -62,7 +62,7 @@ async def custom_http_exception_handler(request: Request, exc: Exception):
     '''아래처럼 if 문으로 등록하면, 상태코드는 200으로 바뀌면서 json을 반환하게 된다. 
     js 단에서 잡아내서 errorTag.innerHTML하기 위해서...'''
     if status_code in (410, 411, 413, 415, 432, 439, 499, 600):
-        return JSONResponse({"detail": f'{detail}'})
+        return JSONResponse({"detail": f'{detail}'}, headers=getattr(exc, "headers", None))  # 439: Retry-After
 
     if (status_code in (400, 401, 403)) and (getattr(exc, "detail", None) == "refresh 실패"):
         print("커스텀 exception handler refresh 실패", (getattr(exc, "detail", None)))
@@ -108,4 +108,24 @@ async def custom_http_exception_handler(request: Request, exc: Exception):
                 "detail": detail
             },
             status_code = status_code
-        )
\ No newline at end of file
+        )
+
+async def db_pool_timeout_handler(request: Request, exc: Exception):
+    """DB 커넥션 풀에서 DB_POOL_TIMEOUT 안에 빈 연결을 못 받은 경우 (sqlalchemy.exc.TimeoutError)
+    과부하일 때 요청이 계속 쌓이며 멈춰 있지 않도록 바로 503 + Retry-After로 돌려보낸다."""
+    print("DB pool timeout 503: ", request.url.path, exc)
+    detail = "요청이 많아 잠시 처리할 수 없습니다. 잠시 후에 다시 시도해 주세요."
+    headers = {"Retry-After": "1"}
+    if request.url.path.startswith("/apis/"):
+        return JSONResponse({"detail": detail}, status_code=status.HTTP_503_SERVICE_UNAVAILABLE, headers=headers)
+    return templates.TemplateResponse(
+            request=request,
+            name="common/exceptions/http_error.html",
+            context={
+                "status_code": status.HTTP_503_SERVICE_UNAVAILABLE,
+                "title_message": "불편을 드려 죄송합니다.",
+                "detail": detail
+            },
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            headers=headers,
+        )
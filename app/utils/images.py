@@ -0,0 +1,135 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+""" 업로드 이미지 파생본(derivative) 생성
+게시글 썸네일/프로필 이미지는 원본을 그대로 목록에 내보내고 있어서, 100px 짜리 썸네일에 수 MB를 내려보냈다.
+업로드할 때 보기(view)별 크기로 줄이고 다시 압축한 파일(+ WebP)을 미리 만들어 두고,
+템플릿에서는 img_variant 필터로 보기에 맞는 파일을 고른다.
+
+파일 이름 규칙 (같은 폴더):
+    원본:   <이름>.orig.<ext>
+    파생본: <이름>.<variant>.webp / <이름>.<variant>.jpg   (variant: thumb, detail)
+원본 이름에 .orig. 가 없는 예전 업로드는 파생본이 없으므로 원본 경로를 그대로 쓴다.
+
+Pillow 작업은 CPU를 쓰므로 이벤트 루프나 스레드풀이 아니라 별도 프로세스 풀에서 실행한다.
+이 모듈은 프로세스 풀의 자식 프로세스에서도 import 되므로 무거운 import(설정, DB 등)를 두지 않는다.
+"""
+
+ORIGINAL_MARK = ".orig"
+IMAGE_VARIANTS = {
+    "thumb": 480,    # 게시판 목록 카드 (화면에는 ~100-240px, 고해상도 화면 고려)
+    "detail": 1280,  # 상세 페이지 본문 폭
+}
+WEBP_QUALITY = 80
+JPEG_QUALITY = 82
+SKIP_FORMATS = {"GIF"}  # 움직이는 이미지는 원본 유지
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_image_process_pool() -> ProcessPoolExecutor:
+    """worker 프로세스마다 lazy 생성 (redis/db 풀과 같은 방식)"""
+    global _process_pool
+    if _process_pool is None:
+        from app.core.settings import CONFIG
+        _process_pool = ProcessPoolExecutor(max_workers=CONFIG.IMAGE_PROCESS_WORKERS)
+    return _process_pool
+
+
+def shutdown_image_process_pool() -> None:
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
+
+
+def original_image_name(filename: str) -> str:
+    """file_renaming 결과(이름.ext)를 원본 이름(이름.orig.ext)으로"""
+    stem, ext = os.path.splitext(filename)
+    return f"{stem}{ORIGINAL_MARK}{ext}"
+
+
+def strip_original_mark(img_path: str) -> str:
+    stem, ext = os.path.splitext(img_path)
+    if stem.endswith(ORIGINAL_MARK):
+        stem = stem[:-len(ORIGINAL_MARK)]
+    return f"{stem}{ext}"
+
+
+def image_variant_path(img_path: Optional[str], variant: str, fmt: str = "jpg") -> Optional[str]:
+    """img_path(원본) -> 보기별 파생본 경로. 파생본이 없는 예전 업로드는 원본 경로 그대로"""
+    if not img_path or variant not in IMAGE_VARIANTS:
+        return img_path
+    stem, ext = os.path.splitext(img_path)
+    if not stem.endswith(ORIGINAL_MARK):
+        return img_path
+    return f"{stem[:-len(ORIGINAL_MARK)]}.{variant}.{fmt}"
+
+
+def image_paths_with_variants(img_path: Optional[str]) -> list[str]:
+    """삭제용: 원본 + 모든 파생본 경로"""
+    if not img_path:
+        return []
+    paths = [img_path]
+    for variant in IMAGE_VARIANTS:
+        for fmt in ("webp", "jpg"):
+            variant_path = image_variant_path(img_path, variant, fmt)
+            if variant_path != img_path:
+                paths.append(variant_path)
+    return paths
+
+
+def _generate_image_variants(original_path: str) -> list[str]:
+    """(자식 프로세스에서 실행) 원본에서 파생본을 만들고 만든 파일 경로를 돌려준다."""
+    from PIL import Image, ImageOps
+
+    created = []
+    try:
+        _write_variants(Image, ImageOps, original_path, created)
+    except Exception:
+        for path in created:  # 일부만 만들어졌으면 정리 (원본만 쓰게 된다)
+            os.remove(path)
+        raise
+    return created
+
+
+def _write_variants(Image, ImageOps, original_path: str, created: list[str]) -> None:
+    with Image.open(original_path) as image:
+        if image.format in SKIP_FORMATS:
+            return
+        image = ImageOps.exif_transpose(image)  # 휴대폰 사진 회전 정보 반영
+        has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+        image = image.convert("RGBA" if has_alpha else "RGB")
+
+        stem = os.path.splitext(original_path)[0][:-len(ORIGINAL_MARK)]
+        for variant, max_width in IMAGE_VARIANTS.items():
+            resized = image
+            if image.width > max_width:
+                height = round(image.height * max_width / image.width)
+                resized = image.resize((max_width, height), Image.Resampling.LANCZOS)
+
+            webp_path = f"{stem}.{variant}.webp"
+            resized.save(webp_path, "WEBP", quality=WEBP_QUALITY, method=4)
+            created.append(webp_path)
+
+            jpg_path = f"{stem}.{variant}.jpg"
+            fallback = resized
+            if has_alpha:  # JPEG는 투명도가 없으므로 흰 배경에 합성
+                fallback = Image.new("RGB", resized.size, (255, 255, 255))
+                fallback.paste(resized, mask=resized.getchannel("A"))
+            fallback.save(jpg_path, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+            created.append(jpg_path)
+
+
+async def generate_image_variants(original_path: str) -> list[str]:
+    """업로드 직후 호출: 프로세스 풀에서 파생본 생성. 실패해도 업로드는 성공으로 두고 원본 경로를 쓴다."""
+    if not os.path.splitext(original_path)[0].endswith(ORIGINAL_MARK):
+        return []
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(get_image_process_pool(), _generate_image_variants, original_path)
+    except Exception as e:
+        print(f"generate_image_variants 오류 ({original_path}): {e}")
+        return []
@@ -0,0 +1,195 @@
+"""운영 유지보수 명령 모음 (서버 밖에서 1회성으로 실행)
+
+사용법 (프로젝트 루트에서):
+    python -m app.utils.maintenance reindex-search    # 게시글 검색 문서 전체 재색인(백필)
+    python -m app.utils.maintenance reconcile-votes   # 게시글/댓글 vote_count를 투표 기록 기준으로 다시 계산(백필/보정)
+    python -m app.utils.maintenance rebuild-media-refs  # 게시글/댓글 본문 기준으로 media_references 재구성(백필)
+    python -m app.utils.maintenance calibrate-password-hash  # 이 서버에서 bcrypt 비용별 해시 시간 측정, PASSWORD_BCRYPT_ROUNDS 추천
+    python -m app.utils.maintenance db-pool-load-test  # DB 풀 크기별 처리량/대기 시간 측정, DB_POOL_SIZE 추천
+"""
+import argparse
+import asyncio
+
+from app.core.database import AsyncSessionLocal, ASYNC_ENGINE
+
+
+async def reindex_search() -> None:
+    from app.services.articles.search_service import ArticleSearchIndex
+
+    async with AsyncSessionLocal() as db:
+        total = await ArticleSearchIndex(db).reindex_all()
+    print(f"검색 문서 재색인 완료: {total}건")
+
+
+async def reconcile_votes() -> None:
+    from sqlalchemy import func, select, update
+    from app.models.articles import Article, ArticleComment
+    from app.models.users import article_voter, articlecomment_voter
+
+    article_votes = (select(func.count()).select_from(article_voter)
+                     .where(article_voter.c.article_id == Article.id)
+                     .scalar_subquery())
+    comment_votes = (select(func.count()).select_from(articlecomment_voter)
+                     .where(articlecomment_voter.c.articlecomment_id == ArticleComment.id)
+                     .scalar_subquery())
+    async with AsyncSessionLocal() as db:
+        articles = await db.execute(update(Article).values(vote_count=article_votes)
+                                    .execution_options(synchronize_session=False))
+        comments = await db.execute(update(ArticleComment).values(vote_count=comment_votes)
+                                    .execution_options(synchronize_session=False))
+        await db.commit()
+    print(f"좋아요 수 재계산 완료: 게시글 {articles.rowcount}건, 댓글 {comments.rowcount}건")
+
+
+async def rebuild_media_refs() -> None:
+    from app.services.media_service import MediaReferenceIndex
+
+    async with AsyncSessionLocal() as db:
+        total = await MediaReferenceIndex(db).rebuild_all()
+    print(f"미디어 참조 재구성 완료: 게시글/댓글 {total}건")
+
+
+async def calibrate_password_hash() -> None:
+    """bcrypt 비용(rounds)별 해시 시간을 이 서버에서 재고, PASSWORD_HASH_TARGET_MS 안에 드는 가장 큰 비용을 추천한다.
+    운영 서버(같은 CPU)에서 실행해야 의미가 있다."""
+    import statistics
+    import time
+    from app.core.settings import CONFIG
+    from app.utils.accounts import build_password_context
+
+    samples = 5
+    recommended = None
+    print(f"목표: 해시 1번 {CONFIG.PASSWORD_HASH_TARGET_MS}ms 이하 (현재 PASSWORD_BCRYPT_ROUNDS={CONFIG.PASSWORD_BCRYPT_ROUNDS})")
+    for rounds in range(10, 17):
+        context = build_password_context("bcrypt", rounds)
+        timings = []
+        for _ in range(samples):
+            started = time.perf_counter()
+            context.hash("calibration-password-1!")
+            timings.append((time.perf_counter() - started) * 1000)
+        median_ms = statistics.median(timings)
+        print(f"  rounds={rounds}: {median_ms:.0f}ms")
+        if median_ms > CONFIG.PASSWORD_HASH_TARGET_MS:
+            break
+        recommended = rounds
+    if recommended is None:
+        print("목표 시간 안에 드는 비용이 없습니다: PASSWORD_BCRYPT_ROUNDS=10 (최소) 권장, PASSWORD_HASH_TARGET_MS를 확인하세요.")
+    else:
+        print(f"추천: PASSWORD_BCRYPT_ROUNDS={recommended} (기존 해시는 다음 로그인 때 새 비용으로 다시 해시된다)")
+        # 참고: 로그인 처리량 ~= PASSWORD_HASH_WORKERS x worker 수 / 해시 시간
+
+
+async def db_pool_load_test() -> None:
+    """풀 크기(worker당 DB_POOL_SIZE 후보)별로 실제 게시판 조회(목록 70%, 상세 30%)를 몰아서 처리량, 지연 시간, 503(대기 초과) 수를 잰다.
+    후보마다 APP_WORKERS x 크기 만큼 연결을 열어서 DB가 운영과 같은 동시 연결 수를 보게 한다.
+    추천: 크기를 키워도 처리량이 10% 넘게 늘지 않거나 p95가 나빠지기 시작하는 지점(knee). 연결 총량이 max_connections의 80%를 넘으면 줄인다.
+    운영과 같은 DB 서버(같은 데이터)를 대상으로 한가한 시간에 실행한다. 이 스크립트를 돌리는 CPU가 먼저 100%가 되면 결과를 믿지 않는다."""
+    import random
+    import statistics
+    import time
+    from sqlalchemy import exc, func, select, text
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+    from app.core.settings import CONFIG
+    from app.core.database import create_engine_with_pool
+    from app.models.articles import Article
+    from app.services.articles.article_service import ArticleService
+    from app.services.articles.loading import LoadProfile
+
+    requests_per_size = 2000
+    page_size = 10
+
+    async with AsyncSessionLocal() as db:
+        max_connections = int((await db.execute(text("SELECT @@max_connections"))).scalar())
+        total_articles = (await db.execute(select(func.count()).select_from(Article))).scalar()
+        article_ids = (await db.execute(select(Article.id).order_by(func.rand()).limit(1000))).scalars().all()
+    if not article_ids:
+        print("게시글이 없어서 측정할 수 없습니다. 운영 데이터 사본이 있는 DB에서 실행하세요.")
+        return
+    pages = max(1, min(50, total_articles // page_size))  # 사용자가 실제로 보는 앞쪽 페이지
+
+    async def board_request(session_factory):
+        async with session_factory() as db:
+            service = ArticleService(db)
+            if random.random() < 0.7:
+                await service.list_articles_offset(page=random.randint(1, pages), size=page_size, total=total_articles)
+            else:
+                await service.get_article(random.choice(article_ids), profile=LoadProfile.DETAIL)
+
+    results = []
+    print(f"요청 {requests_per_size}번 (목록 70% / 상세 30%), 대기 제한 {CONFIG.DB_POOL_TIMEOUT}초")
+    for pool_size in (2, 5, 10, 20, 30, 50):
+        connections = pool_size * CONFIG.APP_WORKERS
+        if connections > max_connections:
+            print(f"  pool_size={pool_size}: 연결 {connections}개 > max_connections {max_connections}, 생략")
+            break
+        concurrency = max(100, connections * 2)  # 풀보다 요청이 많게: 대기/503이 생기는 상황
+        engine = create_engine_with_pool(pool_size=connections, max_overflow=0)
+        session_factory = async_sessionmaker(engine, expire_on_commit=False, autoflush=False)
+        latencies, timeouts = [], 0
+        remaining = iter(range(requests_per_size))
+
+        async def client():
+            nonlocal timeouts
+            for _ in remaining:
+                started = time.perf_counter()
+                try:
+                    await board_request(session_factory)
+                except exc.TimeoutError:
+                    timeouts += 1
+                    continue
+                latencies.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        try:
+            await asyncio.gather(*(client() for _ in range(concurrency)))
+        finally:
+            await engine.dispose()
+        elapsed = time.perf_counter() - started
+        throughput = len(latencies) / elapsed
+        p95 = statistics.quantiles(latencies, n=20)[-1] if len(latencies) >= 2 else 0
+        results.append((pool_size, throughput, p95))
+        print(f"  pool_size={pool_size} (DB 연결 {connections}): {throughput:.0f} req/s, "
+              f"p50 {statistics.median(latencies or [0]):.0f}ms, p95 {p95:.0f}ms, 503 {timeouts}건")
+
+    if not results:
+        return
+    recommended = results[-1][0]
+    for (size, throughput, p95), (_, next_throughput, next_p95) in zip(results, results[1:]):
+        if next_throughput < throughput * 1.1 or next_p95 > p95:
+            recommended = size  # knee: 더 키워도 처리량이 거의 늘지 않거나 지연이 나빠진다.
+            break
+    budget = int(max_connections * 0.8) // CONFIG.APP_WORKERS - CONFIG.DB_MAX_OVERFLOW
+    if recommended > budget:
+        print(f"knee는 {recommended}이지만 연결 총량 제한(max_connections의 80%) 때문에 {budget}로 줄입니다.")
+        recommended = max(budget, 1)
+    total = CONFIG.APP_WORKERS * (recommended + CONFIG.DB_MAX_OVERFLOW)
+    print(f"추천: DB_POOL_SIZE={recommended} (현재 {CONFIG.DB_POOL_SIZE})")
+    print(f"연결 총량: APP_WORKERS {CONFIG.APP_WORKERS} x ({recommended} + DB_MAX_OVERFLOW {CONFIG.DB_MAX_OVERFLOW}) = {total}, "
+          f"MySQL max_connections = {max_connections}")
+
+
+COMMANDS = {
+    "reindex-search": reindex_search,
+    "reconcile-votes": reconcile_votes,
+    "rebuild-media-refs": rebuild_media_refs,
+    "calibrate-password-hash": calibrate_password_hash,
+    "db-pool-load-test": db_pool_load_test,
+}
+
+
+async def _run(command: str) -> None:
+    try:
+        await COMMANDS[command]()
+    finally:
+        await ASYNC_ENGINE.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.utils.maintenance")
+    parser.add_argument("command", choices=sorted(COMMANDS))
+    args = parser.parse_args()
+    asyncio.run(_run(args.command))
+
+
+if __name__ == "__main__":
+    main()
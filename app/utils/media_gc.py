@@ -0,0 +1,167 @@
+import os
+import time
+from datetime import datetime, timezone, timedelta
+from typing import Iterable
+
+from sqlalchemy import select, delete
+from starlette.concurrency import run_in_threadpool
+
+from app.core.redis import get_redis_client
+from app.core.settings import APP_DIR, MEDIA_DIR, CONFIG
+from app.models.medias import MediaReference, MediaBlob
+from app.utils.uploads import ResumableVideoUpload
+
+""" 에디터 미디어 가비지 컬렉터
+요청 처리 중에는 삭제 후보 src를 Redis 큐(ZSET, score=등록 시각)에 넣기만 하고,
+스케줄러(inits.py lifespan)가 주기적으로 배치 단위로 꺼내서
+1) media_references에서 한번에(IN 조회) 아직 쓰이는 src를 걸러내고
+2) 안 쓰이는 파일은 스레드풀 1회 호출로 묶어서 지운다. (내용 주소 저장 파일은 media_blobs 행도 함께 삭제)
+업로드만 하고 저장하지 않은 파일(media_blobs.ref_count 0)도 일정 시간이 지나면 큐에 넣는다.
+세션이 만료된 이어받기 업로드(app/utils/uploads.py)의 업로드 파일도 같은 실행에서 지운다.
+처리된 src만 큐에서 빼므로, 중간에 프로세스가 죽어도 다음 실행에서 다시 처리된다.
+"""
+
+MEDIA_GC_QUEUE_KEY = "media_gc:queue"
+MEDIA_GC_LOCK_KEY = "media_gc:lock"  # gunicorn worker마다 스케줄러가 돌기 때문에 한번에 하나만 실행
+
+# 객체별 후보 set을 GC 큐로 옮긴다: 현재 본문에 있는 src(ARGV[2:])는 제외
+_MOVE_CANDIDATES_LUA = """
+local members = redis.call('SMEMBERS', KEYS[1])
+local keep = {}
+for i = 2, #ARGV do keep[ARGV[i]] = true end
+local moved = 0
+for _, src in ipairs(members) do
+    if not keep[src] then
+        redis.call('ZADD', KEYS[2], 'NX', ARGV[1], src)
+        moved = moved + 1
+    end
+end
+redis.call('DEL', KEYS[1])
+return moved
+"""
+
+
+def _media_file_path(src: str):
+    """src(url) -> 실제 파일 경로. MEDIA_DIR 밖을 가리키면(../ 등) None"""
+    file_path = os.path.realpath(f'{APP_DIR}{src}')  # \\없어도 된다. src 맨 앞에 \\ 있다.
+    media_root = os.path.realpath(MEDIA_DIR)
+    if os.path.commonpath([file_path, media_root]) != media_root or file_path == media_root:
+        return None
+    return file_path
+
+
+def _remove_files(paths: list[str]) -> int:
+    """스레드풀에서 한번에 실행: 파일 삭제 후 비게 된 폴더(회원별 업로드 폴더)도 정리"""
+    removed = 0
+    dirs = set()
+    for path in paths:
+        try:
+            os.remove(path)
+            removed += 1
+        except FileNotFoundError:
+            pass  # 이미 없으면 무시
+        except OSError as e:
+            print(f"media gc 파일 삭제 실패 {path}: {e}")
+        dirs.add(os.path.dirname(path))
+    for _dir in dirs:
+        try:
+            os.rmdir(_dir)  # 비어 있을 때만 성공
+        except OSError:
+            pass  # 비어있지 않거나 이미 없으면 무시
+    return removed
+
+
+def _as_utc(value: datetime) -> datetime:
+    # MySQL DATETIME은 tz 정보 없이 돌아오므로 UTC로 간주 (저장할 때 UTC로 넣는다)
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+class MediaGarbageCollector:
+    @classmethod
+    async def enqueue(cls, srcs: Iterable[str]) -> int:
+        members = {str(src): time.time() for src in srcs if src}
+        if not members:
+            return 0
+        # NX: 이미 대기 중인 src는 처음 등록 시각을 유지
+        return await get_redis_client().zadd(MEDIA_GC_QUEUE_KEY, members, nx=True)
+
+    @classmethod
+    async def enqueue_candidates(cls, key: str, keep: Iterable[str] = ()) -> int:
+        """delete_*_candidates:{id} set을 GC 큐로 옮기고 set은 지운다. (keep: 저장된 본문에 남아 있는 src)"""
+        return await get_redis_client().eval(_MOVE_CANDIDATES_LUA, 2, key, MEDIA_GC_QUEUE_KEY,
+                                             time.time(), *[str(src) for src in keep if src])
+
+    @classmethod
+    async def collect(cls, db, batch_size: int = None, grace_seconds: int = None) -> int:
+        """grace_seconds 보다 오래 대기한 후보를 batch_size 만큼 처리. 지운 파일 수를 돌려준다."""
+        batch_size = batch_size or CONFIG.MEDIA_GC_BATCH_SIZE
+        grace_seconds = CONFIG.MEDIA_GC_GRACE_SECONDS if grace_seconds is None else grace_seconds
+        redis_client = get_redis_client()
+
+        srcs = await redis_client.zrangebyscore(MEDIA_GC_QUEUE_KEY, "-inf", time.time() - grace_seconds,
+                                                start=0, num=batch_size)
+        if not srcs:
+            return 0
+
+        # 어떤 게시글/댓글이든 참조하고 있으면 남긴다. (src 인덱스 IN 조회 1회)
+        result = await db.execute(select(MediaReference.src).distinct().where(MediaReference.src.in_(srcs)))
+        unused = set(srcs) - set(result.scalars().all())
+
+        # 내용 주소 저장 파일(media_blobs): 행을 잠그고, 유예 시간 안에 (중복)업로드된 파일은 남긴다.
+        # 잠금은 commit 까지 유지되므로 그 사이 같은 파일을 업로드하는 요청(MediaBlobStore)은 기다렸다가 파일을 새로 쓴다.
+        if unused:
+            query = select(MediaBlob).where(MediaBlob.src.in_(unused)).with_for_update()
+            blobs = (await db.execute(query)).scalars().all()
+            cutoff = datetime.now(timezone.utc) - timedelta(seconds=grace_seconds)
+            recent = {blob.src for blob in blobs if blob.ref_count > 0 or _as_utc(blob.updated_at) > cutoff}
+            unused -= recent
+            await db.execute(delete(MediaBlob).where(MediaBlob.src.in_(unused)))
+
+        paths = [path for path in (_media_file_path(src) for src in unused) if path]
+        removed = await run_in_threadpool(_remove_files, paths) if paths else 0
+        await db.commit()
+
+        await redis_client.zrem(MEDIA_GC_QUEUE_KEY, *srcs)
+        return removed
+
+    @classmethod
+    async def enqueue_orphan_blobs(cls, db, batch_size: int = None) -> int:
+        """업로드만 하고 어디에도 저장하지 않은 파일(ref_count 0, 오래됨)을 GC 큐에 넣는다."""
+        batch_size = batch_size or CONFIG.MEDIA_GC_BATCH_SIZE
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=CONFIG.MEDIA_GC_ORPHAN_SECONDS)
+        query = (select(MediaBlob.src)
+                 .where(MediaBlob.ref_count == 0, MediaBlob.updated_at < cutoff)
+                 .order_by(MediaBlob.updated_at).limit(batch_size))
+        srcs = (await db.execute(query)).scalars().all()
+        await db.rollback()
+        return await cls.enqueue(srcs)
+
+
+async def scheduled_media_gc():
+    """스케줄된 미디어 GC: 대기열이 빌 때까지 배치 반복 (다른 worker가 실행 중이면 건너뜀)
+    한 번 실행은 실행 간격(락 TTL) 안에서 끝내고, 남은 후보는 다음 실행에서 처리한다."""
+    from app.core.database import AsyncSessionLocal
+
+    redis_client = get_redis_client()
+    interval = CONFIG.MEDIA_GC_INTERVAL_SECONDS
+    if not await redis_client.set(MEDIA_GC_LOCK_KEY, os.getpid(), nx=True, ex=interval):
+        return
+    deadline = time.monotonic() + interval * 0.8
+    try:
+        expired = await ResumableVideoUpload.expire_abandoned()  # 버려진 이어받기 업로드 파일
+        if expired:
+            print(f"media gc: 버려진 업로드 파일 {expired}개 삭제")
+        async with AsyncSessionLocal() as db:
+            await MediaGarbageCollector.enqueue_orphan_blobs(db)
+            while time.monotonic() < deadline:
+                removed = await MediaGarbageCollector.collect(db)
+                if removed:
+                    print(f"media gc: {removed}개 파일 삭제")
+                pending = await redis_client.zcount(MEDIA_GC_QUEUE_KEY, "-inf",
+                                                    time.time() - CONFIG.MEDIA_GC_GRACE_SECONDS)
+                if not pending:
+                    break
+    except Exception as e:
+        print(f"스케줄된 media gc 중 오류 발생: {e}")
+    finally:
+        await redis_client.delete(MEDIA_GC_LOCK_KEY)
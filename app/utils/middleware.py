@@ -1,19 +1,22 @@
 from __future__ import annotations
 
+import re
 from typing import Optional, List, Tuple
 from urllib.parse import urlparse
 
-from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
-from fastapi import Response, Request
+from starlette.requests import HTTPConnection
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Scope, Receive, Send, Message
+from fastapi import Response
 
-from app.core.database import get_db
+from app.core.database import AsyncSessionLocal, REPLICA_ENGINE, current_db_scope, request_db_scope
 from app.core.redis import ACCESS_COOKIE_MAX_AGE
 from app.core.settings import CONFIG
 from app.services.auth_service import AuthService
 
 
 
-def _is_cross_site(request: Request) -> bool:
+def _is_cross_site(request: HTTPConnection) -> bool:
     """
     Origin 헤더와 요청 URL을 비교하여 크로스 사이트 여부를 판단합니다.
     Origin이 없으면 동일 사이트로 간주합니다(첫 네비게이션 등).
@@ -32,7 +35,7 @@ def _is_cross_site(request: Request) -> bool:
         return False
 
 
-def _cookie_attrs_for(request: Request) -> dict:
+def _cookie_attrs_for(request: HTTPConnection) -> dict:
     """
     요청 특성에 맞춘 쿠키 속성 결정:
     - 동일 사이트: SameSite=Lax, Secure=(https일 때만)
@@ -57,57 +60,140 @@ def _cookie_attrs_for(request: Request) -> dict:
                     )
 
 
-class AccessTokenSetCookieMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
-        access_cookie: Optional[str] = request.cookies.get(CONFIG.ACCESS_COOKIE_NAME)
-        refresh_cookie: Optional[str] = request.cookies.get(CONFIG.REFRESH_COOKIE_NAME)
-
-        new_access: Optional[str] = None
-
-        # 1) access_token이 없고 refresh_token만 있으면, 먼저 액세스 토큰을 발급
-        if not access_cookie and refresh_cookie:
-            async for db in get_db():
-                try:
-                    auth_service = AuthService(db=db)
-                    refreshed = await auth_service.refresh_access_token(refresh_cookie)
-                    if isinstance(refreshed, dict):
-                        new_access = refreshed.get(CONFIG.ACCESS_COOKIE_NAME)
-                    elif isinstance(refreshed, str):
-                        new_access = refreshed
-                except Exception as e:
-                    # 개발 편의를 위해 로그만 남기고, refresh_token은 보존
-                    print(f"[AccessTokenSetCookieMiddleware] refresh failed: {e}")
-                    new_access = None
-                finally: # get_db는 async generator이므로 한 번만 사용하고 빠져나옵니다.
-                    print("AccessTokenSetCookieMiddleware 0.2.1 get_db finally: ", db)
-                break
-
-            # 2) 첫 요청부터 인증이 통과되도록 Authorization 헤더 주입
-            if new_access:
-                try:
-                    raw_headers: List[Tuple[bytes, bytes]] = list(request.scope.get("headers", []))
-                    raw_headers.append((b"authorization", f"Bearer {new_access}".encode("utf-8")))
-                    request.scope["headers"] = raw_headers
-                except Exception as e: # 헤더 주입 실패 시에도 응답 쿠키로는 설정됨
-                    print(f"[AccessTokenSetCookieMiddleware] set auth header failed: {e}")
-                    pass
-
-        # 3) 애플리케이션 처리
-        response = await call_next(request)
-
-        # 4) 응답에 access_token 쿠키 설정(첫 응답부터 브라우저 저장)
-        if new_access:
-            attrs = _cookie_attrs_for(request)
-            response.set_cookie(
-                key=CONFIG.ACCESS_COOKIE_NAME,
-                value=new_access,
-                **attrs,
-            )
-        else:
+REFRESH_COOKIE_MAX_AGE = CONFIG.REFRESH_TOKEN_EXPIRE * 24 * 60 * 60  # 초 (로그인 때 쿠키 expires와 같은 기간)
+SKIP_PATH_PREFIXES = ("/static/", "/media/")  # 인증이 필요 없는 정적 파일 요청은 리프레시하지 않는다.
+
+
+class AccessTokenSetCookieMiddleware:
+    """ 순수 ASGI 미들웨어
+    BaseHTTPMiddleware는 모든 응답 본문을 별도 task + 메모리 스트림으로 한번 더 감싸므로,
+    리프레시가 필요한 요청(access_token 없이 refresh_token만 있는 요청)만 가로채고 나머지는 그대로 통과시킨다.
+    가로챈 요청은 scope에 authorization 헤더를 넣고, http.response.start 메시지에 Set-Cookie만 덧붙인다. (본문은 버퍼링하지 않음)
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"].startswith(SKIP_PATH_PREFIXES):
+            await self.app(scope, receive, send)
+            return
+
+        conn = HTTPConnection(scope)
+        access_cookie: Optional[str] = conn.cookies.get(CONFIG.ACCESS_COOKIE_NAME)
+        refresh_cookie: Optional[str] = conn.cookies.get(CONFIG.REFRESH_COOKIE_NAME)
+
+        # 1) access_token이 없고 refresh_token만 있으면, 먼저 액세스 토큰을 발급 (refresh_token도 회전)
+        refreshed = await self._refresh(refresh_cookie) if not access_cookie and refresh_cookie else None
+        new_access: Optional[str] = refreshed.get(CONFIG.ACCESS_COOKIE_NAME) if refreshed else None
+        if not new_access:
             # 재발급이 없었다면 기존 동작 유지. 실패했다고 바로 refresh_token을 삭제하지는 않음.
-            # 필요 시 아래 주석을 풀어 access_token만 정리할 수 있습니다.
-            # response.delete_cookie(ACCESS_COOKIE_NAME, path="/")
-            pass
-        return response
+            await self.app(scope, receive, send)
+            return
+
+        # 2) 첫 요청부터 인증이 통과되도록 Authorization 헤더 주입
+        scope = dict(scope)
+        raw_headers: List[Tuple[bytes, bytes]] = list(scope.get("headers", []))
+        raw_headers.append((b"authorization", f"Bearer {new_access}".encode("utf-8")))
+        scope["headers"] = raw_headers
+
+        # 3) 응답 시작 메시지에 덧붙일 access_token 쿠키 (첫 응답부터 브라우저 저장)
+        cookie_response = Response()
+        attrs = _cookie_attrs_for(conn)
+        cookie_response.set_cookie(key=CONFIG.ACCESS_COOKIE_NAME, value=new_access, **attrs)
+        new_refresh: Optional[str] = refreshed.get(CONFIG.REFRESH_COOKIE_NAME)
+        if new_refresh:
+            attrs["max_age"] = REFRESH_COOKIE_MAX_AGE
+            cookie_response.set_cookie(key=CONFIG.REFRESH_COOKIE_NAME, value=new_refresh, **attrs)
+        set_cookie_headers = [header for header in cookie_response.raw_headers if header[0] == b"set-cookie"]
+
+        async def send_with_cookie(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message = dict(message)
+                message["headers"] = list(message.get("headers", [])) + set_cookie_headers
+            await send(message)
+
+        # 4) 애플리케이션 처리
+        await self.app(scope, receive, send_with_cookie)
+
+    @staticmethod
+    async def _refresh(refresh_cookie: str) -> Optional[dict]:
+        # 요청 공유 세션 사용 (RequestDBSessionMiddleware가 바깥에서 열어 둔다)
+        scope = current_db_scope()
+        db = scope.session if scope is not None else AsyncSessionLocal()
+        try:
+            auth_service = AuthService(db=db)
+            refreshed = await auth_service.refresh_access_token(refresh_cookie)
+            # 리프레시 중 읽은 트랜잭션을 끝내서 커넥션을 풀에 돌려준다. (엔드포인트는 필요할 때 다시 꺼낸다)
+            await db.commit()
+            if isinstance(refreshed, dict):
+                return refreshed
+        except Exception as e:
+            # 개발 편의를 위해 로그만 남기고, refresh_token은 보존
+            print(f"[AccessTokenSetCookieMiddleware] refresh failed: {e}")
+            await db.rollback()
+        finally:
+            if scope is None:
+                await db.close()
+        return None
+
+
+class RequestDBSessionMiddleware:
+    """ 순수 ASGI 미들웨어: 요청마다 공유 DB 세션 범위(app.core.database.RequestDBScope)를 연다.
+    가장 바깥에 두어서 다른 미들웨어(토큰 리프레시), 의존성, 예외 핸들러가 모두 같은 세션을 쓰게 한다.
+    응답 본문(스트리밍 포함)을 다 보낸 뒤에 세션을 닫는다.
+    replica가 있으면, primary에 쓴 요청의 응답에 read-your-writes 쿠키(DB_PRIMARY_COOKIE_NAME)를 붙인다.
+    """
 
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"].startswith(SKIP_PATH_PREFIXES):
+            await self.app(scope, receive, send)
+            return
+        async with request_db_scope() as db_scope:
+            if REPLICA_ENGINE is None:
+                await self.app(scope, receive, send)
+                return
+
+            async def send_with_primary_cookie(message: Message) -> None:
+                # 이 요청에서 primary에 썼으면 잠시 동안 조회도 primary에서 하도록 쿠키를 붙인다. (read-your-writes)
+                if message["type"] == "http.response.start" and db_scope.wrote:
+                    cookie_response = Response()
+                    cookie_response.set_cookie(key=CONFIG.DB_PRIMARY_COOKIE_NAME, value="1",
+                                               max_age=CONFIG.DB_READ_YOUR_WRITES_SECONDS,
+                                               httponly=True, samesite="lax", path="/")
+                    message = dict(message)
+                    message["headers"] = list(message.get("headers", [])) + [
+                        header for header in cookie_response.raw_headers if header[0] == b"set-cookie"]
+                await send(message)
+
+            await self.app(scope, receive, send_with_primary_cookie)
+
+
+VIDEO_CHUNK_PATH = re.compile(r"^/apis/wysiwyg/article(/comment)?/video/upload/[^/]+$")  # 이어받기 업로드 청크 PUT
+
+
+class VideoChunkSizeLimitMiddleware:
+    """ 순수 ASGI 미들웨어: 동영상 청크 PUT의 Content-Length를 본문을 읽기 전에 확인한다.
+    FastAPICSRFJinjaMiddleware는 CSRF 검사 전에 요청 본문을 통째로 메모리에 읽으므로,
+    그보다 바깥에 두어서 Content-Length가 없거나 VIDEO_UPLOAD_CHUNK_BYTES보다 큰 청크는 읽기 전에 거절한다.
+    (그래서 청크 요청이 메모리에 버퍼링되는 양은 최대 청크 크기 하나로 제한된다)
+    """
 
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] != "PUT" or not VIDEO_CHUNK_PATH.match(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        content_length = HTTPConnection(scope).headers.get("content-length", "")
+        if not content_length.isdigit() or int(content_length) > CONFIG.VIDEO_UPLOAD_CHUNK_BYTES:
+            response = JSONResponse(status_code=400,
+                                    content={"detail": f"청크는 Content-Length를 보내고 {CONFIG.VIDEO_UPLOAD_CHUNK_BYTES} 바이트 이하여야 합니다."})
+            await response(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
@@ -0,0 +1,72 @@
+import math
+import time
+from collections import OrderedDict
+
+from app.core.redis import get_redis_client
+
+""" Redis 기반 sliding window 요청 제한 (gunicorn worker 전체에서 공유)
+이전 고정 창(window)의 수를 남은 비율만큼 더하는 방식(sliding window counter)이라 키 2개, Lua 1번이면 된다.
+이미 막힌 키는 worker 메모리에 막힌 시각까지 기록해 두고 Redis에 묻지 않는다. (과도한 요청일수록 Redis에 부담이 없다)
+Redis 장애 시에는 막지 않는다. (로그인/업로드가 Redis 때문에 멈추지 않도록)
+"""
+
+RATE_LIMIT_PREFIX = "ratelimit:"
+LOCAL_BLOCKED_MAXSIZE = 10000  # worker별 막힌 키 기록 수
+
+# KEYS[1]: 현재 창 키, KEYS[2]: 이전 창 키
+# ARGV: 제한 수, 창 길이(초), 현재 창 안에서 지난 시간(초)
+# 허용되면 0, 막히면 다시 시도할 수 있을 때까지의 초를 돌려준다.
+_SLIDING_WINDOW_LUA = """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local elapsed = tonumber(ARGV[3])
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+local weight = (window - elapsed) / window
+if previous * weight + current + 1 > limit then
+    if current + 1 > limit or previous == 0 then
+        return tostring(window - elapsed)
+    end
+    -- 이전 창의 몫이 (limit - current - 1) 아래로 줄어드는 시각
+    local wait = window * (1 - (limit - current - 1) / previous) - elapsed
+    return tostring(math.max(wait, 0.001))
+end
+redis.call('INCR', KEYS[1])
+redis.call('EXPIRE', KEYS[1], window * 2)
+return '0'
+"""
+
+_local_blocked: "OrderedDict[str, float]" = OrderedDict()  # 키 -> 막힌 시각까지 (time.monotonic)
+
+
+class SlidingWindowRateLimiter:
+
+    @classmethod
+    async def hit(cls, key: str, limit: int, window: int) -> int:
+        """요청 1번 기록. 허용이면 0, 제한이면 Retry-After 초(1 이상)"""
+        blocked_until = _local_blocked.get(key)
+        if blocked_until is not None:
+            remaining = blocked_until - time.monotonic()
+            if remaining > 0:
+                return math.ceil(remaining)
+            _local_blocked.pop(key, None)
+
+        now = time.time()
+        index = int(now // window)
+        elapsed = now - index * window
+        try:
+            retry_after = float(await get_redis_client().eval(
+                _SLIDING_WINDOW_LUA, 2,
+                f"{RATE_LIMIT_PREFIX}{key}:{index}", f"{RATE_LIMIT_PREFIX}{key}:{index - 1}",
+                limit, window, elapsed))
+        except Exception as e:
+            print(f"rate limit Redis 오류, 통과: {e}")
+            return 0
+        if retry_after <= 0:
+            return 0
+
+        _local_blocked[key] = time.monotonic() + retry_after
+        _local_blocked.move_to_end(key)
+        while len(_local_blocked) > LOCAL_BLOCKED_MAXSIZE:
+            _local_blocked.popitem(last=False)
+        return max(math.ceil(retry_after), 1)
@@ -0,0 +1,227 @@
+import hashlib
+import os
+import time
+import uuid
+from typing import AsyncIterator, Optional
+
+import aiofiles as aio
+from fastapi import HTTPException, status
+from starlette.concurrency import run_in_threadpool
+
+from app.core.database import EDITOR_MEDIA_BLOB_UPLOAD_DIR
+from app.core.redis import get_redis_client
+from app.core.settings import CONFIG
+from app.utils.commons import remove_file_path
+
+""" 에디터 동영상 이어받기(resumable) 업로드
+multipart 업로드는 python-multipart가 임시 파일에 한번 쓰고, 그걸 다시 최종 경로로 복사해서 디스크에 두번 쓴다.
+연결이 끊기면 처음부터 다시 올려야 하고, 큰 파일은 요청 하나가 worker를 수 분씩 잡고 있다.
+
+    1) init:     POST  .../video/upload/init              {filename, size, sha256} -> upload_id
+    2) append:   PUT   .../video/upload/{upload_id}?offset=N  (본문: 청크 바이트 그대로, X-Chunk-SHA256: 청크의 sha256)
+                 GET   .../video/upload/{upload_id}       -> 서버가 받은 offset (끊긴 뒤 여기서부터 다시 보낸다)
+    3) finalize: POST  .../video/upload/{upload_id}/finalize -> url
+
+청크는 업로드 파일(.uploads/<upload_id><ext>)의 offset 위치에 쓴다.
+청크 단위로 전부 반영되거나 전혀 반영되지 않는다: 체크섬이 맞을 때만 offset이 늘고, 실패하면 그 청크를 처음부터 다시 보낸다.
+청크 본문은 스트리밍되지 않는다: FastAPICSRFJinjaMiddleware가 CSRF 검사 전에 요청 본문을 통째로 메모리에 읽어 두므로,
+연결이 끊긴 청크는 여기까지 오지 않는다. 대신 VideoChunkSizeLimitMiddleware가 그보다 먼저 Content-Length를 확인해서
+버퍼링되는 양을 청크 하나(VIDEO_UPLOAD_CHUNK_BYTES)로 제한한다. (이 함수도 청크 크기를 다시 확인한다)
+클라이언트는 청크마다 체크섬을 계산하므로 파일 전체를 메모리에 올리지 않는다. 파일 전체 sha256은 선택이다.
+finalize에서 크기(와 보냈으면 전체 sha256)를 확인하고 blob 경로로 rename 한다. (같은 파일시스템이라 복사 없음)
+세션(Redis hash)은 마지막 청크 이후 VIDEO_UPLOAD_SESSION_TTL_SECONDS 뒤 만료되고,
+남은 업로드 파일은 media gc 스케줄러가 expire_abandoned 로 정리한다.
+"""
+
+VIDEO_UPLOAD_KEY = "video_upload:{upload_id}"
+VIDEO_UPLOAD_LOCK_KEY = "video_upload:{upload_id}:lock"  # append/finalize 동시 실행 방지
+# 청크 하나(최대 VIDEO_UPLOAD_CHUNK_BYTES) 쓰는 데 충분한 시간. worker가 죽어도 이 시간 뒤에는 같은 업로드를 이어 보낼 수 있다.
+VIDEO_UPLOAD_LOCK_TTL = 60
+VIDEO_UPLOAD_FINALIZE_BYTES_PER_SECOND = 50 * 1024 * 1024  # finalize 잠금 TTL 계산용: 전체 sha256을 이 속도로 읽는다고 본다
+VIDEO_UPLOAD_DIR = os.path.join(EDITOR_MEDIA_BLOB_UPLOAD_DIR, ".uploads")
+_HASH_CHUNK = 8 * 1024 * 1024
+
+# 내 토큰일 때만 잠금 해제: TTL이 지나 다른 요청이 잡은 잠금을 지우지 않기 위해
+_RELEASE_LOCK_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+def _upload_path(upload_id: str, ext: str) -> str:
+    return os.path.join(VIDEO_UPLOAD_DIR, f"{upload_id}{ext}")
+
+
+def _create_empty_file(path: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, "wb").close()
+
+
+def _file_sha256(path: str) -> str:
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(_HASH_CHUNK):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def _remove_stale_files(cutoff: float, active_ids: set[str]) -> int:
+    """세션이 없고 cutoff 이전에 마지막으로 쓰인 업로드 파일 삭제"""
+    removed = 0
+    try:
+        entries = list(os.scandir(VIDEO_UPLOAD_DIR))
+    except FileNotFoundError:
+        return 0
+    for entry in entries:
+        upload_id = os.path.splitext(entry.name)[0]
+        try:
+            if upload_id in active_ids or entry.stat().st_mtime > cutoff:
+                continue
+            os.remove(entry.path)
+            removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
+
+
+class ResumableVideoUpload:
+    @classmethod
+    def _key(cls, upload_id: str) -> str:
+        return VIDEO_UPLOAD_KEY.format(upload_id=upload_id)
+
+    @classmethod
+    async def _get_session(cls, upload_id: str, user_id: int) -> dict:
+        session = await get_redis_client().hgetall(cls._key(upload_id))
+        if not session or int(session["user_id"]) != user_id:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                                detail="업로드 세션이 없거나 만료되었습니다.")
+        return session
+
+    @classmethod
+    def _status(cls, upload_id: str, session: dict) -> dict:
+        return {"upload_id": upload_id, "offset": int(session["offset"]), "size": int(session["size"]),
+                "chunk_size": CONFIG.VIDEO_UPLOAD_CHUNK_BYTES}
+
+    @classmethod
+    async def _lock(cls, upload_id: str, ttl: int = VIDEO_UPLOAD_LOCK_TTL) -> tuple[str, str]:
+        lock_key = VIDEO_UPLOAD_LOCK_KEY.format(upload_id=upload_id)
+        token = uuid.uuid4().hex
+        if not await get_redis_client().set(lock_key, token, nx=True, ex=ttl):
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT,
+                                detail="같은 업로드를 처리 중입니다. 잠시 후 offset을 다시 확인하세요.")
+        return lock_key, token
+
+    @classmethod
+    async def _unlock(cls, lock: tuple[str, str]) -> None:
+        lock_key, token = lock
+        await get_redis_client().eval(_RELEASE_LOCK_LUA, 1, lock_key, token)
+
+    @classmethod
+    async def create(cls, user_id: int, filename: str, size: int, sha256: Optional[str] = None) -> dict:
+        upload_id = uuid.uuid4().hex
+        ext = os.path.splitext(filename)[1].lower()
+        await run_in_threadpool(_create_empty_file, _upload_path(upload_id, ext))
+
+        session = {"user_id": user_id, "size": size, "sha256": sha256 or "", "ext": ext, "offset": 0}
+        redis_client = get_redis_client()
+        async with redis_client.pipeline(transaction=True) as pipe:
+            pipe.hset(cls._key(upload_id), mapping=session)
+            pipe.expire(cls._key(upload_id), CONFIG.VIDEO_UPLOAD_SESSION_TTL_SECONDS)
+            await pipe.execute()
+        return cls._status(upload_id, session)
+
+    @classmethod
+    async def status(cls, upload_id: str, user_id: int) -> dict:
+        return cls._status(upload_id, await cls._get_session(upload_id, user_id))
+
+    @classmethod
+    async def append(cls, upload_id: str, user_id: int, offset: int, stream: AsyncIterator[bytes],
+                     chunk_sha256: Optional[str] = None) -> dict:
+        """offset 위치부터 요청 본문(청크 하나, 최대 VIDEO_UPLOAD_CHUNK_BYTES)을 업로드 파일에 쓴다.
+        청크를 끝까지 받고 체크섬(chunk_sha256)이 맞을 때만 offset을 늘린다. 아니면 클라이언트가 같은 offset부터 다시 보낸다.
+        offset은 성공 경로 맨 끝에서만 늘린다: 도중에 어떤 예외(크기 초과, 디스크 오류, 취소)가 나도 이 청크는 반영되지 않고,
+        이미 쓴 바이트는 다음에 같은 offset으로 다시 보낼 때 덮어쓴다."""
+        lock = await cls._lock(upload_id)  # 잠근 뒤에 세션을 읽어야 offset이 최신이다
+        redis_client = get_redis_client()
+        written = 0
+        hasher = hashlib.sha256()
+        try:
+            session = await cls._get_session(upload_id, user_id)
+            current = int(session["offset"])
+            size = int(session["size"])
+            if offset != current:
+                raise HTTPException(status_code=status.HTTP_409_CONFLICT,
+                                    detail=f"offset이 맞지 않습니다. (서버 offset: {current})")
+
+            try:
+                async with aio.open(_upload_path(upload_id, session["ext"]), "r+b") as outfile:
+                    await outfile.seek(offset)
+                    async for chunk in stream:
+                        if offset + written + len(chunk) > size:
+                            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                                                detail="선언한 파일 크기보다 많이 보냈습니다.")
+                        if written + len(chunk) > CONFIG.VIDEO_UPLOAD_CHUNK_BYTES:
+                            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                                                detail=f"청크는 {CONFIG.VIDEO_UPLOAD_CHUNK_BYTES} 바이트 이하여야 합니다.")
+                        await outfile.write(chunk)
+                        hasher.update(chunk)
+                        written += len(chunk)
+            except FileNotFoundError:
+                # 업로드 파일이 만료 정리된 뒤 늦게 도착한 청크
+                await redis_client.delete(cls._key(upload_id))
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                                    detail="업로드 세션이 없거나 만료되었습니다.")
+            if not written:
+                return cls._status(upload_id, session)
+            if chunk_sha256 and hasher.hexdigest() != chunk_sha256.strip().lower():
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                                    detail=f"청크 체크섬이 맞지 않습니다. offset {offset}부터 다시 보내세요.")
+
+            # 청크 전체가 검증된 뒤에만 반영
+            session["offset"] = offset + written
+            async with redis_client.pipeline(transaction=True) as pipe:
+                pipe.hset(cls._key(upload_id), "offset", session["offset"])
+                pipe.expire(cls._key(upload_id), CONFIG.VIDEO_UPLOAD_SESSION_TTL_SECONDS)
+                await pipe.execute()
+            return cls._status(upload_id, session)
+        finally:
+            await cls._unlock(lock)
+
+    @classmethod
+    async def finalize(cls, upload_id: str, user_id: int, media_blob_store) -> str:
+        """크기/sha256(init에서 보낸 경우) 확인 후 blob 경로로 옮기고 URL(src)을 돌려준다. 체크섬이 다르면 업로드를 버린다."""
+        # 전체 sha256 계산이 청크 하나보다 오래 걸리므로 파일 크기에 맞춰 잠금 TTL을 늘린다. (size는 init 이후 바뀌지 않는다)
+        size = int((await cls._get_session(upload_id, user_id))["size"])
+        lock = await cls._lock(upload_id, VIDEO_UPLOAD_LOCK_TTL + size // VIDEO_UPLOAD_FINALIZE_BYTES_PER_SECOND)
+        redis_client = get_redis_client()
+        try:
+            session = await cls._get_session(upload_id, user_id)
+            path = _upload_path(upload_id, session["ext"])
+            size = int(session["size"])
+            if int(session["offset"]) != size:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                                    detail=f"아직 다 올라오지 않았습니다. ({session['offset']}/{size})")
+            sha256 = await run_in_threadpool(_file_sha256, path)  # blob 경로(내용 주소)
+            if session["sha256"] and sha256 != session["sha256"]:
+                await redis_client.delete(cls._key(upload_id))
+                await remove_file_path(path)
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                                    detail="체크섬이 맞지 않습니다. 처음부터 다시 업로드하세요.")
+            src = await media_blob_store.store_file(path, sha256, size, session["ext"])
+            await redis_client.delete(cls._key(upload_id))
+            return src
+        finally:
+            await cls._unlock(lock)
+
+    @classmethod
+    async def expire_abandoned(cls) -> int:
+        """세션이 만료된(버려진) 업로드 파일 정리. 지운 파일 수를 돌려준다."""
+        cutoff = time.time() - CONFIG.VIDEO_UPLOAD_SESSION_TTL_SECONDS
+        redis_client = get_redis_client()
+        active_ids = set()
+        async for key in redis_client.scan_iter(match=VIDEO_UPLOAD_KEY.format(upload_id="*"), count=500):
+            if not key.endswith(":lock"):
+                active_ids.add(key.split(":", 1)[1])
+        return await run_in_threadpool(_remove_stale_files, cutoff, active_ids)
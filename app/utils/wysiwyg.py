@@ -1,12 +1,12 @@
 import re
 from typing import Set
-from sqlalchemy import select
+from sqlalchemy import select, or_
+from redis.exceptions import RedisError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.redis import get_redis_client
-from app.core.settings import APP_DIR
-from app.models.articles import Article, ArticleComment
-from app.utils.commons import remove_file_path, remove_empty_dir
+from app.models.medias import MediaReference
+from app.utils.media_gc import MediaGarbageCollector
 
 
 # Quills 유틸: HTML에서 이미지 src 추출
@@ -33,7 +33,12 @@ async def redis_add(srcs: list, key: str):
     members = [str(src) for src in srcs if src]
     if not members:
         return {"marked": [], "added": 0}
-    added_count = await redis_client.sadd(key, *members)
+    try:
+        added_count = await redis_client.sadd(key, *members)
+    except RedisError as e:
+        # Redis 장애: 삭제 후보 추적만 건너뛴다. (참조 없는 파일은 media gc의 orphan 정리가 처리)
+        print(f"redis_add 실패, 건너뜀: {e}")
+        return 0
     return added_count
 
 
@@ -43,114 +48,80 @@ async def redis_rem(srcs: list, key: str):
     members = [str(src) for src in srcs if src]
     if not members:
         return {"marked": [], "added": 0}
-    removed_count = await redis_client.srem(key, *members)
+    try:
+        removed_count = await redis_client.srem(key, *members)
+    except RedisError as e:
+        print(f"redis_rem 실패, 건너뜀: {e}")
+        return 0
     return removed_count
 
 
 async def redis_delete_candidates(temp_key: str, real_key: str):
+    """임시 후보 키의 멤버를 실제 키로 옮긴다. (SUNIONSTORE + DEL 한번의 트랜잭션, temp_key가 없으면 아무 변화 없음)"""
     redis_client = get_redis_client()
-    if await redis_client.exists(temp_key):
-        print("redis_client.exists(temp_img_key) 이미지가 있으면 여기로 들어온다.")
-        for url in await redis_client.smembers(temp_key):
-            await redis_client.sadd(real_key, url)
-        await redis_client.delete(temp_key)
+    try:
+        async with redis_client.pipeline(transaction=True) as pipe:
+            pipe.sunionstore(real_key, [real_key, temp_key])
+            pipe.delete(temp_key)
+            await pipe.execute()
+    except RedisError as e:
+        print(f"redis_delete_candidates 실패, 건너뜀: {e}")
 
 
 # --- Helpers ---
+# 실제 파일 삭제는 요청 처리 중에 하지 않는다: 후보를 GC 큐에 넣으면 media_gc 스케줄러가 배치로 정리한다.
 ###############################################################################################################
-async def remove_delete_candidates(_type, delete_candidates: set, object_id: int, currents: set, db: AsyncSession, key: str) -> None:
-    redis_client = get_redis_client()
-    for url in delete_candidates:
-        print("delete_candidates url: ", url)
-        if url not in currents and not await is_media_used_elsewhere(_type, object_id, url, db):
-            file_path = f'{APP_DIR}{url}'  # \\없어도 된다. url 맨 앞에 \\ 있다.
-            await remove_file_path(file_path)
-            await redis_client.srem(key, *url)
-
-
-async def cleanup_unused_images(_type, object_id: int, current_content: str, db: AsyncSession) -> None:
-    """저장 시, Redis 후보 중 더 이상 쓰이지 않는 이미지를 삭제"""
-    redis_client = get_redis_client()
+async def cleanup_unused_images(object_id: int, current_content: str) -> None:
+    """저장 시, Redis 후보 중 저장된 본문에 없는 이미지를 GC 큐로 넘긴다."""
     current_imgs = extract_img_srcs(current_content)
-    print("current_imgs: ", current_imgs)
     key = f"delete_image_candidates:{object_id}"
-    print('key=f"delete_image_candidates:{article_id}": ', key)
-    delete_candidates = await redis_client.smembers(key)
-    print("delete_image_candidates: ", delete_candidates)
+    moved = await MediaGarbageCollector.enqueue_candidates(key, keep=current_imgs)
+    print(f"{key} -> media gc queue: {moved}")
 
-    await remove_delete_candidates(_type, delete_candidates, object_id, current_imgs, db, key)
-    # for url in delete_candidates:
-    #     print("delete_image_candidates url: ", url)
-    #     if url not in current_imgs and not await is_image_used_elsewhere(article_id, url, db):
-    #         file_img_path = f'{APP_DIR}{url}'  # \\없어도 된다. url 맨 앞에 \\ 있다.
-    #         await remove_file_path(file_img_path)
-    #         await redis_client.srem(key, *url)
 
-
-###############################################################################################################
-async def cleanup_unused_videos(_type, object_id: int, current_content: str, db: AsyncSession) -> None:
-    """저장 시, Redis 후보 중 더 이상 쓰이지 않는 이미지를 삭제"""
-    redis_client = get_redis_client()
+async def cleanup_unused_videos(object_id: int, current_content: str) -> None:
+    """저장 시, Redis 후보 중 저장된 본문에 없는 동영상을 GC 큐로 넘긴다."""
     current_videos = extract_video_srcs(current_content)
-    print("current_videos: ", current_videos)
     key = f"delete_video_candidates:{object_id}"
-    print('key=f"delete_video_candidates:{article_id}": ', key)
-    delete_candidates = await redis_client.smembers(key)
-    print("delete_video_candidates: ", delete_candidates)
-
-    await remove_delete_candidates(_type, delete_candidates, object_id, current_videos, db, key)
-    # for url in delete_candidates:
-    #     print("delete_video_candidates url: ", url)
-    #     if url not in current_videos and not await is_image_used_elsewhere(article_id, url, db):
-    #         file_video_path = f'{APP_DIR}{url}'  # \\없어도 된다. url 맨 앞에 \\ 있다.
-    #         await remove_file_path(file_video_path)
-    #         await redis_client.srem(key, *url)
+    moved = await MediaGarbageCollector.enqueue_candidates(key, keep=current_videos)
+    print(f"{key} -> media gc queue: {moved}")
 
 
-async def remove_content_medias(_type, content_medias: set, _id: int, _dir: str, current_user_id: int, db: AsyncSession, key: str) -> None:
-    redis_client = get_redis_client()
-    candidate_medias = set(await redis_client.smembers(key))
-
-    all_medias = content_medias | candidate_medias  # 합쳐서 삭제 후보
-
-    for src in all_medias:  # 실제 삭제 여부 확인
-        if not await is_media_used_elsewhere(_type, _id, src, db):
-            file_path = f'{APP_DIR}{src}'  # \\없어도 된다. src 맨 앞에 \\ 있다.
-            await remove_file_path(file_path)
-
-    media_dir = f'{_dir}'+'/'+f'{current_user_id}'
-    await remove_empty_dir(media_dir)  # 삭제후 폴더가 비어 있으면 폴더도 삭제
-
-
-async def object_delete_with_image_or_video(_type, _id: int, html: str, _dir: str, current_user_id: int, db: AsyncSession, key: str) -> None:
-    """object를 삭제할 때, quill editor의 content중에서 이미지와 동영상 파일을 삭제 및 정리"""
+async def object_delete_with_image_or_video(_id: int, html: str, key: str) -> None:
+    """object를 삭제할 때, quill editor의 content중에서 이미지와 동영상 파일(및 남은 삭제 후보)을 GC 큐로 넘긴다.
+    다른 게시글/댓글에서도 쓰는 파일은 GC가 media_references를 보고 남긴다."""
     print("1. object_delete_with_image_or_video:::key:::", key)
     if key == f"delete_image_candidates:{_id}":
-        content_imgs = extract_img_srcs(html)
-        if content_imgs:
-            await remove_content_medias(_type, content_imgs, _id, _dir, current_user_id, db, key)
+        content_medias = extract_img_srcs(html)
     elif key == f"delete_video_candidates:{_id}":
-        content_videos = extract_video_srcs(html)
-        if content_videos:
-            await remove_content_medias(_type, content_videos, _id, _dir, current_user_id, db, key)
+        content_medias = extract_video_srcs(html)
     else:
         print("2. object_delete_with_image_or_video:::else:::", key)
         raise ValueError("Invalid key: %s" % key)
+    await MediaGarbageCollector.enqueue(content_medias)
+    await MediaGarbageCollector.enqueue_candidates(key)
 
 
 async def is_media_used_elsewhere(_type, object_id: int, src: str, db: AsyncSession) -> bool:
-    """해당 post_id 외 다른 글에서 src 이미지가 사용 중인지 검사"""
-    result = None
-    if _type == "article":
-        result = await db.execute(select(Article).where(Article.id != object_id))
-    elif _type == "article_comment":
-        result = await db.execute(select(ArticleComment).where(ArticleComment.id != object_id))
-
-    other_objects = result.scalars().all()
-    for obj in other_objects:
-        if src in obj.content:
-            return True
-    return False
+    """해당 object_id 외 다른 글(게시글/댓글)에서 src 미디어가 사용 중인지 검사"""
+    return src in await media_srcs_used_elsewhere(_type, object_id, {src}, db)
+
+
+async def media_srcs_used_elsewhere(_type, object_id: int, srcs: set, db: AsyncSession) -> set:
+    """
+    srcs 중에서 (_type, object_id) 말고 다른 게시글/댓글이 참조하고 있는 src만 돌려준다.
+    예전에는 다른 글 전체를 로드해서 src마다 본문 문자열 검색을 했지만,
+    지금은 media_references(src 인덱스)를 IN 조회 1번으로 확인한다.
+    """
+    srcs = {src for src in srcs if src}
+    if not srcs:
+        return set()
+    query = (select(MediaReference.src).distinct()
+             .where(MediaReference.src.in_(srcs))
+             .where(or_(MediaReference.owner_type != _type,
+                        MediaReference.owner_id != object_id)))
+    result = await db.execute(query)
+    return set(result.scalars().all())
 
 
 content_text = "default"
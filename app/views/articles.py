@@ -7,8 +7,10 @@ from fastapi.responses import HTMLResponse
 
 from app.core.settings import templates
 from app.dependencies.auth import get_current_user, get_optional_current_user
+from app.dependencies.database import use_read_replica
 from app.models.users import User
 from app.services.articles.article_service import ArticleService, get_article_service, KeysetDirection
+from app.services.articles.loading import LoadProfile
 from app.utils.commons import render_with_times, get_times
 from app.schemas.articles import articles as schema_article
 
@@ -44,6 +46,7 @@ Type "help", "copyright", "credits" or "license" for more information.
 >>> asyncio.run(db.commit())
 """
 @router.get("/all",
+            dependencies=[Depends(use_read_replica)],  # 조회만 하므로 replica (쓰기 직후에는 primary)
             response_model=List[schema_article.ArticleOut],
             summary="게시물 목록 조회",
             description="전체 게시물 목록을 최신순으로 조회합니다.",
@@ -213,7 +216,7 @@ async def get_articles(request: Request,
     if page < 1:
         page = 1
 
-    items, _ = await article_service.list_articles_offset(page=page, size=size, query=query,)
+    items, _ = await article_service.list_articles_offset(page=page, size=size, query=query, total=total_count)
     if not items:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="등록된 게시물이 없습니다."
@@ -337,6 +340,7 @@ async def get_articles(request: Request,
 
 
 @router.get("/article/{article_id}",
+            dependencies=[Depends(use_read_replica)],
             summary="특정 게시글 조회", description=" 게시글 ID 기반으로 특정 게시물을 조회합니다.",
             responses={404: {
                 "description": "게시글 조회 실패",
@@ -345,7 +349,7 @@ async def get_articles(request: Request,
 async def get_article(request: Request, article_id: int,
                       article_service: ArticleService = Depends(get_article_service),
                       current_user: Optional[User] = Depends(get_optional_current_user)):
-    article = await article_service.get_article(article_id)
+    article = await article_service.get_article(article_id, profile=LoadProfile.DETAIL)
     if article is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -357,11 +361,15 @@ async def get_article(request: Request, article_id: int,
         if comment.paired_comment_id:
             reply_objs.append(comment)
     print("reply_objs:", reply_objs)
+    # 좋아요 여부: voter 목록 전체를 로드하지 않고 로그인 사용자 기준으로만 조회
+    article_voted, voted_comment_ids = await article_service.get_vote_state(article, current_user)
     extra = {
         "current_user": current_user,
         "article": article,
         "reply_objs": reply_objs,
         "mark_id": 0,
+        "article_voted": article_voted,
+        "voted_comment_ids": voted_comment_ids,
     }
     return await render_with_times(request, "articles/detail.html", extra)
 
@@ -0,0 +1,49 @@
+import os
+
+# app.core.settings는 import 시점에 .env 값을 요구한다. 테스트에서는 DB/Redis에 붙지 않으므로 자리만 채운다.
+_TEST_ENV = {
+    "APP_ENV": "development", "SECRET_KEY": "test-secret-key-0123456789", "ALGORITHM": "HS256",
+    "DB_TYPE": "mysql", "DB_DRIVER": "aiomysql",
+    "SMTP_FROM": "test@example.com", "SMTP_USERNAME": "test", "SMTP_PASSWORD": "test",
+    "SMTP_PORT": "587", "SMTP_HOST": "localhost",
+    "ACCESS_COOKIE_NAME": "access_token", "REFRESH_COOKIE_NAME": "refresh_token",
+    "NEW_ACCESS_COOKIE_NAME": "new_access_token", "NEW_REFRESH_COOKIE_NAME": "new_refresh_token",
+    "ACCESS_TOKEN_EXPIRE": "30", "REFRESH_TOKEN_EXPIRE": "7",
+    "PROFILE_IMAGE_URL": "accounts/profiles", "ARTICLE_THUMBNAIL_DIR": "articles/thumbnails",
+    "ARTICLE_EDITOR_USER_IMG_DIR": "articles/editor/images", "ARTICLE_EDITOR_USER_VIDEO_DIR": "articles/editor/videos",
+    "ARTICLE_COMMENT_EDITOR_USER_IMG_DIR": "articles/comments/images",
+    "ARTICLE_COMMENT_EDITOR_USER_VIDEO_DIR": "articles/comments/videos",
+    "DEBUG_TRUE": "false", "DEV_ORIGINS": "http://localhost:8000",
+    "DEV_DB_NAME": "test", "DEV_DB_HOST": "localhost", "DEV_DB_PORT": "3306",
+    "DEV_DB_USER": "test", "DEV_DB_PASSWORD": "test",
+    "LOTTO_FILEPATH": "lottos/lotto.xlsx", "LOTTO_LATEST_URL": "http://localhost",
+    "ADMIN_1": "admin",
+}
+for key, value in _TEST_ENV.items():
+    os.environ.setdefault(key, value)
+
+
+async def asgi_request(app, method: str, path: str, cookie: str = None) -> tuple[dict, bytes, list[dict]]:
+    """httpx 없이 ASGI 앱을 직접 호출한다. (http.response.start 메시지, 본문, 보낸 메시지 전체)를 돌려준다."""
+    import asyncio
+
+    headers = [(b"cookie", cookie.encode())] if cookie else []
+    scope = {"type": "http", "method": method, "path": path, "raw_path": path.encode(), "query_string": b"",
+             "headers": headers, "scheme": "http", "server": ("testserver", 80), "client": ("127.0.0.1", 1),
+             "http_version": "1.1", "root_path": "", "app": app}
+    messages = []
+    request_sent = False
+
+    async def receive():
+        nonlocal request_sent
+        if request_sent:  # 본문을 다 보낸 뒤에는 연결이 끊길 때까지 기다린다.
+            await asyncio.Event().wait()
+        request_sent = True
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    body = b"".join(m.get("body", b"") for m in messages if m["type"] == "http.response.body")
+    return messages[0], body, messages
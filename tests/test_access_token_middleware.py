@@ -0,0 +1,134 @@
+"""AccessTokenSetCookieMiddleware (순수 ASGI)
+- 리프레시한 요청: authorization 헤더 주입, http.response.start에 Set-Cookie, 스트리밍 응답은 버퍼링 없이 청크마다 전달
+- 요청당 오버헤드: 같은 일을 하는 BaseHTTPMiddleware(예전 방식)와 비교
+"""
+import asyncio
+import time
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app.core.settings import CONFIG
+from app.utils.middleware import AccessTokenSetCookieMiddleware
+from conftest import asgi_request
+
+STREAM_CHUNKS = 3
+
+
+def build_app(middleware=None) -> tuple[FastAPI, asyncio.Event]:
+    first_chunk_sent = asyncio.Event()
+    app = FastAPI()
+
+    @app.get("/who")
+    async def who(request: Request):
+        return {"authorization": request.headers.get("authorization")}
+
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            yield b"0\n"
+            # 첫 청크가 클라이언트(send)에 도착해야 다음 청크를 만든다: 미들웨어가 본문을 모아 두면 여기서 멈춘다.
+            await asyncio.wait_for(first_chunk_sent.wait(), timeout=1)
+            for i in range(1, STREAM_CHUNKS):
+                yield f"{i}\n".encode()
+
+        return StreamingResponse(chunks())
+
+    if middleware is not None:
+        app.add_middleware(middleware)
+    return app, first_chunk_sent
+
+
+@pytest.fixture
+def fake_refresh(monkeypatch):
+    async def refresh(refresh_cookie: str):
+        if refresh_cookie == "valid-refresh":
+            return {CONFIG.ACCESS_COOKIE_NAME: "new-access", CONFIG.REFRESH_COOKIE_NAME: "new-refresh"}
+        return None
+
+    monkeypatch.setattr(AccessTokenSetCookieMiddleware, "_refresh", staticmethod(refresh))
+
+
+def _set_cookies(start: dict) -> list[str]:
+    return [value.decode() for key, value in start["headers"] if key == b"set-cookie"]
+
+
+def test_refresh_injects_authorization_and_sets_cookies(fake_refresh):
+    app, _ = build_app(AccessTokenSetCookieMiddleware)
+    start, body, _ = asyncio.run(asgi_request(app, "GET", "/who", cookie=f"{CONFIG.REFRESH_COOKIE_NAME}=valid-refresh"))
+    cookies = _set_cookies(start)
+    assert body == b'{"authorization":"Bearer new-access"}'
+    assert any(cookie.startswith(f"{CONFIG.ACCESS_COOKIE_NAME}=new-access") for cookie in cookies)
+    assert any(cookie.startswith(f"{CONFIG.REFRESH_COOKIE_NAME}=new-refresh") for cookie in cookies)
+
+
+def test_failed_refresh_passes_request_through(fake_refresh):
+    app, _ = build_app(AccessTokenSetCookieMiddleware)
+    start, body, _ = asyncio.run(asgi_request(app, "GET", "/who", cookie=f"{CONFIG.REFRESH_COOKIE_NAME}=expired"))
+    assert body == b'{"authorization":null}'
+    assert _set_cookies(start) == []
+
+
+def test_streaming_response_is_not_buffered(fake_refresh):
+    app, first_chunk_sent = build_app(AccessTokenSetCookieMiddleware)
+
+    async def run():
+        messages = []
+
+        async def send(message):
+            messages.append(message)
+            if message["type"] == "http.response.body" and message.get("body"):
+                first_chunk_sent.set()
+
+        scope = {"type": "http", "method": "GET", "path": "/stream", "raw_path": b"/stream", "query_string": b"",
+                 "headers": [(b"cookie", f"{CONFIG.REFRESH_COOKIE_NAME}=valid-refresh".encode())],
+                 "scheme": "http", "server": ("testserver", 80), "client": ("127.0.0.1", 1),
+                 "http_version": "1.1", "root_path": "", "app": app}
+
+        async def receive():
+            await asyncio.Event().wait()
+
+        await app(scope, receive, send)
+        return messages
+
+    messages = asyncio.run(run())
+    start, bodies = messages[0], [m for m in messages[1:] if m["type"] == "http.response.body"]
+    assert start["type"] == "http.response.start"
+    assert any(cookie.startswith(f"{CONFIG.ACCESS_COOKIE_NAME}=new-access") for cookie in _set_cookies(start))
+    # 청크마다 body 메시지 하나 + 끝 표시(빈 본문, more_body=False)
+    assert [m["body"] for m in bodies if m["body"]] == [f"{i}\n".encode() for i in range(STREAM_CHUNKS)]
+    assert all(m.get("more_body") for m in bodies[:-1]) and not bodies[-1].get("more_body", False)
+
+
+class PassThroughBaseHTTPMiddleware(BaseHTTPMiddleware):
+    """비교용 예전 방식: 아무것도 하지 않아도 응답 본문을 별도 task + 메모리 스트림으로 한번 더 감싼다."""
+
+    async def dispatch(self, request, call_next):
+        return await call_next(request)
+
+
+def test_pure_asgi_overhead_is_below_base_http_middleware():
+    requests = 300
+
+    def per_request_seconds(app) -> float:
+        async def run():
+            for _ in range(20):  # 준비 운동
+                await asgi_request(app, "GET", "/who")
+            best = float("inf")
+            for _ in range(3):
+                started = time.perf_counter()
+                for _ in range(requests):
+                    await asgi_request(app, "GET", "/who")
+                best = min(best, (time.perf_counter() - started) / requests)
+            return best
+
+        return asyncio.run(run())
+
+    plain = per_request_seconds(build_app()[0])
+    pure_asgi = per_request_seconds(build_app(AccessTokenSetCookieMiddleware)[0])
+    base_http = per_request_seconds(build_app(PassThroughBaseHTTPMiddleware)[0])
+    print(f"per request: plain {plain * 1e6:.0f}us, pure ASGI +{(pure_asgi - plain) * 1e6:.0f}us, "
+          f"BaseHTTPMiddleware +{(base_http - plain) * 1e6:.0f}us")
+    assert pure_asgi - plain < base_http - plain
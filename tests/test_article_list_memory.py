@@ -0,0 +1,104 @@
+"""검색 페이지네이션(ArticleService.list_articles_offset)의 요청당 메모리
+검색 결과가 20건이든 2000건이든 한 페이지(size)만 로드하므로 tracemalloc peak가 거의 같아야 한다.
+비교용으로 모든 검색 결과를 ORM 객체로 로드하는 예전 방식의 peak도 재서, 이 측정이 차이를 잡아내는지 확인한다.
+"""
+import asyncio
+import tracemalloc
+
+import pytest
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core.database import Base
+from app.models.articles import Article, ArticleSearchDocument
+from app.models.users import User
+from app.services.articles.article_service import ArticleService
+from app.services.articles.loading import LoadProfile, article_load_options
+import app.models.medias  # noqa: F401  (metadata에 테이블 등록)
+import app.lottos.models  # noqa: F401
+
+SMALL_MATCHES = 20
+LARGE_MATCHES = 2000
+PAGE_SIZE = 10
+
+
+@pytest.fixture
+def search_db(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'search.db'}")
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False, autoflush=False)
+
+    async def seed():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.execute(insert(User), [{"id": 1, "username": "writer", "email": "writer@example.com",
+                                               "password": "x"}])
+            rows, docs = [], []
+            for article_id in range(1, LARGE_MATCHES + 1):
+                # 모든 글에 "large", 앞의 SMALL_MATCHES개에만 "small"
+                words = "large small" if article_id <= SMALL_MATCHES else "large"
+                content = f"<p>{words} " + "본문 " * 200 + "</p>"
+                rows.append({"id": article_id, "title": f"title {article_id}", "content": content, "author_id": 1})
+                docs.append({"article_id": article_id, "body": f"title {article_id} {words} writer"})
+            await conn.execute(insert(Article), rows)
+            await conn.execute(insert(ArticleSearchDocument), docs)
+
+    asyncio.run(seed())
+    yield session_factory
+    asyncio.run(engine.dispose())
+
+
+def peak_bytes(session_factory, operation) -> int:
+    """새 세션에서 operation(db)를 실행하는 동안의 tracemalloc peak (세션 생성/연결 비용은 빼고 잰다)"""
+    async def _run():
+        async with session_factory() as db:
+            await db.execute(select(1))  # 연결을 먼저 열어 둔다
+            tracemalloc.start()
+            try:
+                await operation(db)
+                return tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+    return asyncio.run(_run())
+
+
+def paged_search(query: str, total: int):
+    async def operation(db):
+        items, _ = await ArticleService(db).list_articles_offset(page=1, size=PAGE_SIZE, query=query, total=total)
+        assert len(items) == PAGE_SIZE
+
+    return operation
+
+
+def load_all_matches(query: str):
+    """예전 방식: 검색 결과 전체를 로드한 뒤 파이썬에서 자른다."""
+    async def operation(db):
+        stmt = (select(Article).options(*article_load_options(LoadProfile.LIST))
+                .join(ArticleSearchDocument, ArticleSearchDocument.article_id == Article.id)
+                .where(ArticleSearchDocument.body.ilike(f"%{query}%"))
+                .order_by(Article.created_at.desc(), Article.id.desc()))
+        items = list((await db.execute(stmt)).scalars().all())[:PAGE_SIZE]
+        assert len(items) == PAGE_SIZE
+
+    return operation
+
+
+def test_search_page_memory_does_not_grow_with_match_count(search_db):
+    peak_bytes(search_db, paged_search("small", SMALL_MATCHES))  # 컴파일 캐시 등이 측정에 섞이지 않게 한번 실행
+
+    small = peak_bytes(search_db, paged_search("small", SMALL_MATCHES))
+    large = peak_bytes(search_db, paged_search("large", LARGE_MATCHES))
+    print(f"paged search peak: {SMALL_MATCHES} matches {small:,} B, {LARGE_MATCHES} matches {large:,} B")
+    assert large < small * 1.5
+
+
+def test_loading_all_matches_grows_with_match_count(search_db):
+    # 위 측정이 의미가 있는지: 검색 결과 전체를 로드하면 peak가 결과 수에 비례해서 커진다.
+    peak_bytes(search_db, load_all_matches("small"))
+
+    small = peak_bytes(search_db, load_all_matches("small"))
+    large = peak_bytes(search_db, load_all_matches("large"))
+    paged = peak_bytes(search_db, paged_search("large", LARGE_MATCHES))
+    print(f"load-all peak: {SMALL_MATCHES} matches {small:,} B, {LARGE_MATCHES} matches {large:,} B (paged {paged:,} B)")
+    assert large > small * 10
+    assert large > paged * 10
@@ -0,0 +1,160 @@
+"""게시글/댓글 로딩 프로필(app/services/articles/loading.py)별 쿼리 수
+엔드포인트가 쓰는 조회 메서드마다 SELECT 수를 고정해 둔다. 댓글/작성자 수가 늘어도 쿼리 수는 같아야 한다. (N+1 방지)
+DB는 aiosqlite 파일, 쿼리 수는 before_cursor_execute 이벤트로 센다.
+"""
+import asyncio
+
+import pytest
+from sqlalchemy import event, insert
+from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core.database import Base
+from app.models.articles import Article, ArticleComment
+from app.models.users import User, article_voter
+from app.services.articles.article_service import ArticleService
+from app.services.articles.comment_service import ArticleCommentService
+from app.services.articles.loading import LoadProfile
+import app.models.medias  # noqa: F401  (metadata에 테이블 등록)
+import app.lottos.models  # noqa: F401
+
+USERS = 5
+ARTICLES = 12
+COMMENTS_PER_ARTICLE = 6
+
+
+class QueryCounter:
+    def __init__(self, engine):
+        self.statements = []
+        event.listen(engine.sync_engine, "before_cursor_execute", self._count)
+
+    def _count(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def reset(self):
+        self.statements.clear()
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+
+@pytest.fixture
+def db_env(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'loading.db'}")
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False, autoflush=False)
+
+    async def seed():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with session_factory() as db:
+            for user_id in range(1, USERS + 1):
+                db.add(User(id=user_id, username=f"user{user_id}", email=f"user{user_id}@example.com", password="x"))
+            await db.flush()
+            comment_id = 0
+            for article_id in range(1, ARTICLES + 1):
+                db.add(Article(id=article_id, title=f"title {article_id}", content="content",
+                               author_id=article_id % USERS + 1))
+                await db.flush()
+                for i in range(COMMENTS_PER_ARTICLE):
+                    comment_id += 1
+                    db.add(ArticleComment(id=comment_id, content="comment", article_id=article_id,
+                                          author_id=i % USERS + 1))
+            await db.flush()
+            await db.execute(insert(article_voter).values(user_id=2, article_id=1))
+            await db.commit()
+
+    asyncio.run(seed())
+    counter = QueryCounter(engine)
+    yield session_factory, counter
+    asyncio.run(engine.dispose())
+
+
+def run_counted(db_env, operation):
+    """operation(db)를 새 세션에서 실행하고 (결과, SELECT 수)를 돌려준다."""
+    session_factory, counter = db_env
+
+    async def _run():
+        async with session_factory() as db:
+            counter.reset()
+            result = await operation(db)
+            return result, counter.count
+
+    return asyncio.run(_run())
+
+
+def test_board_list_offset_loads_authors_in_one_query(db_env):
+    # 페이지 id 조회 + 게시글 로드 + 작성자 selectin
+    async def operation(db):
+        items, _ = await ArticleService(db).list_articles_offset(page=1, size=10, total=ARTICLES)
+        return [article.author.username for article in items]
+
+    usernames, count = run_counted(db_env, operation)
+    assert len(usernames) == 10
+    assert count == 3
+
+
+def test_board_list_keyset_loads_authors_in_one_query(db_env):
+    # 게시글 페이지(size + 1) + 작성자 selectin
+    async def operation(db):
+        page = await ArticleService(db).list_articles_keyset(size=10)
+        return [article.author.username for article in page.items]
+
+    usernames, count = run_counted(db_env, operation)
+    assert len(usernames) == 10
+    assert count == 2
+
+
+def test_detail_profile_loads_comments_and_their_authors(db_env):
+    # 게시글 + 작성자 + 댓글 전체 + 댓글 작성자
+    async def operation(db):
+        article = await ArticleService(db).get_article(1, profile=LoadProfile.DETAIL)
+        return article.author.username, [comment.author.username for comment in article.articlecomments_all]
+
+    (author, comment_authors), count = run_counted(db_env, operation)
+    assert len(comment_authors) == COMMENTS_PER_ARTICLE
+    assert count == 4
+
+
+def test_detail_vote_state_is_two_queries(db_env):
+    # 상세 페이지의 좋아요 여부: voter 목록을 로드하지 않고 로그인 사용자 기준 2번
+    session_factory, counter = db_env
+
+    async def _run():
+        async with session_factory() as db:
+            service = ArticleService(db)
+            article = await service.get_article(1, profile=LoadProfile.DETAIL)
+            user = await db.get(User, 2)
+            counter.reset()
+            state = await service.get_vote_state(article, user)
+            return state, counter.count
+
+    (article_voted, voted_comment_ids), count = asyncio.run(_run())
+    assert article_voted is True
+    assert voted_comment_ids == set()
+    assert count == 2
+
+
+@pytest.mark.parametrize("profile", [LoadProfile.MINIMAL, LoadProfile.VOTE])
+def test_minimal_and_vote_profiles_are_one_query_and_load_no_relations(db_env, profile):
+    async def operation(db):
+        return await ArticleService(db).get_article(1, profile=profile)
+
+    article, count = run_counted(db_env, operation)
+    assert count == 1
+    with pytest.raises(InvalidRequestError):
+        article.articlecomments_all  # 관계는 로드되지 않고, 접근하면 쿼리 대신 예외 (lazy="raise")
+
+
+@pytest.mark.parametrize("profile, expected", [
+    (LoadProfile.MINIMAL, 1),
+    (LoadProfile.VOTE, 1),
+    (LoadProfile.DETAIL, 2),  # 댓글 + 작성자
+])
+def test_comment_profiles(db_env, profile, expected):
+    async def operation(db):
+        return await ArticleCommentService(db).get_comment(1, profile=profile)
+
+    comment, count = run_counted(db_env, operation)
+    assert comment.id == 1
+    assert count == expected
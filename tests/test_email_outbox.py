@@ -0,0 +1,164 @@
+"""이메일 발송 대기열(app/utils/email_outbox.py)
+프로세스 안의 간단한 SMTP 서버(asyncio.start_server)와 fakeredis로 배치 발송, 영구 실패, 재시도 예약을 확인한다.
+"""
+import asyncio
+import time
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+import app.core.redis as core_redis
+from app.core.settings import CONFIG
+from app.utils.email_outbox import (EMAIL_OUTBOX_RETRY_BASE_SECONDS, EMAIL_OUTBOX_SCHEDULED_KEY, EmailOutbox,
+                                    _message_key, _SmtpConnection)
+
+
+class FakeSmtpServer:
+    """수신자 주소로 응답을 정한다: bad@ -> 550(영구 실패), busy@ -> 451(일시 실패), 나머지 -> 250"""
+
+    def __init__(self):
+        self.connections = 0
+        self.delivered = []
+        self._server = None
+
+    async def start(self) -> int:
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        writer.write(b"220 test\r\n")
+        await writer.drain()
+        recipient, in_data = None, False
+        while line := await reader.readline():
+            if in_data:
+                if line == b".\r\n":
+                    in_data = False
+                    self.delivered.append(recipient)
+                    writer.write(b"250 queued\r\n")
+                    await writer.drain()
+                continue
+            command = line[:4].upper()
+            if command in (b"EHLO", b"HELO"):
+                writer.write(b"250 test\r\n")
+            elif command == b"RCPT":
+                recipient = line.split(b"<", 1)[1].split(b">", 1)[0].decode()
+                if recipient.startswith("bad@"):
+                    writer.write(b"550 no such user\r\n")
+                elif recipient.startswith("busy@"):
+                    writer.write(b"451 try again later\r\n")
+                else:
+                    writer.write(b"250 ok\r\n")
+            elif command == b"DATA":
+                in_data = True
+                writer.write(b"354 go ahead\r\n")
+            elif command == b"QUIT":
+                writer.write(b"221 bye\r\n")
+                await writer.drain()
+                break
+            else:
+                writer.write(b"250 ok\r\n")
+            await writer.drain()
+        writer.close()
+
+
+@pytest.fixture
+def outbox_env(monkeypatch):
+    server = FakeSmtpServer()
+    for name, value in {"SMTP_HOST": "127.0.0.1", "SMTP_STARTTLS": False,
+                        "SMTP_USERNAME": "", "SMTP_PASSWORD": "", "EMAIL_OUTBOX_BATCH_SIZE": 20}.items():
+        monkeypatch.setattr(CONFIG, name, value)
+
+    def run(scenario):
+        async def _run():
+            redis_client = fakeredis.FakeAsyncRedis(decode_responses=True)
+            monkeypatch.setattr(core_redis, "redis_client", redis_client)
+            monkeypatch.setattr(CONFIG, "SMTP_PORT", await server.start())
+            smtp = _SmtpConnection()
+            try:
+                return await scenario(smtp, redis_client)
+            finally:
+                await smtp.close()
+                await server.stop()
+                await redis_client.aclose()
+
+        return asyncio.run(_run())
+
+    return server, run
+
+
+def test_batches_share_one_smtp_connection(outbox_env):
+    server, run = outbox_env
+
+    async def scenario(smtp, redis_client):
+        ids = [await EmailOutbox.enqueue(f"user{i}@example.com", "subject", "<p>123456</p>") for i in range(25)]
+        claimed = [await EmailOutbox.send_batch(smtp) for _ in range(3)]
+        return ids, claimed, await redis_client.hgetall(_message_key(ids[0])), \
+            await redis_client.zcard(EMAIL_OUTBOX_SCHEDULED_KEY)
+
+    ids, claimed, first, scheduled = run(scenario)
+    assert claimed == [20, 5, 0]
+    assert len(server.delivered) == 25
+    assert server.connections == 1
+    assert first["status"] == "sent" and first["attempts"] == "1"
+    assert "html" not in first  # 보낸 본문(인증코드)은 남기지 않는다
+    assert scheduled == 0
+
+
+def test_permanent_failure_is_not_retried(outbox_env):
+    server, run = outbox_env
+
+    async def scenario(smtp, redis_client):
+        bad = await EmailOutbox.enqueue("bad@example.com", "subject", "<p>x</p>")
+        good = await EmailOutbox.enqueue("good@example.com", "subject", "<p>x</p>")
+        await EmailOutbox.send_batch(smtp)
+        return (await EmailOutbox.status(bad), await EmailOutbox.status(good),
+                await redis_client.zscore(EMAIL_OUTBOX_SCHEDULED_KEY, bad))
+
+    bad, good, bad_score = run(scenario)
+    assert bad == {"status": "failed", "attempts": 1}
+    assert good == {"status": "sent", "attempts": 1}
+    assert bad_score is None
+    assert server.delivered == ["good@example.com"]
+
+
+def test_temporary_failure_is_rescheduled_with_backoff(outbox_env):
+    server, run = outbox_env
+
+    async def scenario(smtp, redis_client):
+        message_id = await EmailOutbox.enqueue("busy@example.com", "subject", "<p>x</p>")
+        delays = []
+        for _ in range(2):
+            before = time.time()
+            await EmailOutbox.send_batch(smtp)
+            delays.append(await redis_client.zscore(EMAIL_OUTBOX_SCHEDULED_KEY, message_id) - before)
+            # 예약 시각을 지금으로 당겨서 다음 배치가 바로 다시 꺼내게 한다
+            await redis_client.zadd(EMAIL_OUTBOX_SCHEDULED_KEY, {message_id: 0})
+        return await EmailOutbox.status(message_id), delays
+
+    status, delays = run(scenario)
+    assert status == {"status": "retrying", "attempts": 2}
+    assert delays[0] == pytest.approx(EMAIL_OUTBOX_RETRY_BASE_SECONDS, abs=1)
+    assert delays[1] == pytest.approx(EMAIL_OUTBOX_RETRY_BASE_SECONDS * 2, abs=1)
+    assert server.delivered == []
+
+
+def test_gives_up_after_max_attempts(outbox_env, monkeypatch):
+    server, run = outbox_env
+    monkeypatch.setattr(CONFIG, "EMAIL_OUTBOX_MAX_ATTEMPTS", 2)
+
+    async def scenario(smtp, redis_client):
+        message_id = await EmailOutbox.enqueue("busy@example.com", "subject", "<p>x</p>")
+        for _ in range(2):
+            await EmailOutbox.send_batch(smtp)
+            await redis_client.zadd(EMAIL_OUTBOX_SCHEDULED_KEY, {message_id: 0}, xx=True)
+        return await EmailOutbox.status(message_id), await redis_client.zscore(EMAIL_OUTBOX_SCHEDULED_KEY, message_id)
+
+    status, score = run(scenario)
+    assert status == {"status": "failed", "attempts": 2}
+    assert score is None
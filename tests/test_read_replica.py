@@ -0,0 +1,128 @@
+"""읽기 replica 라우팅(app/core/database.py RoutingSession, app/dependencies/database.py use_read_replica)
+primary/replica를 SQLite 파일 두 개로 만들고, 같은 id의 회원 이름을 다르게 넣어서 어느 DB에서 읽었는지 구분한다.
+"""
+import asyncio
+
+import pytest
+from fastapi import Depends, FastAPI
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+import app.core.database as core_database
+import app.dependencies.database as database_dependencies
+import app.utils.middleware as middleware
+from app.core.database import Base, RoutingSession, current_db_scope, get_db
+from app.core.settings import CONFIG
+from app.dependencies.database import use_read_replica
+from app.models.users import User
+import app.models.articles  # noqa: F401  (metadata에 테이블 등록)
+import app.models.medias  # noqa: F401
+import app.lottos.models  # noqa: F401
+from conftest import asgi_request
+
+
+@pytest.fixture
+def engines(tmp_path, monkeypatch):
+    primary = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'primary.db'}")
+    replica = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}")
+
+    async def seed():
+        for engine, suffix in ((primary, "primary"), (replica, "replica")):
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+            async with async_sessionmaker(engine)() as db:
+                db.add(User(id=1, username=f"alice-{suffix}", email="alice@example.com", password="x"))
+                await db.commit()
+
+    asyncio.run(seed())
+    # REPLICA_ENGINE은 모듈마다 import 시점에 복사되므로 세 곳 모두 바꾼다.
+    for module in (core_database, database_dependencies, middleware):
+        monkeypatch.setattr(module, "REPLICA_ENGINE", replica)
+    monkeypatch.setattr(core_database, "AsyncSessionLocal", async_sessionmaker(
+        primary, class_=AsyncSession, sync_session_class=RoutingSession, expire_on_commit=False, autoflush=False))
+    yield primary, replica
+    asyncio.run(primary.dispose())
+    asyncio.run(replica.dispose())
+
+
+def replica_session() -> AsyncSession:
+    db = core_database.AsyncSessionLocal()
+    db.info["read_replica"] = True
+    return db
+
+
+async def username(db: AsyncSession) -> str:
+    return (await db.execute(select(User.username).where(User.id == 1))).scalar_one()
+
+
+def test_marked_session_reads_from_replica_and_unmarked_from_primary(engines):
+    async def run():
+        async with replica_session() as marked, core_database.AsyncSessionLocal() as unmarked:
+            return await username(marked), await username(unmarked), marked.info.get("wrote")
+
+    assert asyncio.run(run()) == ("alice-replica", "alice-primary", None)
+
+
+def test_flush_goes_to_primary_and_marks_wrote(engines):
+    primary, replica = engines
+
+    async def run():
+        async with replica_session() as db:
+            db.add(User(id=2, username="bob", email="bob@example.com", password="x"))
+            await db.commit()
+            wrote = db.info.get("wrote")
+        async with async_sessionmaker(primary)() as p, async_sessionmaker(replica)() as r:
+            return wrote, await p.get(User, 2) is not None, await r.get(User, 2) is not None
+
+    assert asyncio.run(run()) == (True, True, False)
+
+
+def test_dml_goes_to_primary_and_marks_wrote(engines):
+    primary, _ = engines
+
+    async def run():
+        async with replica_session() as db:
+            await db.execute(update(User).where(User.id == 1).values(username="alice-updated"))
+            await db.commit()
+            wrote = db.info.get("wrote")
+        async with async_sessionmaker(primary)() as p, replica_session() as r:
+            return wrote, await username(p), await username(r)
+
+    assert asyncio.run(run()) == (True, "alice-updated", "alice-replica")
+
+
+@pytest.fixture
+def replica_app(engines):
+    app = FastAPI()
+
+    @app.get("/read", dependencies=[Depends(use_read_replica)])
+    async def read(db: AsyncSession = Depends(get_db)):
+        return {"username": await username(db), "wrote": current_db_scope().wrote}
+
+    @app.post("/write")
+    async def write(db: AsyncSession = Depends(get_db)):
+        await db.execute(update(User).where(User.id == 1).values(username="alice-written"))
+        await db.commit()
+        return {}
+
+    app.add_middleware(middleware.RequestDBSessionMiddleware)
+    return app
+
+
+def _set_cookies(start: dict) -> list[str]:
+    return [value.decode() for key, value in start["headers"] if key == b"set-cookie"]
+
+
+def test_write_sets_primary_cookie_and_cookie_keeps_reads_on_primary(replica_app):
+    async def run():
+        _, read_body, _ = await asgi_request(replica_app, "GET", "/read")
+        write_start, _, _ = await asgi_request(replica_app, "POST", "/write")
+        _, without_cookie, _ = await asgi_request(replica_app, "GET", "/read")
+        _, with_cookie, _ = await asgi_request(replica_app, "GET", "/read", cookie=f"{CONFIG.DB_PRIMARY_COOKIE_NAME}=1")
+        return read_body, _set_cookies(write_start), without_cookie, with_cookie
+
+    read_body, write_cookies, without_cookie, with_cookie = asyncio.run(run())
+    assert read_body == b'{"username":"alice-replica","wrote":false}'
+    assert any(cookie.startswith(f"{CONFIG.DB_PRIMARY_COOKIE_NAME}=1") for cookie in write_cookies)
+    assert without_cookie == b'{"username":"alice-replica","wrote":false}'  # replica에는 아직 반영 전
+    assert with_cookie == b'{"username":"alice-written","wrote":false}'
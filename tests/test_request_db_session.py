@@ -0,0 +1,109 @@
+"""요청 하나 = DB 세션 하나 (app/core/database.py RequestDBScope, app/utils/middleware.py)
+RequestDBSessionMiddleware + AccessTokenSetCookieMiddleware + get_current_user + 서비스 의존성(get_db)을 모두 거치는
+요청이 풀에서 커넥션을 동시에 하나만 잡는지(scope.peak == 1) 확인한다. 토큰 리프레시 경로(미들웨어가 DB 조회)도 포함.
+"""
+import asyncio
+
+import pytest
+from fastapi import Depends, FastAPI
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+fakeredis = pytest.importorskip("fakeredis")
+
+import app.core.database as core_database
+import app.core.redis as core_redis
+from app.core.database import Base, RoutingSession, current_db_scope, get_db
+from app.core.settings import CONFIG
+from app.dependencies.auth import get_current_user
+from app.models.users import User
+from app.services.account_service import UserService, get_user_service
+from app.services.auth_service import AuthService
+from app.utils.middleware import AccessTokenSetCookieMiddleware, RequestDBSessionMiddleware
+import app.models.articles  # noqa: F401  (metadata에 테이블 등록)
+import app.models.medias  # noqa: F401
+import app.lottos.models  # noqa: F401
+from conftest import asgi_request
+
+
+@pytest.fixture
+def scoped_app(tmp_path, monkeypatch):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'app.db'}")
+    pool = engine.sync_engine.pool
+    event.listen(pool, "checkout", core_database._count_checkout)
+    event.listen(pool, "checkin", core_database._count_checkin)
+    monkeypatch.setattr(core_database, "AsyncSessionLocal", async_sessionmaker(
+        engine, class_=AsyncSession, sync_session_class=RoutingSession, expire_on_commit=False, autoflush=False))
+
+    async def seed():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with async_sessionmaker(engine)() as db:
+            db.add_all([User(id=1, username="alice", email="alice@example.com", password="x"),
+                        User(id=2, username="bob", email="bob@example.com", password="x")])
+            await db.commit()
+
+    asyncio.run(seed())
+    scopes = []
+    app = FastAPI()
+
+    @app.get("/profile")
+    async def profile(current_user: User = Depends(get_current_user),
+                      user_service: UserService = Depends(get_user_service),
+                      db: AsyncSession = Depends(get_db)):
+        scopes.append(current_db_scope())
+        other = await user_service.get_user_by_id(2)
+        await db.commit()  # 중간 commit 뒤에 다시 조회해도 같은 세션
+        await db.execute(select(User.id))
+        return {"user": current_user.username, "other": other.username, "shared": user_service.db is db}
+
+    app.add_middleware(AccessTokenSetCookieMiddleware)
+    app.add_middleware(RequestDBSessionMiddleware)
+
+    def run(scenario):
+        async def _run():
+            redis_client = fakeredis.FakeAsyncRedis(decode_responses=True)
+            monkeypatch.setattr(core_redis, "redis_client", redis_client)
+            try:
+                async with async_sessionmaker(engine)() as db:
+                    tokens = await AuthService.create_user_token(await db.get(User, 1))
+                return await scenario(app, tokens)
+            finally:
+                await redis_client.aclose()
+
+        return asyncio.run(_run())
+
+    yield run, scopes
+    event.remove(pool, "checkout", core_database._count_checkout)
+    event.remove(pool, "checkin", core_database._count_checkin)
+    asyncio.run(engine.dispose())
+
+
+def test_authenticated_request_uses_one_connection(scoped_app):
+    run, scopes = scoped_app
+
+    async def scenario(app, tokens):
+        return await asgi_request(app, "GET", "/profile",
+                                  cookie=f"{CONFIG.ACCESS_COOKIE_NAME}={tokens[CONFIG.ACCESS_COOKIE_NAME]}")
+
+    start, body, _ = run(scenario)
+    assert start["status"] == 200
+    assert body == b'{"user":"alice","other":"bob","shared":true}'
+    assert scopes[0].checkouts >= 1
+    assert scopes[0].peak == 1
+
+
+def test_refresh_in_middleware_shares_the_request_connection(scoped_app):
+    run, scopes = scoped_app
+
+    async def scenario(app, tokens):
+        # access_token 없이 refresh_token만: AccessTokenSetCookieMiddleware가 요청 공유 세션으로 리프레시한다.
+        return await asgi_request(app, "GET", "/profile",
+                                  cookie=f"{CONFIG.REFRESH_COOKIE_NAME}={tokens[CONFIG.REFRESH_COOKIE_NAME]}")
+
+    start, body, _ = run(scenario)
+    set_cookies = [value.decode() for key, value in start["headers"] if key == b"set-cookie"]
+    assert start["status"] == 200
+    assert body == b'{"user":"alice","other":"bob","shared":true}'
+    assert any(cookie.startswith(f"{CONFIG.ACCESS_COOKIE_NAME}=") for cookie in set_cookies)
+    assert scopes[0].peak == 1